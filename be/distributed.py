@@ -0,0 +1,176 @@
+# be/distributed.py
+
+import argparse
+import logging
+import os
+import re
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .utils.config_loader import load_config
+from .manager import Manager
+from .modules.utils.helpers import submit_with_context, atomic_write_json
+from .modules.utils.logger import target_context
+from .modules.utils.store import ResultsStore
+from .modules.utils.work_queue import WorkQueue, QueueCheckpoint
+
+logger = logging.getLogger(__name__)
+
+# Argumentos que cada worker decide por su cuenta (el resto vienen del coordinador)
+LOCAL_ARGS = ('workers', 'max_tools', 'threads', 'url_workers', 'verbose', 'debug', 'profile')
+
+
+def _get_int(config, option, default):
+    """Lee un entero de la sección [DISTRIBUTED] con un valor por defecto."""
+    try:
+        return max(1, config.getint('DISTRIBUTED', option, fallback=default))
+    except (AttributeError, ValueError):
+        return default
+
+
+class Coordinator:
+    """
+    Reparte una ejecución entre varios workers (--coordinator COLA): encola las unidades
+    (objetivo, etapa) del Manager en la cola SQLite compartida junto con los argumentos de
+    la ejecución y el directorio de salida común, y espera informando del avance. Las
+    unidades ya existentes se conservan, así que relanzarlo sobre la misma cola continúa.
+    """
+
+    DEFAULT_REPORT_SECONDS = 30
+
+    def __init__(self, args, config=None):
+        self.args = args
+        self.config = config if config is not None else load_config()
+        self.report_seconds = _get_int(self.config, 'REPORT_SECONDS', self.DEFAULT_REPORT_SECONDS)
+        self.queue = WorkQueue.from_config(args.coordinator, self.config)
+        self.manager = Manager(args, self.config)
+
+    def submit(self):
+        output_dir = os.path.abspath(self.manager._setup_main_output_directory())
+        job_args = {key: value for key, value in vars(self.args).items() if key not in ('coordinator', 'worker')}
+        job_args['output'] = output_dir
+        self.queue.set_meta('args', job_args)
+        self.queue.set_meta('output_dir', output_dir)
+        store = ResultsStore.from_config(self.config, shared_dir=output_dir)
+        if store:
+            # Una única ejecución en el almacén: los workers se suman a ella (start_run con resume)
+            run_id = store.start_run(output_dir, self.args, resume=getattr(self.args, 'resume', False))
+            store.close()
+            logger.info(f"💾 Resultados indexados en {store.path} (ejecución #{run_id})")
+        units = self.manager.work_units()
+        added = self.queue.add_units(units)
+        logger.info(f"📦 {added} unidades nuevas en la cola {self.queue.path} "
+                    f"({len(units) - added} ya estaban; {len(self.manager.targets)} objetivos)")
+        logger.info(f"   Lanza los workers con: python3 main.py --worker {self.queue.path}")
+        return output_dir
+
+    def run(self):
+        output_dir = self.submit()
+        started = time.time()
+        try:
+            while True:
+                self.queue.requeue_expired()
+                counts = self.queue.counts()
+                logger.info(f"📊 Cola: {counts.get('done', 0)} hechas, {counts.get('leased', 0)} en curso, "
+                            f"{counts.get('queued', 0)} pendientes, {counts.get('failed', 0)} fallidas "
+                            f"({time.time() - started:.0f}s)")
+                if not counts.get('queued') and not counts.get('leased'):
+                    break
+                time.sleep(self.report_seconds)
+        except KeyboardInterrupt:
+            logger.info("[Distributed] Coordinador detenido; los workers siguen con la cola.")
+            return
+        failures = self.queue.failures()
+        for failure in failures:
+            logger.error(f"❌ {failure['target']} / {failure['stage']} falló tras {failure['attempts']} intentos: "
+                         f"{failure['error']}")
+        atomic_write_json(os.path.join(output_dir, 'distributed.json'),
+                          {'queue': self.queue.path, 'counts': self.queue.counts(), 'failed': failures}, indent=4)
+        logger.info(f"✅ Ejecución distribuida terminada ({len(failures)} unidades fallidas). Resultados en {output_dir}")
+
+
+class Worker:
+    """
+    Worker del modo distribuido (--worker COLA): toma unidades de la cola compartida y las
+    ejecuta con un Manager construido con los argumentos del coordinador, escribiendo en
+    el mismo árbol de salida. Renueva sus préstamos mientras trabaja; si muere, vencen y
+    otro worker repite la unidad continuando desde el progreso guardado en la cola.
+    """
+
+    DEFAULT_POLL_SECONDS = 10
+
+    def __init__(self, args, config=None):
+        self.config = config if config is not None else load_config()
+        self.queue = WorkQueue.from_config(args.worker, self.config)
+        self.poll_seconds = _get_int(self.config, 'POLL_SECONDS', self.DEFAULT_POLL_SECONDS)
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.metrics_name = 'metrics_' + re.sub(r'[^A-Za-z0-9_.-]', '_', self.worker_id)
+        self.checkpoint = QueueCheckpoint(self.queue)
+        job_args = self.queue.get_meta('args')
+        if not job_args:
+            raise ValueError(f"La cola {args.worker} no tiene ninguna ejecución (lanza antes el coordinador)")
+        # Sin -u/-l: los objetivos llegan con cada unidad
+        job_args.update(url=None, list=None, resume=False)
+        for key in LOCAL_ARGS:
+            if getattr(args, key, None) not in (None, False):
+                job_args[key] = getattr(args, key)
+        self.args = argparse.Namespace(**job_args)
+        # Unidades simultáneas en este worker (-w)
+        self.concurrency = max(1, getattr(args, 'workers', None) or 1)
+        self._stop = threading.Event()
+
+    def run(self):
+        logger.info(f"🛠️  Worker {self.worker_id} sobre la cola {self.queue.path} ({self.concurrency} unidades a la vez)")
+        Manager(self.args, self.config).run(worker=self)
+
+    def process(self, manager):
+        """Bucle principal (lo llama Manager.run): presta, ejecuta y confirma unidades hasta vaciar la cola."""
+        heartbeat = threading.Thread(target=self._heartbeat, daemon=True)
+        heartbeat.start()
+        try:
+            with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='unit') as executor:
+                loops = [submit_with_context(executor, self._work_loop, manager) for _ in range(self.concurrency)]
+                try:
+                    for future in loops:
+                        future.result()
+                except BaseException:
+                    self._stop.set() # Ctrl+C: no se prestan más unidades; las que están en marcha terminan
+                    raise
+        finally:
+            self._stop.set()
+            # Si se interrumpe, lo que quede prestado vuelve a la cola sin esperar al vencimiento
+            released = self.queue.release(self.worker_id)
+            if released:
+                logger.info(f"[Distributed] {released} unidades devueltas a la cola.")
+
+    def _work_loop(self, manager):
+        while not self._stop.is_set():
+            unit = self.queue.lease(self.worker_id)
+            if unit is None:
+                if not self.queue.unfinished():
+                    return
+                # Quedan unidades prestadas a otros o esperando a su etapa anterior
+                self._stop.wait(self.poll_seconds)
+                continue
+            label = f"{unit['target']} / {unit['stage']}"
+            logger.info(f"📥 Unidad {label} (intento {unit['attempts']})")
+            try:
+                manager.scan_unit(unit['target'], unit['stage'], unit['payload'])
+            except Exception as e:
+                with target_context(unit['target']):
+                    logger.error(f"❌ La unidad {label} falló: {e}", exc_info=True)
+                self.queue.fail(unit['id'], self.worker_id, e)
+                continue
+            if not self.queue.complete(unit['id'], self.worker_id):
+                logger.warning(f"[Distributed] El préstamo de {label} venció antes de terminar; "
+                               f"la unidad se repetirá en otro worker.")
+
+    def _heartbeat(self):
+        interval = max(1, self.queue.lease_seconds / 3)
+        while not self._stop.wait(interval):
+            try:
+                self.queue.renew(self.worker_id)
+            except Exception as e:
+                logger.warning(f"[Distributed] No se pudieron renovar los préstamos: {e}")
@@ -1,21 +1,47 @@
 import logging
 import sys
 import os
-from urllib.parse import urlparse
+import copy
+import json
+import queue
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # Importaciones de todos los módulos
 from .utils.config_loader import load_config
 from .modules.recon import ReconModule
 from .modules.probing import ProbingModule
+from .modules.subdomain import SubdomainModule
 from .modules.urls import UrlsModule
+from .modules.incremental import IncrementalState
+from .modules.clustering import ResponseClusterer
+from .modules.js_secrets import JsSecretsModule
+from .modules.utils.helpers import (set_max_concurrent_tools, DEFAULT_MAX_CONCURRENT_TOOLS, iter_queue, submit_with_context,
+                                    atomic_write_json, atomic_write_text)
+from .modules.utils.logger import target_context
+from .modules.utils.checkpoint import Checkpoint
+from .modules.utils.hosts import normalize_hostname, group_crawl_units
+from .modules.utils.store import ResultsStore
+from .modules.utils.dns import AsyncResolver
+from .modules.utils.metrics import get_metrics, reset_metrics, RunProfiler
 
 logger = logging.getLogger(__name__)
 
 class Manager:
-    def __init__(self, args):
+    def __init__(self, args, config=None, resolver=None, shared_limits=False):
         self.args = args
-        self.config = load_config()
+        # Configuración ya cargada (p. ej. la del benchmark o el servicio); por defecto configs/default.conf
+        self.config = config if config is not None else load_config()
+        self._main_output_dir = None
+        self.checkpoint = None
+        # Almacén SQLite de resultados ([STORE]); se abre en run().
+        self.store = None
+        self.run_id = None
+        # Resolver DNS compartido por todas las etapas y objetivos (su caché evita repetir consultas)
+        # (en modo servicio es el del servicio, que mantiene la caché entre trabajos)
+        self.resolver = resolver if resolver is not None else AsyncResolver.from_config(self.config)
+        # Agrupación de hosts vivos con la misma respuesta antes de rastrear URLs ([CLUSTERING])
+        self.clusterer = ResponseClusterer.from_config(self.config)
 
         if self.args.output:
             base_output_dir = self.config.get('RECON', 'DEFAULT_OUTPUT_DIR', fallback='outputs/')
@@ -26,6 +52,23 @@ class Manager:
         is_direct_url_mode = self.args.urls
         self.targets = self._load_targets(normalize_to_root_domain=not is_direct_url_mode)
 
+        # Paralelismo a nivel de objetivo y límite global de procesos externos. Con
+        # shared_limits el planificador ya lo configuró el servicio para todos sus trabajos.
+        self.workers = self._get_run_option('workers', 'TARGET_WORKERS', 1)
+        if not shared_limits:
+            max_tools = self._get_run_option('max_tools', 'MAX_CONCURRENT_TOOLS', DEFAULT_MAX_CONCURRENT_TOOLS)
+            set_max_concurrent_tools(max_tools, self.config)
+
+    def _get_run_option(self, arg_name, config_key, default):
+        """Prioridad: argumento CLI > sección [RUN] de la configuración > valor por defecto."""
+        value = getattr(self.args, arg_name, None)
+        if value is None:
+            try:
+                value = self.config.getint('RUN', config_key, fallback=default)
+            except (AttributeError, ValueError):
+                value = default
+        return max(1, int(value))
+
     def _load_targets(self, normalize_to_root_domain=True):
         """Carga objetivos y opcionalmente los normaliza a dominios raíz."""
         targets = []
@@ -53,43 +96,341 @@ class Manager:
         return unique_targets
 
     def _normalize_domain(self, target):
-        """Extrae el dominio de una URL si es necesario."""
-        if '://' in target:
-            return urlparse(target).netloc
-        return target.strip('/')
-
-    def run(self):
-        """Orquesta la ejecución según los flags proporcionados."""
-        # <<< CAMBIO CLAVE: recon3 ahora usa el mismo flujo que recon1 y recon2 >>>
-        if self.args.recon1 or self.args.recon2 or self.args.recon3 or self.args.all:
-            self._run_reconnaissance_pipeline()
-        elif self.args.urls:
-            self._run_direct_urls_pipeline()
+        """Extrae el dominio o la IPv4 (en minúsculas, sin esquema, puerto ni ruta) de una URL o nombre."""
+        domain = normalize_hostname(target, allow_ip=True)
+        if not domain:
+            logger.warning(f"[!] Objetivo descartado, no es un dominio ni una IP válidos: {target}")
+        return domain
+
+    def run(self, worker=None):
+        """
+        Orquesta la ejecución según los flags proporcionados. Con 'worker' (modo distribuido,
+        ver distributed.py) las unidades de trabajo salen de la cola compartida.
+        """
+        # Los workers usan el almacén del directorio de salida compartido, el mismo que el coordinador
+        self.store = ResultsStore.from_config(self.config,
+                                              shared_dir=self._setup_main_output_directory() if worker else None)
+        if getattr(self.args, 'export', None):
+            try:
+                self._run_export()
+            finally:
+                if self.store:
+                    self.store.close()
+            return
+        metrics = reset_metrics()
+        profiler = RunProfiler() if getattr(self.args, 'profile', False) else None
+        if profiler:
+            profiler.start()
+        try:
+            resume = getattr(self.args, 'resume', False)
+            if resume and not self.args.output:
+                logger.warning("[!] --resume necesita el mismo -o/--output de la ejecución interrumpida; se empieza de cero.")
+            main_output_dir = self._setup_main_output_directory()
+            # Los workers comparten el progreso a través de la cola en lugar de checkpoint.json
+            self.checkpoint = worker.checkpoint if worker else Checkpoint(main_output_dir, resume=resume)
+            if self.store:
+                # Los workers se suman a la ejecución que registró el coordinador en el mismo directorio
+                self.run_id = self.store.start_run(main_output_dir, self.args, resume=resume or worker is not None)
+                logger.info(f"💾 Resultados indexados en {self.store.path} (ejecución #{self.run_id})")
+            if worker:
+                worker.process(self)
+            # <<< CAMBIO CLAVE: recon3 ahora usa el mismo flujo que recon1 y recon2 >>>
+            elif self.args.recon1 or self.args.recon2 or self.args.recon3 or self.args.subdomains or self.args.all:
+                self._run_reconnaissance_pipeline()
+            elif self.args.urls:
+                self._run_direct_urls_pipeline()
+        finally:
+            if self.store:
+                self.store.close()
+            if profiler:
+                profiler.stop(os.path.join(self._setup_main_output_directory(), 'profile.prof'))
+            self._save_metrics(metrics, worker.metrics_name if worker else 'metrics')
+
+    def _save_metrics(self, metrics, name='metrics'):
+        """Guarda el resumen de métricas (metrics.json) y el textfile de Prometheus ([METRICS])."""
+        try:
+            if not self.config.getboolean('METRICS', 'ENABLED', fallback=True):
+                return
+            prometheus_path = self.config.get('METRICS', 'PROMETHEUS_FILE', fallback='').strip()
+        except (AttributeError, ValueError):
+            prometheus_path = ''
+        output_dir = self._setup_main_output_directory()
+        summary = metrics.summary()
+        summary_path = os.path.join(output_dir, f"{name}.json")
+        try:
+            atomic_write_json(summary_path, summary, indent=4)
+            atomic_write_text(prometheus_path or os.path.join(output_dir, f"{name}.prom"), metrics.prometheus(summary))
+        except OSError as e:
+            logger.warning(f"[Metrics] No se pudieron guardar las métricas: {e}")
+            return
+        metrics.log_summary(summary)
+        logger.info(f"📊 Métricas guardadas en {summary_path}")
+
+    def _run_export(self):
+        """Exporta a stdout resultados del almacén (--export), sin escanear nada."""
+        if not self.store:
+            logger.error("❌ El almacén de resultados está desactivado ([STORE] ENABLED = false); no hay nada que exportar.")
+            return
+        count = self.store.export(
+            self.args.export, self.args.format, sys.stdout,
+            targets=self.targets or None, tech=self.args.tech, status=self.args.status,
+            category=self.args.category, all_runs=self.args.all_runs,
+        )
+        logger.info(f"📤 Exportados {count} registros de '{self.args.export}' desde {self.store.path}")
+
+    def _attach_store(self, module, target):
+        """Da a un módulo acceso al almacén de resultados para el objetivo indicado."""
+        if self.store:
+            module.store = self.store.for_target(self.run_id, target)
+        return module
 
     def _run_reconnaissance_pipeline(self):
         """Ejecuta el flujo completo de descubrimiento para cada dominio raíz."""
         logger.info("[+] Iniciando en modo Reconocimiento...")
-        for target_domain in self.targets:
+        workers = min(self.workers, len(self.targets)) or 1
+        self._setup_main_output_directory()
+        if workers == 1:
+            for target_domain in self.targets:
+                self._scan_target(target_domain, self.args)
+            return
+
+        # --threads es el presupuesto total: se reparte entre los objetivos simultáneos.
+        target_args = copy.copy(self.args)
+        target_args.threads = max(1, self.args.threads // workers)
+        logger.info(f"[+] Escaneando {len(self.targets)} objetivos con {workers} workers "
+                    f"({target_args.threads} hilos de httpx por objetivo)...")
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='target') as executor:
+            futures = {submit_with_context(executor, self._scan_target, target, target_args): target
+                       for target in self.targets}
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    logger.error(f"❌ El escaneo de {futures[future]} falló: {e}", exc_info=True)
+
+    def work_units(self):
+        """
+        Unidades (objetivo, etapa, posición, payload) en que se reparte la ejecución en modo
+        distribuido. Cada objetivo avanza etapa a etapa y la última ('done') termina el resto;
+        en modo directo (solo --urls) cada unidad es un grupo de URLs equivalentes.
+        """
+        if not (self.args.recon1 or self.args.recon2 or self.args.recon3 or self.args.subdomains or self.args.all):
+            return [(representative, 'hosts', 0, [representative] + aliases)
+                    for representative, aliases in group_crawl_units(self.targets)]
+        if getattr(self.args, 'stream', False):
+            stages = ['done'] # En streaming las etapas se solapan: el objetivo es una sola unidad
+        else:
+            stages = ['recon']
+            if self.args.subdomains or self.args.all:
+                stages.append('subdomains')
+            if self.args.urls:
+                stages.append('probing')
+            stages.append('done')
+        return [(target, stage, position, None) for target in self.targets for position, stage in enumerate(stages)]
+
+    def scan_unit(self, target, stage, hosts=None):
+        """Ejecuta una unidad de work_units() (el checkpoint indica qué etapas previas ya están hechas)."""
+        if stage == 'hosts':
+            output_dir = self._setup_main_output_directory()
+            project_name = os.path.basename(os.path.normpath(output_dir))
+            with target_context(project_name):
+                with get_metrics().stage('urls', items_in=len(hosts)) as record:
+                    urls_module = self._run_urls(project_name, hosts, output_dir)
+                    record['items_out'] = urls_module.urls_found
+                self._run_js_secrets(project_name, urls_module, self.args)
+        else:
+            self._scan_target(target, self.args, stop_after=None if stage == 'done' else stage)
+
+    def _scan_target(self, target_domain, args, stop_after=None):
+        """
+        Recon -> probing -> URLs para un único dominio raíz, con el objetivo marcado en los logs.
+        Con stop_after se detiene tras esa etapa (un worker del modo distribuido hace solo una).
+        """
+        with target_context(target_domain):
+            if self.checkpoint.is_done(target_domain, 'done'):
+                logger.info(f"⏭️  {target_domain} ya estaba completo según el checkpoint; se omite.")
+                return
             # Ahora el output se crea por objetivo, que es más ordenado.
             run_output_dir = self._setup_output_directory_for_target(target_domain)
             logger.info(f"\n=======================================================")
             logger.info(f"🎯 Iniciando escaneo para el objetivo: {target_domain}")
+
+            metrics = get_metrics()
+            if getattr(args, 'stream', False):
+                with metrics.stage('stream'):
+                    self._scan_target_streaming(target_domain, args, run_output_dir)
+                self.checkpoint.mark_done(target_domain, 'done')
+                logger.info(f"✅ Escaneo finalizado para: {target_domain}")
+                return
             
             # 1. BÚSQUEDA DE SUBDOMINIOS (Para recon1, recon2 y AHORA TAMBIÉN recon3)
-            results = ReconModule(target_domain, self.args, self.config, run_output_dir).run()
-            subdomains_to_probe = results.get('subdomains', [])
+            subdomains_to_probe = self._load_completed_stage(target_domain, 'recon', run_output_dir, args)
+            if subdomains_to_probe is None:
+                with metrics.stage('recon') as stage:
+                    recon_module = self._attach_store(ReconModule(target_domain, args, self.config, run_output_dir), target_domain)
+                    results = recon_module.run()
+                    subdomains_to_probe = results.get('subdomains', [])
+                    stage['items_out'] = len(subdomains_to_probe)
+                self.checkpoint.mark_done(target_domain, 'recon')
+            if stop_after == 'recon':
+                return
+
+            # 1b. DESCUBRIMIENTO ACTIVO (--subdomains / --all): sus hallazgos se sondean igual que los pasivos
+            if args.subdomains or args.all:
+                subdomains_to_probe = self._run_active_discovery(target_domain, subdomains_to_probe, run_output_dir, args)
+                if stop_after == 'subdomains':
+                    return
             
             live_hosts = []
+            failed_hosts = []
             if subdomains_to_probe:
                 # 2. SONDEO de los subdominios encontrados
-                live_hosts = self._run_probing(target_domain, subdomains_to_probe, run_output_dir)
+                live_hosts = self._load_completed_stage(target_domain, 'probing', run_output_dir, args)
+                if live_hosts is None:
+                    with metrics.stage('probing', items_in=len(subdomains_to_probe)) as stage:
+                        live_hosts, failed_hosts = self._run_probing(target_domain, subdomains_to_probe,
+                                                                     run_output_dir, args)
+                        stage['items_out'] = len(live_hosts)
+                    if failed_hosts:
+                        # Sin sondear no se distinguen de los hosts muertos: la etapa queda pendiente
+                        logger.warning(f"  [!] {len(failed_hosts)} hosts quedaron sin sondear; el sondeo no se "
+                                       f"marca como completado (--resume los reintentará).")
+                    else:
+                        self.checkpoint.mark_done(target_domain, 'probing')
+            if stop_after == 'probing':
+                return
             
-            # 3. Búsqueda de URLs (si se especifica)
-            if self.args.urls and live_hosts:
-                self._run_urls(target_domain, live_hosts, run_output_dir)
+            # 3. Búsqueda de URLs (si se especifica), un host por grupo de respuestas idénticas
+            if args.urls and live_hosts:
+                with metrics.stage('clustering', items_in=len(live_hosts)) as stage:
+                    crawl_hosts = self._select_crawl_hosts(target_domain, live_hosts, run_output_dir)
+                    stage['items_out'] = len(crawl_hosts)
+                with metrics.stage('urls', items_in=len(crawl_hosts)) as stage:
+                    urls_module = self._run_urls(target_domain, crawl_hosts, run_output_dir, args)
+                    stage['items_out'] = urls_module.urls_found
+                self._run_js_secrets(target_domain, urls_module, args)
+                if urls_module.failed_hosts:
+                    # El objetivo no se da por completo para que --resume reintente esos hosts
+                    logger.warning(f"  [!] {len(urls_module.failed_hosts)} hosts quedaron sin buscar URLs; "
+                                   f"{target_domain} no se marca como completado.")
+                    return
 
+            if failed_hosts:
+                # Con el sondeo pendiente, marcarlo completo haría que --resume lo saltara entero
+                return
+            self.checkpoint.mark_done(target_domain, 'done')
             logger.info(f"✅ Escaneo finalizado para: {target_domain}")
 
+    def _load_completed_stage(self, target_domain, stage, output_dir, args):
+        """
+        Si el checkpoint marca la etapa como hecha, recupera su salida de disco
+        (subdominios, o registros de hosts vivos / URLs en modo 'fast').
+        Devuelve None si hay que ejecutarla.
+        """
+        if not self.checkpoint.is_done(target_domain, stage):
+            return None
+        if self.store and not self.store.write_files:
+            # Sin archivos de salida, la etapa se recupera del almacén de resultados.
+            view = self.store.for_target(self.run_id, target_domain)
+            if stage in ('recon', 'subdomains'):
+                items = view.load_subdomains()
+            elif self._probing_mode(args) == 'fast':
+                items = view.load_live_urls()
+            else:
+                items = view.load_live_records()
+            logger.info(f"  [Checkpoint] Etapa '{stage}' ya completada: {len(items)} elementos recuperados del almacén.")
+            return items
+        base_name = target_domain.replace('.', '_')
+        try:
+            if stage == 'recon':
+                path = os.path.join(output_dir, f"{base_name}_subdomains.json")
+                with open(path, 'r') as f:
+                    items = json.load(f)
+            elif stage == 'subdomains':
+                path = os.path.join(output_dir, f"{base_name}_bruteforce.txt")
+                with open(path, 'r') as f:
+                    items = [line.strip() for line in f if line.strip()]
+            elif self._probing_mode(args) == 'fast':
+                path = os.path.join(output_dir, f"{base_name}_positives.txt")
+                with open(path, 'r') as f:
+                    items = [line.strip() for line in f if line.strip()]
+            else:
+                path = os.path.join(output_dir, f"{base_name}_positives.json")
+                with open(path, 'r') as f:
+                    items = [item for item in json.load(f) if item['url']]
+        except FileNotFoundError:
+            # Una etapa sin resultados no escribe archivo: equivale a una salida vacía.
+            items = []
+        except (json.JSONDecodeError, KeyError, OSError) as e:
+            logger.warning(f"  [Checkpoint] No se pudo recuperar la etapa '{stage}' ({e}); se repite.")
+            return None
+        logger.info(f"  [Checkpoint] Etapa '{stage}' ya completada: {len(items)} elementos recuperados.")
+        return items
+
+    def _scan_target_streaming(self, target_domain, args, run_output_dir):
+        """
+        Modo streaming: recon, probing y URLs corren a la vez conectados por colas.
+        Cada subdominio va a httpx en cuanto una fuente lo emite y cada host vivo
+        pasa a gau/katana en cuanto httpx lo reporta.
+        """
+        subdomain_queue = queue.Queue()
+        live_queue = queue.Queue()
+        recon_module = self._attach_store(ReconModule(target_domain, args, self.config, run_output_dir), target_domain)
+        probing_module = self._attach_store(
+            ProbingModule(target_domain, args, self.config, [], self._probing_mode(args)), target_domain)
+
+        def recon_stage():
+            try:
+                with get_metrics().stage('recon') as stage:
+                    recon_results = recon_module.run(on_subdomain=subdomain_queue.put)
+                    stage['items_out'] = len(recon_results['subdomains'])
+                if args.subdomains or args.all:
+                    active_module = self._attach_store(
+                        SubdomainModule(target_domain, args, self.config, recon_results['subdomains'], run_output_dir,
+                                        resolver=self.resolver),
+                        target_domain)
+                    with get_metrics().stage('subdomains', items_in=len(recon_results['subdomains'])) as stage:
+                        stage['items_out'] = len(active_module.run(on_subdomain=subdomain_queue.put)['subdomains'])
+            finally:
+                subdomain_queue.put(None)
+
+        def probing_stage():
+            try:
+                logger.info(f"  [+] Ejecutando Módulo PROBING en streaming...")
+                with get_metrics().stage('probing') as stage:
+                    probing_module.run_stream(iter_queue(subdomain_queue), run_output_dir, on_live=live_queue.put)
+                    stage['items_out'] = len(probing_module.results['positives']) or len(probing_module.live_lines)
+            finally:
+                live_queue.put(None)
+
+        stages = ThreadPoolExecutor(max_workers=2, thread_name_prefix='stream')
+        futures = [submit_with_context(stages, recon_stage), submit_with_context(stages, probing_stage)]
+        try:
+            if args.urls:
+                logger.info(f"  [+] Ejecutando Módulo URLS en streaming...")
+                urls_module = self._attach_store(UrlsModule(target_domain, args, self.config, []), target_domain)
+                with get_metrics().stage('urls') as stage:
+                    urls_module.run_stream(iter_queue(live_queue), run_output_dir)
+                    stage['items_out'] = urls_module.urls_found
+                self._run_js_secrets(target_domain, urls_module, args)
+            for future in futures:
+                future.result()
+        finally:
+            stages.shutdown(wait=True)
+
+    def _run_active_discovery(self, target_domain, known_subdomains, output_dir, args):
+        """Fuerza bruta DNS y permutaciones; devuelve los subdominios conocidos más los nuevos."""
+        found = self._load_completed_stage(target_domain, 'subdomains', output_dir, args)
+        if found is None:
+            logger.info(f"  [+] Ejecutando Módulo SUBDOMAINS (descubrimiento activo)...")
+            with get_metrics().stage('subdomains', items_in=len(known_subdomains)) as stage:
+                subdomain_module = SubdomainModule(target_domain, args, self.config, known_subdomains, output_dir,
+                                                   resolver=self.resolver)
+                found = self._attach_store(subdomain_module, target_domain).run().get('subdomains', [])
+                stage['items_out'] = len(found)
+            self.checkpoint.mark_done(target_domain, 'subdomains')
+        return sorted(set(known_subdomains) | set(found))
+
     def _run_direct_urls_pipeline(self):
         """Ejecuta SOLO el módulo de URLs directamente sobre la lista de entrada."""
         logger.info("[+] Iniciando en modo Directo (solo --urls)...")
@@ -98,42 +439,132 @@ class Manager:
             return
 
         output_dir = self._setup_main_output_directory()
-        project_name = os.path.basename(os.path.normpath(self.args.output))
-        self._run_urls(project_name, self.targets, output_dir)
+        project_name = os.path.basename(os.path.normpath(output_dir))
+        with target_context(project_name):
+            with get_metrics().stage('urls', items_in=len(self.targets)) as stage:
+                urls_module = self._run_urls(project_name, self.targets, output_dir)
+                stage['items_out'] = urls_module.urls_found
+            self._run_js_secrets(project_name, urls_module, self.args)
         logger.info(f"✅ Procesamiento de URLs finalizado para el proyecto: {project_name}")
 
-    def _run_probing(self, target_name, hosts, output_dir):
-        """Función auxiliar para ejecutar el módulo de sondeo."""
+    def _run_probing(self, target_name, hosts, output_dir, args=None):
+        """
+        Función auxiliar para ejecutar el módulo de sondeo. Devuelve (hosts vivos, hosts
+        que no se pudieron sondear porque su lote falló en todos los intentos).
+        """
+        args = args or self.args
+        if getattr(args, 'incremental', False):
+            if self._probing_mode(args) != 'fast':
+                return self._run_incremental_probing(target_name, hosts, output_dir, args)
+            logger.warning("  [!] El modo incremental necesita la salida JSON de httpx; --recon3 sondea todo.")
         logger.info(f"  [+] Ejecutando Módulo PROBING sobre {len(hosts)} hosts...")
         
-        # Esta lógica ya era correcta y ahora funcionará como esperas.
-        if self.args.recon3:
-            probing_mode = 'fast'
-        elif self.args.recon2 or self.args.all:
-            probing_mode = 'full'
-        else: # Por defecto para recon1
-            probing_mode = 'light'
-            
-        probing_module = ProbingModule(target_name, self.args, self.config, hosts, probing_mode)
+        probing_module = ProbingModule(target_name, args, self.config, hosts, self._probing_mode(args))
+        self._attach_store(probing_module, target_name)
+        probing_module.resolver = self.resolver
         probing_results = probing_module.run(output_dir)
-        
-        if probing_results and 'positives' in probing_results:
-            return [item['url'] for item in probing_results.get('positives', [])]
-        return []
 
-    def _run_urls(self, target_name, hosts, output_dir):
-        """Función auxiliar para ejecutar el módulo de URLs."""
+        # En modo 'fast' httpx solo da URLs; en el resto se devuelven los registros completos.
+        if self._probing_mode(args) == 'fast':
+            return list(probing_module.live_lines), probing_module.failed_hosts
+        return list(probing_results.get('positives', [])), probing_module.failed_hosts
+
+    def _run_incremental_probing(self, target_name, hosts, output_dir, args):
+        """
+        Sondea solo los subdominios nuevos y los vivos con resultados antiguos, fusiona con el
+        estado anterior, escribe el delta y guarda los resultados completos como siempre.
+        """
+        state = IncrementalState(target_name, output_dir)
+        recheck_age = getattr(args, 'recheck_age', None)
+        if recheck_age is None:
+            try:
+                recheck_age = self.config.getfloat('INCREMENTAL', 'RECHECK_AGE_HOURS', fallback=24)
+            except (AttributeError, ValueError):
+                recheck_age = 24
+        to_probe = state.plan(hosts, recheck_age)
+
+        probing_module = ProbingModule(target_name, args, self.config, to_probe, self._probing_mode(args))
+        self._attach_store(probing_module, target_name)
+        probing_module.resolver = self.resolver
+        probed = []
+        probe_results = probing_module.results
+        if to_probe:
+            logger.info(f"  [+] Ejecutando Módulo PROBING (incremental) sobre {len(to_probe)} de {len(hosts)} hosts...")
+            results = probing_module.run(output_dir, save=False)
+            if results['positives'] or results['negatives']:
+                # Los hosts de lotes fallidos y los que descartó la pre-resolución no se sondearon:
+                # conservan su estado anterior. Los de una zona comodín heredan el de su representante.
+                failed = set(probing_module.failed_hosts)
+                members = {member: representative
+                           for member, representative in probing_module.wildcard_members.items()
+                           if representative not in failed}
+                skipped = failed | (set(probing_module.prefiltered_hosts) - set(members))
+                probed = [host for host in to_probe if host not in skipped]
+                copies = probing_module.wildcard_member_results()
+                probe_results = {kind: results[kind] + copies[kind] for kind in ('positives', 'negatives')}
+                if failed:
+                    logger.warning(f"  [!] {len(failed)} hosts de lotes fallidos conservan su estado anterior.")
+            else:
+                # httpx no produjo nada: no damos por muertos a los hosts por un fallo de la herramienta.
+                logger.warning("  [!] El sondeo no devolvió resultados; se conserva el estado anterior de esos hosts.")
+
+        merged, _ = state.update(hosts, probed, probe_results)
+        probing_module.results = merged
+        probing_module.save_results(output_dir)
+        return list(merged['positives']), probing_module.failed_hosts
+
+    def _select_crawl_hosts(self, target_name, live_hosts, output_dir):
+        """
+        URLs que pasan al módulo de URLs. Con registros de httpx completos, los hosts que
+        devuelven la misma página se agrupan y solo se rastrea un representante por grupo.
+        """
+        records = [item for item in live_hosts if isinstance(item, dict)]
+        urls = [item['url'] if isinstance(item, dict) else item for item in live_hosts]
+        if not self.clusterer or len(records) != len(live_hosts):
+            return urls
+        return self.clusterer.select(target_name, records, output_dir)
+
+    def _probing_mode(self, args):
+        """Modo de httpx según el flag de reconocimiento elegido."""
+        # Esta lógica ya era correcta y ahora funcionará como esperas.
+        if args.recon3:
+            return 'fast'
+        elif args.recon2 or args.all:
+            return 'full'
+        return 'light' # Por defecto para recon1
+
+    def _run_urls(self, target_name, hosts, output_dir, args=None):
+        """Función auxiliar para ejecutar el módulo de URLs. Devuelve el módulo (URLs encontradas y JS por host)."""
+        args = args or self.args
         logger.info(f"  [+] Ejecutando Módulo URLS sobre {len(hosts)} hosts/dominios de la lista...")
-        urls_module = UrlsModule(target_name, self.args, self.config, hosts)
+        urls_module = self._attach_store(UrlsModule(target_name, args, self.config, hosts), target_name)
+        if self.checkpoint:
+            # Dentro de la etapa de URLs el avance se guarda host a host.
+            urls_module.completed_hosts = self.checkpoint.completed_hosts(target_name)
+            urls_module.on_host_done = lambda host: self.checkpoint.mark_host_done(target_name, host)
         urls_module.run(output_dir)
+        return urls_module
+
+    def _run_js_secrets(self, target_name, urls_module, args):
+        """Descarga los JS encontrados y busca secretos en su contenido ([SECRETS])."""
+        if not urls_module.js_files or not JsSecretsModule.is_enabled(self.config):
+            return
+        logger.info(f"  [+] Ejecutando Módulo SECRETS sobre los JS de {len(urls_module.js_files)} hosts...")
+        js_count = sum(len(urls) for _, urls in urls_module.js_files.values())
+        with get_metrics().stage('secrets', items_in=js_count) as stage:
+            secrets_module = self._attach_store(JsSecretsModule(target_name, args, self.config), target_name)
+            stage['items_out'] = secrets_module.run(urls_module.js_files)
 
     def _setup_main_output_directory(self):
-        """Prepara el directorio de salida principal."""
+        """Prepara el directorio de salida principal (una sola vez por ejecución)."""
+        if self._main_output_dir:
+            return self._main_output_dir
         output_dir = self.args.output
         if not output_dir:
             output_dir = os.path.join('outputs', f"run_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
         os.makedirs(output_dir, exist_ok=True)
         logger.info(f"💾 Resultados se guardarán en: {output_dir}")
+        self._main_output_dir = output_dir
         return output_dir
 
     def _setup_output_directory_for_target(self, target_name):
@@ -0,0 +1,125 @@
+# be/modules/clustering.py
+
+import logging
+import os
+from urllib.parse import urlparse
+
+from be.modules.utils.helpers import atomic_write_json
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseClusterer:
+    """
+    Agrupa los hosts vivos que sirven la misma página (parking, página por defecto de
+    una CDN, redirección a un SSO...) para rastrear solo uno de cada grupo.
+
+    La huella se construye con los campos que ya extrae ProbingModule: código de estado,
+    título, tecnologías y content-type, más el hash del cuerpo si está disponible. Los
+    tamaños de respuesta se comparan con una tolerancia respecto al menor del grupo (no
+    en cadena), porque estas páginas suelen incluir el propio nombre de host. Solo se
+    agrupan clusters de al menos MIN_CLUSTER_SIZE hosts: dos hosts parecidos se siguen
+    rastreando los dos. Desactivado por defecto ([CLUSTERING] ENABLED).
+    """
+
+    DEFAULT_MIN_CLUSTER_SIZE = 3
+    DEFAULT_SIZE_TOLERANCE = 64
+
+    def __init__(self, min_cluster_size=DEFAULT_MIN_CLUSTER_SIZE, size_tolerance=DEFAULT_SIZE_TOLERANCE):
+        self.min_cluster_size = max(2, min_cluster_size)
+        self.size_tolerance = max(0, size_tolerance)
+
+    @classmethod
+    def from_config(cls, config):
+        """Construye el agrupador con la sección [CLUSTERING]. Devuelve None si está desactivado."""
+        try:
+            if not config.getboolean('CLUSTERING', 'ENABLED', fallback=False):
+                return None
+            return cls(
+                min_cluster_size=config.getint('CLUSTERING', 'MIN_CLUSTER_SIZE', fallback=cls.DEFAULT_MIN_CLUSTER_SIZE),
+                size_tolerance=config.getint('CLUSTERING', 'SIZE_TOLERANCE', fallback=cls.DEFAULT_SIZE_TOLERANCE),
+            )
+        except (AttributeError, ValueError):
+            return None
+
+    @staticmethod
+    def _key(record):
+        if not record.get('status_code'):
+            # Sin datos de respuesta (p. ej. modo 'fast'): no hay nada con qué agruparlo
+            return (None, record.get('url'), '', '', '')
+        return (
+            record.get('status_code'), (record.get('title') or '').strip().lower(),
+            record.get('tech') or '', record.get('content_type') or '', record.get('body_hash') or '',
+        )
+
+    @staticmethod
+    def _preference(url):
+        """Representante: https antes que http y el nombre más corto (normalmente el principal)."""
+        parsed = urlparse(url)
+        return (parsed.scheme != 'https', len(parsed.netloc), url)
+
+    def cluster(self, records):
+        """Devuelve una lista de clusters {'representative', 'members', 'fingerprint'} (todos, incluidos los unitarios)."""
+        by_key = {}
+        for record in records:
+            if record.get('url'):
+                by_key.setdefault(self._key(record), []).append(record)
+
+        clusters = []
+        for key, group in by_key.items():
+            # Dentro de una misma huella van juntos los tamaños a menos de 'size_tolerance' bytes
+            # del primero (el menor) del grupo: la tolerancia no se encadena de un host al siguiente
+            group.sort(key=lambda record: record.get('response_size') or 0)
+            current = [group[0]]
+            for record in group[1:]:
+                anchor_size = current[0].get('response_size') or 0
+                if (record.get('response_size') or 0) - anchor_size <= self.size_tolerance:
+                    current.append(record)
+                else:
+                    clusters.append(self._build(key, current))
+                    current = [record]
+            clusters.append(self._build(key, current))
+        return clusters
+
+    def _build(self, key, records):
+        urls = sorted({record['url'] for record in records}, key=self._preference)
+        status_code, title, tech, content_type, body_hash = key
+        return {
+            'representative': urls[0],
+            'members': urls[1:],
+            'fingerprint': {
+                'status_code': status_code, 'title': title, 'tech': tech, 'content_type': content_type,
+                'body_hash': body_hash,
+                'response_size': sorted({record.get('response_size') or 0 for record in records}),
+            },
+        }
+
+    def select(self, target, records, output_dir=None):
+        """
+        Devuelve las URLs a rastrear: todas las de clusters pequeños y solo el representante
+        de los grandes. Los grupos omitidos se guardan en <objetivo>_clusters.json.
+        """
+        to_crawl, grouped = [], []
+        for cluster in self.cluster(records):
+            to_crawl.append(cluster['representative'])
+            if len(cluster['members']) + 1 >= self.min_cluster_size:
+                grouped.append(cluster)
+            else:
+                to_crawl.extend(cluster['members'])
+
+        skipped = sum(len(cluster['members']) for cluster in grouped)
+        path = os.path.join(output_dir, f"{target.replace('.', '_')}_clusters.json") if output_dir else None
+        if grouped:
+            logger.warning(f"   [Clustering] ⚠️  {len(records)} hosts vivos -> {len(to_crawl)} a rastrear; "
+                           f"{skipped} NO se rastrean ({len(grouped)} grupos con la misma respuesta"
+                           f"{f', lista completa en {path}' if path else ''}).")
+            for cluster in sorted(grouped, key=lambda c: -len(c['members']))[:5]:
+                title = cluster['fingerprint']['title'] or '(sin título)'
+                logger.info(f"   [Clustering]   {len(cluster['members']) + 1} hosts con '{title}' "
+                            f"(HTTP {cluster['fingerprint']['status_code']}) -> {cluster['representative']}")
+        if path:
+            try:
+                atomic_write_json(path, {'target': target, 'clusters': grouped}, indent=4)
+            except OSError as e:
+                logger.warning(f"   [Clustering] No se pudo guardar {path}: {e}")
+        return to_crawl
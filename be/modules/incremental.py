@@ -0,0 +1,124 @@
+# be/modules/incremental.py
+
+import json
+import logging
+import os
+import time
+from datetime import datetime
+
+from be.modules.utils.helpers import atomic_write_json
+
+logger = logging.getLogger(__name__)
+
+
+class IncrementalState:
+    """
+    Estado persistente de un objetivo entre ejecuciones, para re-escaneos incrementales.
+
+    Se guarda en <output_dir>/<objetivo>_state.json con una entrada por subdominio:
+    cuándo se vio por primera/última vez, cuándo se sondeó, si estaba vivo y los
+    registros de httpx (los mismos dicts que produce ProbingModule._parse_httpx_line).
+    """
+
+    # Campos que, si cambian entre ejecuciones, hacen que un host cuente como 'changed'
+    FINGERPRINT_FIELDS = ('url', 'status_code', 'title', 'tech', 'response_size')
+
+    def __init__(self, target, output_dir):
+        self.target = target
+        base_name = target.replace('.', '_')
+        self.state_path = os.path.join(output_dir, f"{base_name}_state.json")
+        self.delta_path = os.path.join(output_dir, f"{base_name}_delta.json")
+        self.hosts = {}
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.state_path, 'r') as f:
+                self.hosts = json.load(f).get('hosts', {})
+            logger.info(f"   [Incremental] Estado previo cargado: {len(self.hosts)} subdominios conocidos.")
+        except FileNotFoundError:
+            logger.info("   [Incremental] Sin estado previo: se sondearán todos los subdominios.")
+        except (json.JSONDecodeError, OSError) as e:
+            logger.warning(f"   [Incremental] Estado previo ilegible ({e}); se empieza de cero.")
+
+    def plan(self, subdomains, recheck_age_hours):
+        """
+        Decide qué sondear: subdominios nuevos y hosts vivos cuyo último sondeo es más
+        antiguo que 'recheck_age_hours'. El resto reutiliza sus resultados anteriores.
+        """
+        now = time.time()
+        max_age = recheck_age_hours * 3600
+        to_probe = []
+        new_count = stale_count = 0
+        for sub in subdomains:
+            entry = self.hosts.get(sub)
+            if entry is None:
+                to_probe.append(sub)
+                new_count += 1
+            elif entry.get('live') and now - entry.get('last_probed', 0) > max_age:
+                to_probe.append(sub)
+                stale_count += 1
+        logger.info(f"   [Incremental] A sondear: {len(to_probe)} ({new_count} nuevos, {stale_count} vivos caducados); "
+                    f"reutilizados: {len(subdomains) - len(to_probe)}.")
+        return to_probe
+
+    def update(self, subdomains, probed_hosts, probe_results):
+        """
+        Incorpora los resultados del sondeo, calcula el delta y devuelve los resultados
+        completos fusionados ({'positives': [...], 'negatives': [...]}) de los subdominios actuales.
+        """
+        now = time.time()
+        previous = {host: self._fingerprint(entry) for host, entry in self.hosts.items() if entry.get('live')}
+
+        records_by_host = {}
+        for kind in ('positives', 'negatives'):
+            for record in probe_results.get(kind, []):
+                records_by_host.setdefault(record.get('host', ''), {'positives': [], 'negatives': []})[kind].append(record)
+
+        for host in subdomains:
+            entry = self.hosts.setdefault(host, {'first_seen': now})
+            entry['last_seen'] = now
+        for host in probed_hosts:
+            records = records_by_host.get(host, {'positives': [], 'negatives': []})
+            entry = self.hosts.setdefault(host, {'first_seen': now, 'last_seen': now})
+            entry['last_probed'] = now
+            entry['live'] = bool(records['positives'])
+            entry['records'] = records
+
+        current = set(subdomains)
+        delta = {'new': [], 'vanished': [], 'changed': []}
+        for host in sorted(current):
+            entry = self.hosts[host]
+            if not entry.get('live'):
+                continue
+            if host not in previous:
+                delta['new'].append(host)
+            elif self._fingerprint(entry) != previous[host]:
+                delta['changed'].append({
+                    'host': host,
+                    'before': [dict(zip(self.FINGERPRINT_FIELDS, values)) for values in previous[host]],
+                    'after': entry['records']['positives'],
+                })
+        for host in sorted(previous):
+            if host not in current or not self.hosts[host].get('live'):
+                delta['vanished'].append(host)
+
+        merged = {'positives': [], 'negatives': []}
+        for host in sorted(current):
+            records = self.hosts[host].get('records', {})
+            merged['positives'].extend(records.get('positives', []))
+            merged['negatives'].extend(records.get('negatives', []))
+
+        self._save(delta)
+        return merged, delta
+
+    def _fingerprint(self, entry):
+        positives = entry.get('records', {}).get('positives', [])
+        return sorted(tuple(record.get(field) for field in self.FINGERPRINT_FIELDS) for record in positives)
+
+    def _save(self, delta):
+        generated = datetime.now().isoformat(timespec='seconds')
+        atomic_write_json(self.state_path, {'target': self.target, 'updated': generated, 'hosts': self.hosts})
+        atomic_write_json(self.delta_path, {'target': self.target, 'generated': generated, **delta}, indent=4)
+        logger.info(f"   [Incremental] Delta: {len(delta['new'])} nuevos, {len(delta['vanished'])} desaparecidos, "
+                    f"{len(delta['changed'])} cambiados -> {self.delta_path}")
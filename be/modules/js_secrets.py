@@ -0,0 +1,260 @@
+# be/modules/js_secrets.py
+
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import re
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait
+from urllib.parse import urlsplit
+
+import requests
+import urllib3
+
+from .utils.helpers import submit_with_context, atomic_write_json
+from .utils.http_client import build_session
+from .utils.cache import ContentHashCache
+from .utils import secret_scan
+
+logger = logging.getLogger(__name__)
+
+# Las descargas no validan certificados (como httpx y el sondeo nativo): sin avisos por cada una
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+
+class JsSecretsModule:
+    """
+    Etapa posterior a la clasificación de URLs: descarga los JS encontrados (categoría
+    jsfiles) con una sesión con pool de conexiones y un límite de descargas simultáneas
+    por host, calcula el SHA-256 de cada contenido y analiza cada contenido distinto una
+    sola vez con los patrones de secretos, en un pool de procesos. Los contenidos ya
+    analizados en ejecuciones anteriores (caché por hash) no se vuelven a analizar.
+    Los hallazgos se guardan por host (secrets.json y el almacén de resultados).
+    """
+
+    # Valores por defecto de la sección [SECRETS] de la configuración
+    DEFAULT_DOWNLOAD_WORKERS = 20
+    DEFAULT_PER_HOST_DOWNLOADS = 4
+    DEFAULT_TIMEOUT = 15
+    DEFAULT_MAX_FILE_MB = 5
+    # 0 = un proceso por CPU
+    DEFAULT_SCAN_PROCESSES = 0
+
+    def __init__(self, target, args, config):
+        self.target = target
+        self.args = args
+        self.config = config
+        self.download_workers = self._get_int_option('DOWNLOAD_WORKERS', self.DEFAULT_DOWNLOAD_WORKERS)
+        self.per_host_downloads = self._get_int_option('PER_HOST_DOWNLOADS', self.DEFAULT_PER_HOST_DOWNLOADS)
+        self.timeout = self._get_int_option('TIMEOUT', self.DEFAULT_TIMEOUT)
+        self.max_bytes = self._get_int_option('MAX_FILE_MB', self.DEFAULT_MAX_FILE_MB) * 1024 * 1024
+        self.scan_processes = self._get_int_option('SCAN_PROCESSES', self.DEFAULT_SCAN_PROCESSES, minimum=0) \
+            or os.cpu_count() or 1
+        self.patterns = self._load_patterns()
+        # Huella de los patrones: la caché solo sirve mientras no cambien
+        self.rules = hashlib.sha256(json.dumps(self.patterns).encode()).hexdigest()[:16]
+        # Almacén de resultados (TargetStore) que asigna el Manager; None si está desactivado.
+        self.store = None
+        self.stats = {'urls': 0, 'downloaded': 0, 'failed': 0, 'unique': 0, 'cached': 0, 'scanned': 0}
+        self._lock = threading.Lock()
+        self._host_slots = defaultdict(lambda: threading.BoundedSemaphore(self.per_host_downloads))
+
+    @staticmethod
+    def is_enabled(config):
+        try:
+            return config.getboolean('SECRETS', 'ENABLED', fallback=True)
+        except (AttributeError, ValueError):
+            return True
+
+    def _get_int_option(self, option, default, minimum=1):
+        """Lee un entero de la sección [SECRETS] con un valor por defecto."""
+        try:
+            return max(minimum, self.config.getint('SECRETS', option, fallback=default))
+        except (AttributeError, ValueError):
+            return default
+
+    def _load_patterns(self):
+        """SECRETS_JS de [URL_PATTERNS] más los PATTERN_<NOMBRE> de [SECRETS], ya validados."""
+        patterns = []
+        try:
+            if self.config.has_option('URL_PATTERNS', 'SECRETS_JS'):
+                patterns.append(('secrets_js', self.config.get('URL_PATTERNS', 'SECRETS_JS', raw=True)))
+            if self.config.has_section('SECRETS'):
+                patterns.extend((key[len('pattern_'):], value) for key, value in self.config.items('SECRETS', raw=True)
+                                if key.startswith('pattern_') and value.strip())
+        except AttributeError:
+            return []
+        valid = []
+        for name, pattern in patterns:
+            try:
+                re.compile(pattern)
+                valid.append((name, pattern))
+            except re.error as e:
+                logger.error(f"   [Secrets] ❌ Error compilando el patrón '{name}': {e}")
+        return valid
+
+    def _open_cache(self):
+        try:
+            path = self.config.get('SECRETS', 'HASH_CACHE', fallback=ContentHashCache.DEFAULT_PATH).strip()
+        except (AttributeError, ValueError):
+            path = ContentHashCache.DEFAULT_PATH
+        if not path or getattr(self.args, 'refresh', False):
+            return None
+        try:
+            return ContentHashCache(path)
+        except Exception as e:
+            logger.warning(f"   [Secrets] No se pudo abrir la caché de hashes {path}: {e}")
+            return None
+
+    def run(self, js_files):
+        """
+        js_files: {host: (directorio de salida del host, URLs JS)}, como lo deja UrlsModule.
+        Devuelve el número de hallazgos.
+        """
+        url_hosts = {}
+        for host, (_, urls) in js_files.items():
+            for url in urls:
+                url_hosts.setdefault(url, host)
+        if not url_hosts or not self.patterns:
+            return 0
+        self.stats['urls'] = len(url_hosts)
+        logger.info(f"   [Secrets] Descargando {len(url_hosts)} archivos JS de {len(js_files)} hosts "
+                    f"({self.download_workers} descargas, {self.per_host_downloads} por host; "
+                    f"{len(self.patterns)} patrones en {self.scan_processes} procesos)...")
+
+        cache = self._open_cache()
+        session = build_session(pool_size=self.download_workers, retries=1, backoff=0.5,
+                                user_agent=getattr(self.args, 'user_agent', None))
+        session.headers['Accept'] = '*/*'
+        # sha256 -> {'urls': [(host, url)], 'size', 'findings' o 'future'}
+        contents = {}
+        # Contenidos pendientes de analizar como máximo: acota la memoria si la descarga va más rápida
+        scan_slots = threading.BoundedSemaphore(self.scan_processes * 2)
+        # 'spawn': el proceso principal tiene muchos hilos y hacer fork con ellos no es seguro
+        scan_pool = ProcessPoolExecutor(max_workers=self.scan_processes, mp_context=multiprocessing.get_context('spawn'),
+                                        initializer=secret_scan.init_worker, initargs=(self.patterns,))
+        try:
+            with ThreadPoolExecutor(max_workers=self.download_workers, thread_name_prefix='js-download') as downloads:
+                futures = [submit_with_context(downloads, self._fetch, session, url, host, contents, cache,
+                                               scan_pool, scan_slots)
+                           for url, host in url_hosts.items()]
+                for future in futures:
+                    try:
+                        future.result()
+                    except Exception as e:
+                        logger.error(f"   [Secrets] ❌ Error inesperado en una descarga: {e}")
+            self._collect_scans(contents, cache)
+        finally:
+            scan_pool.shutdown(wait=True, cancel_futures=True)
+            session.close()
+            if cache:
+                cache.close()
+
+        found = self._save_findings(js_files, contents)
+        logger.info(f"   [Secrets] {self.stats['downloaded']} JS descargados ({self.stats['failed']} fallidos), "
+                    f"{self.stats['unique']} contenidos distintos: {self.stats['scanned']} analizados, "
+                    f"{self.stats['cached']} ya vistos. {found} hallazgos.")
+        return found
+
+    def _fetch(self, session, url, host, contents, cache, scan_pool, scan_slots):
+        """Descarga un JS y, si su contenido es nuevo, lo envía al pool de análisis."""
+        content = self._download(session, url)
+        if content is None:
+            return
+        sha256 = hashlib.sha256(content).hexdigest()
+        with self._lock:
+            self.stats['downloaded'] += 1
+            entry = contents.get(sha256)
+            if entry is not None:
+                # Mismo bundle desde otra URL: se analiza una sola vez
+                entry['urls'].append((host, url))
+                return
+            entry = contents[sha256] = {'urls': [(host, url)], 'size': len(content)}
+            self.stats['unique'] += 1
+
+        cached = cache.get(sha256, self.rules) if cache else None
+        if cached is not None:
+            entry['findings'] = cached
+            with self._lock:
+                self.stats['cached'] += 1
+            return
+        scan_slots.acquire()
+        try:
+            future = scan_pool.submit(secret_scan.scan_content, content)
+        except Exception:
+            scan_slots.release()
+            raise
+        future.add_done_callback(lambda _: scan_slots.release())
+        entry['future'] = future
+
+    def _download(self, session, url):
+        """Contenido del JS (como mucho MAX_FILE_MB), o None si no se pudo descargar o no es un JS."""
+        with self._lock:
+            slot = self._host_slots[urlsplit(url).netloc.lower()]
+        with slot:
+            try:
+                with session.get(url, timeout=self.timeout, stream=True, verify=False) as response:
+                    if response.status_code != 200:
+                        logger.debug(f"   [Secrets] {url} -> HTTP {response.status_code}")
+                        return None
+                    if 'text/html' in response.headers.get('Content-Type', ''):
+                        # Página de error o SPA que responde 200 a cualquier ruta
+                        return None
+                    chunks, size = [], 0
+                    for chunk in response.iter_content(chunk_size=65536):
+                        chunks.append(chunk)
+                        size += len(chunk)
+                        if size >= self.max_bytes:
+                            logger.debug(f"   [Secrets] {url} supera {self.max_bytes // 1048576} MB; se analiza truncado.")
+                            break
+                    return b''.join(chunks)[:self.max_bytes]
+            except (requests.RequestException, ValueError) as e:
+                logger.debug(f"   [Secrets] No se pudo descargar {url}: {e}")
+                with self._lock:
+                    self.stats['failed'] += 1
+                return None
+
+    def _collect_scans(self, contents, cache):
+        """Espera a los análisis pendientes y guarda sus resultados en la caché de hashes."""
+        pending = {sha256: entry['future'] for sha256, entry in contents.items() if 'future' in entry}
+        wait(pending.values())
+        for sha256, future in pending.items():
+            entry = contents[sha256]
+            try:
+                entry['findings'] = future.result()
+            except Exception as e:
+                logger.error(f"   [Secrets] ❌ Falló el análisis de {entry['urls'][0][1]}: {e}")
+                entry['findings'] = []
+                continue
+            self.stats['scanned'] += 1
+            if cache:
+                cache.put(sha256, self.rules, entry['size'], entry['urls'][0][1], entry['findings'])
+
+    def _save_findings(self, js_files, contents):
+        """Reparte los hallazgos de cada contenido entre las URLs (y hosts) que lo sirven."""
+        by_host = defaultdict(list)
+        for sha256, entry in contents.items():
+            for host, url in entry['urls']:
+                by_host[host].extend({'url': url, 'sha256': sha256, **finding} for finding in entry.get('findings', []))
+
+        write_files = self.store is None or self.store.write_files
+        total = 0
+        for host, findings in by_host.items():
+            if not findings:
+                continue
+            total += len(findings)
+            if self.store:
+                self.store.add_secrets(host, findings)
+            if write_files:
+                path = os.path.join(js_files[host][0], 'secrets.json')
+                try:
+                    atomic_write_json(path, findings, indent=4)
+                except OSError as e:
+                    logger.error(f"   [Secrets] ❌ No se pudo guardar {path}: {e}")
+                    continue
+            rules = sorted({finding['rule'] for finding in findings})
+            logger.info(f"   [Secrets] 🔑 {len(findings)} posibles secretos en '{host}' ({', '.join(rules)})")
+        return total
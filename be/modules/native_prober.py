@@ -0,0 +1,180 @@
+# be/modules/native_prober.py
+
+import asyncio
+import hashlib
+import html
+import logging
+import re
+import socket
+from collections import defaultdict
+
+try:
+    import aiohttp
+except ImportError: # Dependencia opcional: solo la necesita el motor de sondeo nativo
+    aiohttp = None
+
+logger = logging.getLogger(__name__)
+
+_TITLE = re.compile(rb'<title[^>]*>(.*?)</title>', re.IGNORECASE | re.DOTALL)
+_DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+class NativeProber:
+    """
+    Motor de sondeo HTTP en proceso (asyncio + aiohttp), alternativo al binario httpx.
+
+    Usa una única sesión con pool de conexiones, limita las peticiones simultáneas en
+    total y por IP de destino, y genera directamente los mismos registros que
+    ProbingModule._parse_httpx_line (url, host, ip, scheme, port, status_code, title,
+    content_type, response_size...), sin JSON intermedio. Como httpx, no sigue
+    redirecciones ni valida certificados. No detecta tecnologías, CNAME ni CDN: 'tech' y
+    'cname' quedan siempre vacíos y 'cdn' a False.
+    """
+
+    # Bytes del cuerpo que se leen como máximo (para el título y el tamaño)
+    MAX_BODY = 1024 * 1024
+    # Orden en que se prueba cada host en modo first_only
+    FIRST_ONLY_PORTS = (('https', 443), ('http', 80))
+
+    def __init__(self, ports, timeout=10, concurrency=200, per_ip_limit=20, user_agent=None,
+                 resolver=None, first_only=False, body_hash=False):
+        self.ports = [int(port) for port in ports]
+        self.timeout = timeout
+        self.concurrency = max(1, concurrency)
+        self.per_ip_limit = max(1, per_ip_limit)
+        self.user_agent = user_agent
+        # AsyncResolver compartido: si ya resolvió el host (pre-resolución), se reutiliza su IP
+        self.resolver = resolver
+        # Modo 'fast': basta con la primera URL que responda (https y después http)
+        self.first_only = first_only
+        # Añade 'body_hash' (sha256 del cuerpo leído), como httpx con -hash sha256
+        self.body_hash = body_hash
+
+    @staticmethod
+    def available():
+        return aiohttp is not None
+
+    def probe_many(self, hosts, on_result):
+        """
+        Sondea un iterable de hosts (lista o cola que se va llenando) y llama a
+        on_result(host, positivos, negativos) al terminar cada uno. Bloquea hasta acabar.
+        """
+        if aiohttp is None:
+            raise RuntimeError("aiohttp no está instalado (pip install aiohttp)")
+        asyncio.run(self._run(hosts, on_result))
+
+    async def _run(self, hosts, on_result):
+        loop = asyncio.get_running_loop()
+        self._requests = asyncio.Semaphore(self.concurrency)
+        self._ip_slots = defaultdict(lambda: asyncio.Semaphore(self.per_ip_limit))
+        self._addresses = {}
+        host_slots = asyncio.Semaphore(self.concurrency)
+        connector = aiohttp.TCPConnector(limit=self.concurrency, ssl=False, ttl_dns_cache=300)
+        headers = {'User-Agent': self.user_agent} if self.user_agent else None
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout, headers=headers) as session:
+            pending = set()
+
+            async def probe(host):
+                try:
+                    positives, negatives = await self._probe_host(session, host)
+                    on_result(host, positives, negatives)
+                except Exception as e:
+                    logger.warning(f"   [Probing] Error inesperado sondeando {host}: {e}")
+                finally:
+                    host_slots.release()
+
+            iterator = iter(hosts)
+            # Una cola (modo streaming) puede bloquear: se lee desde un hilo para no parar el bucle
+            blocking = not isinstance(hosts, (list, tuple, set))
+            while True:
+                host = await loop.run_in_executor(None, next, iterator, None) if blocking else next(iterator, None)
+                if host is None:
+                    break
+                host = host.strip()
+                if not host:
+                    continue
+                await host_slots.acquire()
+                task = asyncio.create_task(probe(host))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+            if pending:
+                await asyncio.gather(*pending)
+
+    async def _probe_host(self, session, host):
+        """Prueba los puertos de un host. Devuelve (positivos, negativos)."""
+        ip = await self._ip_for(host)
+        if ip is None:
+            return [], [self._record(host, '', '', 0, 0)]
+        if self.first_only:
+            for scheme, port in self.FIRST_ONLY_PORTS:
+                record = await self._fetch(session, host, ip, scheme, port)
+                if record:
+                    return [record], []
+            return [], [self._record(host, '', ip, 0, 0)]
+
+        records = await asyncio.gather(*(self._probe_port(session, host, ip, port) for port in self.ports))
+        positives = [record for record in records if record]
+        return positives, ([] if positives else [self._record(host, '', ip, 0, 0)])
+
+    async def _probe_port(self, session, host, ip, port):
+        """Como httpx: en 443/8443 primero https y después http; en el resto, al revés."""
+        schemes = ('https', 'http') if port in (443, 8443) else ('http', 'https')
+        for scheme in schemes:
+            record = await self._fetch(session, host, ip, scheme, port)
+            if record:
+                return record
+        return None
+
+    async def _fetch(self, session, host, ip, scheme, port):
+        url = f"{scheme}://{host}" if _DEFAULT_PORTS[scheme] == port else f"{scheme}://{host}:{port}"
+        try:
+            async with self._ip_slots[ip], self._requests:
+                async with session.get(url, allow_redirects=False) as response:
+                    body = await response.content.read(self.MAX_BODY)
+                    length = response.headers.get('Content-Length')
+                    record = self._record(
+                        host, url, ip, port, response.status, scheme=scheme, title=self._extract_title(body),
+                        content_type=response.headers.get('Content-Type', '').split(';')[0].strip(),
+                        response_size=int(length) if length and length.isdigit() else len(body),
+                    )
+                    if self.body_hash:
+                        record['body_hash'] = hashlib.sha256(body).hexdigest()
+                    return record
+        except (aiohttp.ClientError, asyncio.TimeoutError, OSError, ValueError):
+            return None
+
+    async def _ip_for(self, host):
+        """IP de destino (para el límite por IP). Usa la caché del resolver compartido si la hay."""
+        if host in self._addresses:
+            return self._addresses[host]
+        ip = None
+        cached = self.resolver.cache.get(host) if self.resolver else None
+        if cached and cached.addresses:
+            ip = cached.addresses[0]
+        else:
+            try:
+                infos = await asyncio.get_running_loop().getaddrinfo(host, None, type=socket.SOCK_STREAM)
+                ip = infos[0][4][0] if infos else None
+            except (socket.gaierror, UnicodeError, OSError):
+                ip = None
+        self._addresses[host] = ip
+        return ip
+
+    @staticmethod
+    def _extract_title(body):
+        match = _TITLE.search(body)
+        if not match:
+            return ''
+        title = match.group(1).decode('utf-8', 'replace')
+        return ' '.join(html.unescape(title).split())
+
+    @staticmethod
+    def _record(host, url, ip, port, status_code, scheme='', title='', content_type='', response_size=0):
+        """Registro con las mismas claves que ProbingModule._parse_httpx_line."""
+        return {
+            'url': url, 'host': host, 'ip': ip, 'scheme': scheme, 'port': port,
+            'status_code': status_code, 'title': title, 'tech': '', 'content_type': content_type,
+            'response_size': response_size, 'cname': '', 'cdn': False,
+        }
@@ -0,0 +1,124 @@
+# be/modules/prefilter.py
+
+import logging
+import os
+import uuid
+
+from be.modules.utils.dns import AsyncResolver
+from be.modules.utils.helpers import atomic_write_json
+
+logger = logging.getLogger(__name__)
+
+
+class DnsPrefilter:
+    """
+    Etapa previa a httpx: resuelve todos los nombres en paralelo y descarta los que no
+    existen (NXDOMAIN), para no gastar un timeout de conexión por puerto en nombres muertos.
+    Los que existen sin registros A (NODATA, p. ej. solo IPv6) pasan a httpx.
+
+    Además detecta zonas con DNS comodín (se resuelven etiquetas aleatorias bajo cada
+    zona padre) y, de los nombres que solo apuntan a las IPs del comodín, conserva uno
+    por zona. Los hosts supervivientes se agrupan por IP en <objetivo>_resolved.json.
+    Tras filter(), 'unresolved' y 'wildcard_members' (host -> representante de su zona)
+    dicen qué nombres se descartaron y por qué.
+    """
+
+    # Etiquetas aleatorias que se resuelven por zona para detectar un comodín
+    WILDCARD_PROBES = 2
+
+    def __init__(self, target, resolver=None, config=None):
+        self.target = target
+        self.resolver = resolver or AsyncResolver.from_config(config)
+        self.unresolved = []
+        self.wildcard_members = {}
+
+    def filter(self, hosts, output_dir=None, write_files=True):
+        """Devuelve la lista de hosts que merece la pena sondear (en el orden original)."""
+        hosts = list(dict.fromkeys(hosts))
+        if not hosts:
+            return hosts
+        answers = {}
+        try:
+            stats = self.resolver.resolve_many(hosts, lambda answer: answers.__setitem__(answer.name, answer))
+        except OSError as e:
+            logger.warning(f"   [Prefilter] No se pudo usar el resolver DNS ({e}); se sondean todos los hosts.")
+            return hosts
+
+        if not answers and not any(host.lower().rstrip('.') in self.resolver.cache for host in hosts):
+            # Ni una sola respuesta (todo timeouts): el que falla es el resolver, no los nombres.
+            logger.warning("   [Prefilter] El resolver DNS no responde; se sondean todos los hosts.")
+            return hosts
+
+        wildcards = self._detect_wildcards(answers)
+        kept, unresolved, no_ipv4, wildcard_hits, representatives = [], [], [], [], {}
+        for host in hosts:
+            name = host.lower().rstrip('.')
+            answer = answers.get(name)
+            if answer is None:
+                if self.resolver.is_nxdomain(name):
+                    unresolved.append(host) # NXDOMAIN: confirmado que no existe
+                else:
+                    # Sin registros A (NODATA, p. ej. solo AAAA) o sin respuesta: que lo decida httpx
+                    if name in self.resolver.cache:
+                        no_ipv4.append(host)
+                    kept.append(host)
+                continue
+            zone = self._parent(answer.name)
+            wildcard_ips = wildcards.get(zone)
+            if wildcard_ips and set(answer.addresses) <= wildcard_ips:
+                if zone in representatives:
+                    wildcard_hits.append(host)
+                    self.wildcard_members[host] = representatives[zone]
+                    continue
+                representatives[zone] = host
+            kept.append(host)
+
+        ip_groups = {}
+        for host in kept:
+            answer = answers.get(host.lower().rstrip('.'))
+            for address in (answer.addresses if answer else ()):
+                ip_groups.setdefault(address, []).append(host)
+
+        logger.info(f"   [Prefilter] {len(kept)} de {len(hosts)} hosts pasan a httpx: {len(unresolved)} no existen, "
+                    f"{len(no_ipv4)} sin registros A, {len(wildcard_hits)} descartados por DNS comodín, "
+                    f"{len(ip_groups)} IPs distintas ({stats['queries']} consultas, {stats['cache_hits']} desde caché).")
+        if output_dir and write_files:
+            self._save(output_dir, ip_groups, unresolved, wildcards, wildcard_hits, no_ipv4)
+        self.unresolved = unresolved
+        return kept
+
+    def _parent(self, name):
+        return name.split('.', 1)[1] if '.' in name else name
+
+    def _detect_wildcards(self, answers):
+        """Resuelve etiquetas aleatorias bajo cada zona padre con nombres resueltos. Devuelve {zona: IPs}."""
+        zones = {self._parent(name) for name in answers}
+        zones = {zone for zone in zones if zone == self.target or zone.endswith('.' + self.target)}
+        probes = {f"{uuid.uuid4().hex[:12]}.{zone}": zone for zone in zones for _ in range(self.WILDCARD_PROBES)}
+        wildcards = {}
+
+        def on_answer(answer):
+            wildcards.setdefault(probes[answer.name], set()).update(answer.addresses)
+
+        try:
+            self.resolver.resolve_many(probes, on_answer)
+        except OSError as e:
+            logger.warning(f"   [Prefilter] No se pudo comprobar el DNS comodín: {e}")
+        for zone, addresses in sorted(wildcards.items()):
+            logger.info(f"   [Prefilter] ⚠️  DNS comodín en *.{zone} ({', '.join(sorted(addresses))}).")
+        return wildcards
+
+    def _save(self, output_dir, ip_groups, unresolved, wildcards, wildcard_hits, no_ipv4=()):
+        base_name = self.target.replace('.', '_')
+        path = os.path.join(output_dir, f"{base_name}_resolved.json")
+        data = {
+            'ip_groups': {ip: sorted(hosts) for ip, hosts in sorted(ip_groups.items())},
+            'wildcards': {zone: sorted(addresses) for zone, addresses in sorted(wildcards.items())},
+            'wildcard_filtered': sorted(wildcard_hits),
+            'unresolved': sorted(unresolved),
+            'no_ipv4': sorted(no_ipv4),
+        }
+        try:
+            atomic_write_json(path, data, indent=4)
+        except OSError as e:
+            logger.warning(f"   [Prefilter] No se pudo guardar {path}: {e}")
@@ -1,8 +1,12 @@
 import logging
 import json
 import os
+import shutil
 import tempfile
-from be.modules.utils.helpers import execute_command
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from be.modules.utils.helpers import stream_command, submit_with_context
+from be.modules.prefilter import DnsPrefilter
+from be.modules.native_prober import NativeProber
 from urllib.parse import urlparse
 
 logger = logging.getLogger(__name__)
@@ -12,6 +16,13 @@ class ProbingModule:
     PORTS_LIGHT = '80,443,8080,8443'
     PORTS_FULL = '80,81,443,3000,8000,8008,8080,8081,8088,8443,8888,9000,9090'
 
+    DEFAULT_BATCH_SIZE = 500
+    DEFAULT_BATCH_WORKERS = 3
+    DEFAULT_BATCH_RETRIES = 2
+    # Motor nativo (aiohttp): peticiones simultáneas en total y por IP de destino
+    DEFAULT_NATIVE_CONCURRENCY = 200
+    DEFAULT_NATIVE_PER_IP = 20
+
     def __init__(self, target, args, config, subdomains, probing_mode='light'):
         self.target = target
         self.args = args
@@ -19,41 +30,353 @@ class ProbingModule:
         self.subdomains = subdomains
         self.probing_mode = probing_mode
         self.results = {'positives': [], 'negatives': []}
+        # En modo 'fast' httpx solo imprime URLs vivas: se guardan aquí tal cual.
+        self.live_lines = []
+        # Hosts de lotes que fallaron en todos los intentos: no se sabe si están vivos
+        self.failed_hosts = []
+        # Hosts que descartó la pre-resolución DNS sin sondearlos (NXDOMAIN y miembros de una
+        # zona comodín) y, de estos últimos, el representante que sí se sondeó: host -> host
+        self.prefiltered_hosts = []
+        self.wildcard_members = {}
+        # Almacén de resultados (TargetStore) que asigna el Manager; None si está desactivado.
+        self.store = None
+        # Reparto en lotes ([PROBING] en la configuración)
+        self.batch_size = self._get_int_option('BATCH_SIZE', self.DEFAULT_BATCH_SIZE)
+        self.batch_workers = self._get_int_option('BATCH_WORKERS', self.DEFAULT_BATCH_WORKERS)
+        self.batch_retries = self._get_int_option('BATCH_RETRIES', self.DEFAULT_BATCH_RETRIES, minimum=0)
+        self.batch_timeout = self._get_int_option('BATCH_TIMEOUT', 0, minimum=0) or None
+        # Pre-resolución DNS antes de httpx; el Manager puede asignar un resolver compartido.
+        self.pre_resolve = self._get_bool_option('PRE_RESOLVE', True)
+        self.resolver = None
+        # Motor de sondeo: 'httpx' (binario externo) o 'native' (aiohttp en proceso)
+        self.engine = (getattr(args, 'prober', None) or self._get_str_option('ENGINE', 'httpx')).lower()
+        # Hash del cuerpo en cada registro, para agrupar respuestas idénticas ([CLUSTERING] BODY_HASH)
+        try:
+            self.body_hash = config.getboolean('CLUSTERING', 'BODY_HASH', fallback=False)
+        except (AttributeError, ValueError):
+            self.body_hash = False
         if self.args.output:
             os.makedirs(self.args.output, exist_ok=True)
 
-    def run(self, output_dir):
+    def _get_int_option(self, option, default, minimum=1):
+        """Lee un entero de la sección [PROBING] con un valor por defecto."""
+        try:
+            return max(minimum, self.config.getint('PROBING', option, fallback=default))
+        except (AttributeError, ValueError):
+            return default
+
+    def _get_str_option(self, option, default):
+        """Lee una cadena de la sección [PROBING] con un valor por defecto."""
+        try:
+            return self.config.get('PROBING', option, fallback=default) or default
+        except AttributeError:
+            return default
+
+    def _get_bool_option(self, option, default):
+        """Lee un booleano de la sección [PROBING] con un valor por defecto."""
+        try:
+            return self.config.getboolean('PROBING', option, fallback=default)
+        except (AttributeError, ValueError):
+            return default
+
+    def run(self, output_dir, save=True):
+        """
+        Sondea self.subdomains repartiéndolos en lotes que se ejecutan como varios procesos
+        httpx en paralelo. Los resultados de cada lote se fusionan en cuanto termina y se
+        apuntan en un archivo parcial, de modo que un lote fallido se reintenta solo y un
+        corte no obliga a repetir los lotes ya completados (con --resume).
+        Los hosts de los lotes que fallan en todos los intentos quedan en self.failed_hosts
+        y el archivo parcial se conserva para que --resume los vuelva a sondear.
+        Con save=False no escribe los archivos finales (el llamador fusiona y guarda).
+        """
         if not self.subdomains:
             logger.info("   [Probing] No hay subdominios para sondear.")
             return self.results
 
         httpx_path = self.config.get('TOOLS', 'HTTPX_PATH', fallback=None)
-        if not httpx_path:
-            logger.error("   [Probing] ❌ HTTPX_PATH no está configurado.")
+        engine = self._select_engine(httpx_path)
+        if engine is None:
+            return self.results
+
+        partial_path = self._partial_path(output_dir)
+        pending = self._restore_partial(partial_path) if getattr(self.args, 'resume', False) else list(self.subdomains)
+        if not getattr(self.args, 'resume', False) and os.path.exists(partial_path):
+            os.remove(partial_path)
+        if self.pre_resolve and pending:
+            # Solo nombres que resuelven (y uno por zona comodín) llegan a httpx
+            write_files = self.store is None or self.store.write_files
+            prefilter = DnsPrefilter(self.target, self.resolver, self.config)
+            pending = prefilter.filter(pending, output_dir, write_files)
+            self.wildcard_members = prefilter.wildcard_members
+            self.prefiltered_hosts = prefilter.unresolved + list(prefilter.wildcard_members)
+        if engine == 'native':
+            self._run_native(pending, partial_path)
+            if save:
+                self.save_results(output_dir)
             return self.results
 
-        logger.info(f"   [Probing] Iniciando sondeo ({self.probing_mode.upper()}) de {len(self.subdomains)} objetivos...")
+        batches = [pending[i:i + self.batch_size] for i in range(0, len(pending), self.batch_size)]
+        workers = min(self.batch_workers, len(batches)) or 1
+
+        logger.info(f"   [Probing] Iniciando sondeo ({self.probing_mode.upper()}) de {len(pending)} objetivos "
+                    f"en {len(batches)} lotes ({workers} procesos httpx en paralelo)...")
+        if self.probing_mode == 'fast':
+            print("\n--- Resultados de Httpx (Hosts Vivos) ---\n")
 
-        with tempfile.NamedTemporaryFile(mode='w+', delete=True, prefix='targets_') as tmpfile:
-            tmpfile.write('\n'.join(self.subdomains))
-            tmpfile.flush()
-            self._run_httpx(httpx_path, tmpfile.name, output_dir)
+        failed = 0
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='httpx') as pool:
+            futures = [submit_with_context(pool, self._probe_batch, httpx_path, index, batch)
+                       for index, batch in enumerate(batches, 1)]
+            for future in as_completed(futures):
+                batch, batch_results, batch_live = future.result()
+                if batch_results is None:
+                    failed += 1
+                    self.failed_hosts.extend(batch)
+                    self._append_failed(partial_path, batch)
+                    continue
+                self.results['positives'].extend(batch_results['positives'])
+                self.results['negatives'].extend(batch_results['negatives'])
+                self.live_lines.extend(batch_live)
+                self._append_partial(partial_path, batch, batch_results, batch_live)
 
+        if self.probing_mode == 'fast':
+            print("----------------------------------------\n")
+        if failed:
+            logger.error(f"   [Probing] ❌ {failed} de {len(batches)} lotes ({len(self.failed_hosts)} hosts) fallaron "
+                         f"tras {self.batch_retries} reintentos; quedan pendientes para --resume.")
+        if save:
+            self.save_results(output_dir)
         return self.results
 
-    def _run_httpx(self, httpx_path, input_file, output_dir):
+    def _select_engine(self, httpx_path):
+        """
+        Elige el motor de sondeo. Con 'httpx' se usa el binario si existe; si no, se recurre
+        al motor nativo cuando aiohttp está disponible. Devuelve None si no hay ninguno.
+        """
+        if self.engine == 'native':
+            if NativeProber.available():
+                return 'native'
+            logger.error("   [Probing] ❌ El motor nativo necesita aiohttp (pip install aiohttp).")
+            return None
+        if httpx_path and shutil.which(httpx_path):
+            return 'httpx'
+        reason = "no está configurado" if not httpx_path else f"no se encuentra ({httpx_path})"
+        if NativeProber.available():
+            logger.warning(f"   [Probing] HTTPX_PATH {reason}; se usa el motor de sondeo nativo.")
+            return 'native'
+        logger.error(f"   [Probing] ❌ HTTPX_PATH {reason} y aiohttp no está instalado para el motor nativo.")
+        return None
+
+    def _native_prober(self):
+        ports = self.PORTS_FULL if self.probing_mode == 'full' else self.PORTS_LIGHT
+        return NativeProber(
+            ports=ports.split(','),
+            timeout=self.args.timeout,
+            concurrency=self._get_int_option('NATIVE_CONCURRENCY', self.DEFAULT_NATIVE_CONCURRENCY),
+            per_ip_limit=self._get_int_option('NATIVE_PER_IP', self.DEFAULT_NATIVE_PER_IP),
+            user_agent=getattr(self.args, 'user_agent', None),
+            resolver=self.resolver,
+            first_only=self.probing_mode == 'fast',
+            body_hash=self.body_hash,
+        )
+
+    def _run_native(self, host_source, partial_path=None, on_live=None):
+        """
+        Sondea con el motor nativo. Los registros llegan ya estructurados; en modo 'fast'
+        solo se guardan las URLs vivas, como hace httpx. Con 'partial_path', cada
+        BATCH_SIZE hosts terminados se apuntan en el archivo parcial para --resume.
         """
-        Ejecuta httpx. Para el modo 'fast', usa el comando más simple posible para obtener solo hosts vivos.
+        logger.info(f"   [Probing] Sondeo nativo ({self.probing_mode.upper()}) en proceso con aiohttp...")
+        buffer = {'hosts': [], 'positives': [], 'negatives': [], 'live': []}
+
+        def flush():
+            if partial_path and buffer['hosts']:
+                self._append_partial(partial_path, buffer['hosts'],
+                                     {'positives': buffer['positives'], 'negatives': buffer['negatives']},
+                                     buffer['live'])
+            for values in buffer.values():
+                values.clear()
+
+        def on_result(host, positives, negatives):
+            if self.probing_mode == 'fast':
+                live = [record['url'] for record in positives]
+                for url in live:
+                    print(url)
+                self.live_lines.extend(live)
+                buffer['live'].extend(live)
+            else:
+                self.results['positives'].extend(positives)
+                self.results['negatives'].extend(negatives)
+                buffer['positives'].extend(positives)
+                buffer['negatives'].extend(negatives)
+            buffer['hosts'].append(host)
+            if on_live:
+                for record in positives:
+                    on_live(record['url'])
+            if len(buffer['hosts']) >= self.batch_size:
+                flush()
+
+        try:
+            self._native_prober().probe_many(host_source, on_result)
+        except Exception as e:
+            logger.error(f"   [Probing] ❌ Error en el sondeo nativo: {e}")
+        flush()
+
+    def _probe_batch(self, httpx_path, index, batch):
+        """Ejecuta httpx sobre un lote, con reintentos. Devuelve (lote, resultados, urls_vivas) o resultados None."""
+        for attempt in range(1, self.batch_retries + 2):
+            batch_results = {'positives': [], 'negatives': []}
+            batch_live = []
+            with tempfile.NamedTemporaryFile(mode='w+', delete=True, prefix='targets_') as tmpfile:
+                tmpfile.write('\n'.join(batch))
+                tmpfile.flush()
+                command = self._build_httpx_command(httpx_path, tmpfile.name)
+                logger.debug(f"   [Httpx] Lote {index} (intento {attempt}): {' '.join(command)}")
+                try:
+                    lines = stream_command(command, timeout=self.batch_timeout)
+                    self._consume_httpx_output(lines, results=batch_results, live_lines=batch_live)
+                    logger.debug(f"   [Httpx] Lote {index} completado: {len(batch_results['positives'])} vivos.")
+                    return batch, batch_results, batch_live
+                except Exception as e:
+                    logger.warning(f"   [Probing] Lote {index} falló (intento {attempt}): {e}")
+        return batch, None, None
+
+    def _partial_path(self, output_dir):
+        base_name = self.target.replace('.', '_')
+        return os.path.join(output_dir, f"{base_name}_probing_partial.jsonl")
+
+    def _append_partial(self, partial_path, batch, batch_results, batch_live):
+        """Apunta un lote completado (una línea JSON) para poder reanudar sin repetirlo."""
+        try:
+            with open(partial_path, 'a') as f:
+                f.write(json.dumps({'hosts': batch, 'live': batch_live, **batch_results}) + '\n')
+        except OSError as e:
+            logger.warning(f"   [Probing] No se pudo guardar el progreso parcial: {e}")
+
+    def _append_failed(self, partial_path, batch):
+        """Apunta los hosts de un lote fallido. --resume no los cuenta como hechos y los reintenta."""
+        try:
+            with open(partial_path, 'a') as f:
+                f.write(json.dumps({'failed': batch}) + '\n')
+        except OSError as e:
+            logger.warning(f"   [Probing] No se pudo guardar el progreso parcial: {e}")
+
+    def _restore_partial(self, partial_path):
+        """Carga los lotes ya completados de una ejecución anterior y devuelve los hosts pendientes."""
+        done = set()
+        try:
+            with open(partial_path, 'r') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue # Última línea a medio escribir
+                    done.update(entry.get('hosts', []))
+                    self.results['positives'].extend(entry.get('positives', []))
+                    self.results['negatives'].extend(entry.get('negatives', []))
+                    self.live_lines.extend(entry.get('live', []))
+        except FileNotFoundError:
+            return list(self.subdomains)
+        if done:
+            logger.info(f"   [Probing] Reanudando: {len(done)} hosts ya sondeados en lotes anteriores.")
+        return [sub for sub in self.subdomains if sub not in done]
+
+    def run_stream(self, subdomain_source, output_dir, on_live=None):
         """
+        Modo streaming: alimenta httpx por stdin con los subdominios según van llegando
+        (cualquier iterable, normalmente una cola) y procesa cada línea de salida al momento.
+        'on_live' recibe la URL de cada host vivo en cuanto httpx lo reporta.
+        """
+        httpx_path = self.config.get('TOOLS', 'HTTPX_PATH', fallback=None)
+        engine = self._select_engine(httpx_path)
+        if engine is None:
+            # Consumimos la entrada para no bloquear a la etapa anterior.
+            for _ in subdomain_source:
+                pass
+            return self.results
+        if engine == 'native':
+            self._run_native(subdomain_source, on_live=on_live)
+            self.save_results(output_dir)
+            return self.results
+
+        logger.info(f"   [Probing] Iniciando sondeo en streaming ({self.probing_mode.upper()})...")
+        command = self._build_httpx_command(httpx_path)
+        try:
+            lines = stream_command(command, input_lines=subdomain_source, streaming=True)
+            self._consume_httpx_output(lines, on_live)
+        except Exception as e:
+            logger.error(f"   [Probing] ❌ Error al ejecutar httpx: {e}")
+
+        self.save_results(output_dir)
+        return self.results
+
+    def wildcard_member_results(self):
+        """
+        Registros de los miembros de zonas comodín que no se sondearon: copias de los de su
+        representante con el host (y la URL) del miembro. {'positives': [...], 'negatives': [...]}
+        """
+        by_host = {}
+        for kind in ('positives', 'negatives'):
+            for record in self.results[kind]:
+                by_host.setdefault(record.get('host'), []).append((kind, record))
+        copies = {'positives': [], 'negatives': []}
+        for member, representative in self.wildcard_members.items():
+            for kind, record in by_host.get(representative, ()):
+                url = record.get('url') or ''
+                copies[kind].append(dict(record, host=member, url=url.replace(representative, member, 1)))
+        return copies
+
+    def save_results(self, output_dir):
+        """
+        Guarda self.results (JSON + TXT) o, en modo 'fast', la lista de URLs vivas.
+        Con almacén de resultados, además se insertan allí (y los archivos pasan a ser opcionales).
+        """
+        if self.store:
+            live_urls = self.live_lines if self.probing_mode == 'fast' else ()
+            self.store.replace_probes(self.results, live_urls)
+        if self.store is None or self.store.write_files:
+            if self.probing_mode == 'fast':
+                self._save_results_text(self.live_lines, output_dir)
+            else:
+                self._save_results_json(output_dir)
+        # Con los resultados completos en disco, el progreso parcial ya no hace falta
+        # (salvo que haya lotes fallidos: --resume los reintenta a partir de él).
+        partial_path = self._partial_path(output_dir)
+        if not self.failed_hosts and os.path.exists(partial_path):
+            os.remove(partial_path)
+
+    def _consume_httpx_output(self, lines, on_live=None, results=None, live_lines=None):
+        """
+        Procesa la salida de httpx línea a línea según llega. En modo 'fast' cada línea es
+        una URL viva (se imprime y se guarda en live_lines); en el resto se parsea el JSON.
+        Por defecto acumula en self.results / self.live_lines.
+        """
+        live_lines = self.live_lines if live_lines is None else live_lines
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            if self.probing_mode == 'fast':
+                print(line)
+                live_lines.append(line)
+                live_url = line
+            else:
+                live_url = self._parse_httpx_line(line, results)
+            if live_url and on_live:
+                on_live(live_url)
+
+    def _build_httpx_command(self, httpx_path, input_file=None):
+        """Construye la línea de comandos de httpx. Sin 'input_file', httpx lee los objetivos de stdin."""
         logger.debug(f"   [Probing] Modo de sondeo seleccionado: {self.probing_mode.upper()}")
 
-        command = [
-            httpx_path,
-            '-l', input_file,
+        command = [httpx_path]
+        if input_file:
+            command.extend(['-l', input_file])
+        command.extend([
             '-threads', str(self.args.threads),
             '-timeout', str(self.args.timeout),
             '-silent'
-        ]
+        ])
 
         # --- INICIO DE LA MODIFICACIÓN ---
         if self.probing_mode == 'fast':
@@ -75,55 +398,49 @@ class ProbingModule:
                 '-ports', ports,
                 '-retries', '1'
             ])
+            if self.body_hash:
+                command.extend(['-hash', 'sha256'])
         # --- FIN DE LA MODIFICACIÓN ---
-
-        logger.debug(f"   [Httpx] Comando final: {' '.join(command)}")
-
-        try:
-            stdout = execute_command(' '.join(command), timeout=None)
-
-            if self.probing_mode != 'fast':
-                self._parse_httpx_output(stdout)
-                self._save_results_json(output_dir)
-            else:
-                print("\n--- Resultados de Httpx (Hosts Vivos) ---\n")
-                print(stdout)
-                print("----------------------------------------\n")
-                self._save_results_text(stdout, output_dir)
-
-        except Exception as e:
-            logger.error(f"   [Probing] ❌ Error al ejecutar httpx: {e}")
+        return command
 
     def _parse_httpx_output(self, json_lines_output):
         # Esta función no cambia, solo se usa para recon1 y recon2
         for line in json_lines_output.split('\n'):
             line = line.strip()
             if not line: continue
-            try:
-                result = json.loads(line)
-                structured_data = {
-                    'url': result.get('url', ''), 'host': result.get('input', ''),
-                    'ip': result.get('host', ''), 'scheme': result.get('scheme', ''),
-                    'port': int(result.get('port', 0)), 'status_code': int(result.get('status_code', 0)),
-                    'title': result.get('title', ''), 'tech': ', '.join(sorted(set(result.get('tech', [])))),
-                    'content_type': result.get('content_type', ''),
-                    'response_size': int(result.get('content_length', 0)),
-                    'cname': ', '.join(result.get('cname', [])), 'cdn': result.get('cdn', False)
-                }
-                if not result.get('failed', True) and result.get('status_code', 0) > 0:
-                    self.results['positives'].append(structured_data)
-                else:
-                    self.results['negatives'].append(structured_data)
-            except json.JSONDecodeError as e:
-                logger.warning(f"   [Probing] Error al decodificar línea JSON de httpx: {e}.")
+            self._parse_httpx_line(line)
+
+    def _parse_httpx_line(self, line, results=None):
+        """Procesa una línea JSON de httpx. Devuelve la URL si el host está vivo, o None."""
+        results = self.results if results is None else results
+        try:
+            result = json.loads(line)
+            structured_data = {
+                'url': result.get('url', ''), 'host': result.get('input', ''),
+                'ip': result.get('host', ''), 'scheme': result.get('scheme', ''),
+                'port': int(result.get('port', 0)), 'status_code': int(result.get('status_code', 0)),
+                'title': result.get('title', ''), 'tech': ', '.join(sorted(set(result.get('tech', [])))),
+                'content_type': result.get('content_type', ''),
+                'response_size': int(result.get('content_length', 0)),
+                'cname': ', '.join(result.get('cname', [])), 'cdn': result.get('cdn', False)
+            }
+            if self.body_hash:
+                structured_data['body_hash'] = (result.get('hash') or {}).get('body_sha256', '')
+            if not result.get('failed', True) and result.get('status_code', 0) > 0:
+                results['positives'].append(structured_data)
+                return structured_data['url']
+            results['negatives'].append(structured_data)
+        except json.JSONDecodeError as e:
+            logger.warning(f"   [Probing] Error al decodificar línea JSON de httpx: {e}.")
+        return None
 
     # --- INICIO DE LA FUNCIÓN MODIFICADA ---
-    def _save_results_text(self, text_output, output_dir):
+    def _save_results_text(self, live_lines, output_dir):
         """Guarda la salida de texto plano de httpx directamente en positives.txt."""
         
         # La salida ya es una lista limpia de URLs vivas, una por línea.
         # Nos aseguramos de filtrar líneas vacías que puedan aparecer.
-        positives = [line for line in text_output.strip().split('\n') if line]
+        positives = [line for line in live_lines if line]
 
         base_name = self.target.replace('.', '_')
 
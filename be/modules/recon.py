@@ -1,11 +1,18 @@
 # be/modules/recon.py
 
 import logging
-from be.modules.utils.helpers import execute_command
+from be.modules.utils.helpers import stream_command, submit_with_context
+from be.modules.utils.scheduler import get_scheduler
+from be.modules.utils.metrics import get_metrics
+from be.modules.utils.cache import ReconCache
+from be.modules.utils.hosts import normalize_hostname, in_scope, clean_hostnames
+from be.modules.utils.http_client import shared_session, iter_json_array, request_deadline
 import os
 import json
-import tempfile
+import time
+import threading
 import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
 
 logger = logging.getLogger(__name__)
 
@@ -15,6 +22,12 @@ class ReconModule:
     # 5 minutos = 300 segundos.
     RECON_TOOL_TIMEOUT = 300 
     API_TIMEOUT = 320 # Mantenemos un timeout razonable de 2 minutos para las APIs
+    # Plazo global para el conjunto de fuentes: como corren en paralelo, basta con
+    # cubrir la fuente más lenta más un margen.
+    RECON_DEADLINE = 360
+    # Endpoints de las APIs (configurables en [RECON] para apuntar a un mock local)
+    CRTSH_URL = 'https://crt.sh/'
+    URLSCAN_URL = 'https://urlscan.io/api/v1/search/'
 
     def __init__(self, target, args, config, output_dir=None): 
         self.target = target
@@ -22,23 +35,68 @@ class ReconModule:
         self.config = config
         self.output_dir = output_dir 
         self.results = {'subdomains': []} 
+        # Callback opcional (modo streaming) que recibe cada subdominio nuevo en cuanto aparece.
+        self.on_subdomain = None
+        self._emitted = set()
+        self._emit_lock = threading.Lock()
+        # Se activa al agotarse el plazo global: termina las herramientas que sigan en marcha
+        # (o esperando plaza) en lugar de dejarlas huérfanas
+        self._deadline_expired = threading.Event()
+        # Caché persistente por (fuente, dominio). --refresh ignora lo cacheado (pero lo renueva).
+        self.cache = ReconCache.from_config(config)
+        self.refresh = getattr(args, 'refresh', False)
+        # Almacén de resultados (TargetStore) que asigna el Manager; None si está desactivado.
+        self.store = None
+        self.deadline = self._get_int_option('DEADLINE', self.RECON_DEADLINE)
+        # Presupuesto independiente por fuente (p. ej. AMASS_TIMEOUT = 600 en [RECON]).
+        self.timeouts = {
+            name: self._get_int_option(f"{name.upper()}_TIMEOUT", default)
+            for name, default in (
+                ('subdominator', self.RECON_TOOL_TIMEOUT),
+                ('subfinder', self.RECON_TOOL_TIMEOUT),
+                ('amass', self.RECON_TOOL_TIMEOUT),
+                ('urlscan', self.API_TIMEOUT),
+                ('crtsh', self.API_TIMEOUT),
+            )
+        }
 
-    def run(self):
-        """Ejecuta todos los pasos de reconocimiento pasivo."""
+    def _get_int_option(self, option, default):
+        """Lee un entero de la sección [RECON] con un valor por defecto."""
+        try:
+            return self.config.getint('RECON', option, fallback=default)
+        except (AttributeError, ValueError):
+            return default
+
+    def _get_str_option(self, option, default):
+        try:
+            return self.config.get('RECON', option, fallback=default).strip() or default
+        except AttributeError:
+            return default
+
+    def run(self, on_subdomain=None):
+        """
+        Ejecuta todos los pasos de reconocimiento pasivo.
+        Si se indica 'on_subdomain', se invoca con cada subdominio válido y único en cuanto
+        una fuente lo encuentra, sin esperar a que terminen las demás.
+        """
+        self.on_subdomain = on_subdomain
         logger.info(f"   [Recon] Iniciando Reconocimiento Pasivo...")
         self.passive_subdomain_discovery()
         
-        unique_subdomains = list(set(self.results['subdomains']))
-        clean_subdomains = [sub for sub in unique_subdomains if '*' not in sub]
+        unique_subdomains = set(self.results['subdomains'])
+        # Minúsculas, sin esquema/puerto, dentro del dominio raíz y sin emails, wildcards ni basura
+        clean_subdomains = clean_hostnames(unique_subdomains, root_domain=self.target)
         filtered_count = len(unique_subdomains) - len(clean_subdomains)
         if filtered_count > 0:
-            logger.info(f"   [Recon] Se filtraron {filtered_count} subdominios con wildcards para evitar errores.")
+            logger.info(f"   [Recon] Se filtraron o fusionaron {filtered_count} entradas (wildcards, emails, duplicados, fuera de alcance).")
         self.results['subdomains'] = sorted(clean_subdomains)
         
         count = len(self.results['subdomains'])
         logger.info(f"   [Recon] Total de subdominios únicos y válidos encontrados: {count}")
         
-        if self.output_dir and count > 0:
+        if self.store:
+            self.store.add_subdomains(self.results['subdomains'])
+        if self.output_dir and count > 0 and (self.store is None or self.store.write_files):
             self._save_recon_results() 
         return self.results
 
@@ -54,115 +112,284 @@ class ReconModule:
             logger.error("   [Config] Error al cargar rutas de herramientas desde la configuración.")
             return
 
-        self._run_subdominator(tools['subdominator'])
-        self._run_subfinder(tools['subfinder'])
-        self._run_amass(tools['amass'])
-        self._query_urlscan_io()
-        self._query_crt_sh()
+        sources = {
+            'subdominator': lambda: self._run_subdominator(tools['subdominator']),
+            'subfinder': lambda: self._run_subfinder(tools['subfinder']),
+            'amass': lambda: self._run_amass(tools['amass']),
+            'urlscan': self._query_urlscan_io,
+            'crtsh': self._query_crt_sh,
+        }
+        self._run_sources_concurrently(self._apply_cache(sources))
+
+    def _apply_cache(self, sources):
+        """
+        Resuelve desde la caché las fuentes con una entrada vigente y envuelve el resto
+        para que guarden su resultado. Solo se cachean ejecuciones que terminaron bien
+        (las fuentes devuelven None si fallan o agotan su tiempo).
+        """
+        pending = {}
+        for name, func in sources.items():
+            cached = None if self.refresh else self.cache.get(name, self.target)
+            if cached is not None:
+                logger.info(f"   [Cache] {name}: {len(cached)} subdominios desde la caché.")
+                self.results['subdomains'].extend(cached)
+                self._emit(cached)
+                continue
+            pending[name] = self._cached_source(name, func)
+        return pending
+
+    def _cached_source(self, name, func):
+        def run_and_store():
+            result = func()
+            if result is not None:
+                self.cache.put(name, self.target, result)
+            return result
+        return run_and_store
+
+    def _run_sources_concurrently(self, sources):
+        """
+        Lanza todas las fuentes a la vez. Cada una respeta su propio timeout y el conjunto
+        queda acotado por self.deadline; los subdominios se fusionan según termina cada fuente.
+        """
+        if not sources:
+            return
+        logger.info(f"   [Recon] Lanzando {len(sources)} fuentes en paralelo (plazo global: {self.deadline}s)...")
+        start = time.monotonic()
+        executor = ThreadPoolExecutor(max_workers=len(sources), thread_name_prefix='recon')
+        futures = {submit_with_context(executor, func): name for name, func in sources.items()}
+        try:
+            for future in as_completed(futures, timeout=self.deadline):
+                name = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logger.error(f"   [Recon] ❌ La fuente {name} falló: {e}")
+                    get_metrics().count_error('error')
+                    continue
+                if result is None:
+                    get_metrics().count_error('error') # La fuente registró su propio fallo
+                new_subdomains = result or []
+                self.results['subdomains'].extend(new_subdomains)
+                self._emit(new_subdomains)
+                logger.debug(f"   [Recon] {name} terminó en {time.monotonic() - start:.1f}s ({len(new_subdomains)} resultados).")
+        except FuturesTimeoutError:
+            pending = [name for future, name in futures.items() if not future.done()]
+            for _ in pending:
+                get_metrics().count_error('timeout')
+            logger.warning(f"   [Recon] ⏱️ Plazo global de {self.deadline}s agotado. Fuentes sin terminar: {', '.join(pending)}")
+            self._deadline_expired.set()
+        finally:
+            # No esperamos a las fuentes colgadas: las herramientas se cancelan arriba y las
+            # APIs terminan con su propio timeout.
+            executor.shutdown(wait=False, cancel_futures=True)
         
-    # --- Métodos de Ejecución de Herramientas (TODOS USAN EL TIMEOUT FIJO) ---
+    def _emit(self, subdomains):
+        """Entrega al callback de streaming los subdominios que aún no se habían emitido."""
+        if not self.on_subdomain:
+            return
+        with self._emit_lock:
+            for sub in subdomains:
+                sub = normalize_hostname(sub)
+                if not sub or sub in self._emitted or not in_scope(sub, self.target):
+                    continue
+                self._emitted.add(sub)
+                self.on_subdomain(sub)
+
+    def _stream_tool(self, label, command, timeout, parse_line):
+        """
+        Ejecuta una herramienta leyendo su salida línea a línea. Cada subdominio se emite
+        en cuanto aparece y solo se conserva el conjunto de nombres únicos.
+        """
+        new_subdomains = set()
+        for line in stream_command(command, timeout=timeout, cancel_event=self._deadline_expired):
+            sub = parse_line(line)
+            if sub and sub not in new_subdomains:
+                new_subdomains.add(sub)
+                self._emit((sub,))
+        logger.info(f"   [{label}] Encontrados {len(new_subdomains)} subdominios pasivos.")
+        return list(new_subdomains)
+
+    @staticmethod
+    def _parse_plain_line(line):
+        return line.strip() or None
+
+    # --- Métodos de Ejecución de Herramientas (cada una con su propio timeout) ---
+    # Devuelven la lista de subdominios, o None si la fuente falló (para no cachear el fallo).
 
     def _run_subdominator(self, path):
         if not os.path.isfile(path):
              logger.error(f"   [Subdominator] ❌ Error: El ejecutable no existe en: {path}")
-             return
-        subdominator_command = f"{path} -d {self.target}" 
-        logger.info(f"   [Subdominator] Ejecutando (Timeout: {self.RECON_TOOL_TIMEOUT}s)...")
+             return None
+        subdominator_command = [path, '-d', self.target]
+        logger.info(f"   [Subdominator] Ejecutando (Timeout: {self.timeouts['subdominator']}s)...")
         try:
-            stdout = execute_command(subdominator_command, timeout=self.RECON_TOOL_TIMEOUT)
-            new_subdomains = self._parse_subdominator_output(stdout)
-            self.results['subdomains'].extend(new_subdomains)
-            logger.info(f"   [Subdominator] Encontrados {len(new_subdomains)} subdominios pasivos.")
+            return self._stream_tool('Subdominator', subdominator_command, self.timeouts['subdominator'],
+                                     self._parse_subdominator_line)
         except Exception as e:
             logger.error(f"   [Subdominator] ❌ Error al ejecutar o parsear: {e}")
+            return None
 
     def _run_subfinder(self, path):
-        with tempfile.NamedTemporaryFile(mode='w+', delete=True) as tmp_file:
-            command = [path, "-d", self.target, "-all", "-o", tmp_file.name]
-            logger.info(f"   [Subfinder] Ejecutando (Timeout: {self.RECON_TOOL_TIMEOUT}s)...")
-            try:
-                execute_command(' '.join(command), timeout=self.RECON_TOOL_TIMEOUT)
-                tmp_file.seek(0)
-                stdout = tmp_file.read()
-                new_subdomains = [line.strip() for line in stdout.split('\n') if line.strip()]
-                self.results['subdomains'].extend(new_subdomains)
-                logger.info(f"   [Subfinder] Encontrados {len(new_subdomains)} subdominios pasivos.")
-            except Exception as e:
-                logger.error(f"   [Subfinder] ❌ Error al ejecutar o parsear: {e}")
+        # Con -silent subfinder imprime solo los subdominios por stdout, que leemos en streaming.
+        command = [path, "-d", self.target, "-all", "-silent"]
+        command.extend(get_scheduler().thread_args('subfinder').split())
+        logger.info(f"   [Subfinder] Ejecutando (Timeout: {self.timeouts['subfinder']}s)...")
+        try:
+            return self._stream_tool('Subfinder', command, self.timeouts['subfinder'], self._parse_plain_line)
+        except Exception as e:
+            logger.error(f"   [Subfinder] ❌ Error al ejecutar o parsear: {e}")
+            return None
 
     def _run_amass(self, path):
         command = [path, 'enum', '-passive', '-d', self.target]
-        logger.info(f"   [Amass] Ejecutando (Timeout: {self.RECON_TOOL_TIMEOUT}s)...")
+        logger.info(f"   [Amass] Ejecutando (Timeout: {self.timeouts['amass']}s)...")
         try:
-            stdout = execute_command(' '.join(command), timeout=self.RECON_TOOL_TIMEOUT)
-            new_subdomains = [line.strip() for line in stdout.split('\n') if line.strip()]
-            self.results['subdomains'].extend(new_subdomains)
-            logger.info(f"   [Amass] Encontrados {len(new_subdomains)} subdominios pasivos.")
+            return self._stream_tool('Amass', command, self.timeouts['amass'], self._parse_plain_line)
         except Exception as e:
             logger.error(f"   [Amass] ❌ Error al ejecutar o parsear: {e}")
+            return None
 
     # --- Métodos de Consulta a APIs ---
 
+    def _api_budget(self, name):
+        """(sesión compartida, instante límite) para una consulta a una API con su timeout propio."""
+        return shared_session(self.config), time.monotonic() + self.timeouts[name]
+
+    def _headers(self):
+        return {'User-Agent': self.args.user_agent} if getattr(self.args, 'user_agent', None) else {}
+
     def _query_urlscan_io(self):
-        url = f"https://urlscan.io/api/v1/search/?q=domain:{self.target}"
-        user_agent = self.args.user_agent or 'BugBounty-Framework/v0.1'
-        headers = {'User-Agent': user_agent, 'Accept': 'application/json'}
-        logger.info(f"   [Urlscan] Consultando urlscan.io (Timeout: {self.API_TIMEOUT}s)...")
+        """
+        Pagina la búsqueda de urlscan.io con 'search_after' hasta agotar los resultados,
+        URLSCAN_MAX_PAGES páginas o el timeout de la fuente. Cada subdominio nuevo se
+        emite en cuanto llega su página.
+        """
+        url = self._get_str_option('URLSCAN_URL', self.URLSCAN_URL)
+        page_size = self._get_int_option('URLSCAN_PAGE_SIZE', 100)
+        max_pages = self._get_int_option('URLSCAN_MAX_PAGES', 10)
+        headers = self._headers()
+        api_key = self._get_str_option('URLSCAN_API_KEY', '')
+        if api_key:
+            headers['API-Key'] = api_key
+        session, deadline = self._api_budget('urlscan')
+        logger.info(f"   [Urlscan] Consultando urlscan.io (Timeout: {self.timeouts['urlscan']}s, máx. {max_pages} páginas)...")
+
+        new_subdomains = set()
+        params = {'q': f"domain:{self.target}", 'size': page_size}
+        pages = 0
         try:
-            response = requests.get(url, headers=headers, timeout=self.API_TIMEOUT)
-            response.raise_for_status() 
-            data = response.json()
-            new_subdomains = set()
-            for result in data.get('results', []):
-                for key in ['domain', 'host', 'server']:
-                    domain = result.get('task', {}).get(key)
-                    if domain and domain.endswith(self.target):
-                        new_subdomains.add(domain)
-                    domain = result.get('page', {}).get(key)
-                    if domain and domain.endswith(self.target):
-                        new_subdomains.add(domain)
-            self.results['subdomains'].extend(list(new_subdomains))
-            logger.info(f"   [Urlscan] Encontrados {len(new_subdomains)} subdominios vía API.")
+            while pages < max_pages:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    logger.warning(f"   [Urlscan] ⏱️ Timeout tras {pages} páginas; se conservan los resultados parciales.")
+                    break
+                # Token bucket de [RATE_LIMITS] URLSCAN, compartido por todos los objetivos
+                if not get_scheduler().rate_limit('urlscan', timeout=remaining):
+                    logger.warning(f"   [Urlscan] ⏱️ Sin turno del límite de ritmo antes del timeout tras {pages} páginas.")
+                    break
+                # Un Retry-After (429) no puede hacer esperar más allá del timeout de la fuente
+                with request_deadline(deadline):
+                    response = session.get(url, params=params, headers=headers,
+                                           timeout=max(1.0, deadline - time.monotonic()))
+                response.raise_for_status()
+                data = response.json()
+                results = data.get('results') or []
+                pages += 1
+                found = []
+                for result in results:
+                    for key in ['domain', 'host', 'server']:
+                        for section in ('task', 'page'):
+                            domain = normalize_hostname((result.get(section) or {}).get(key))
+                            if domain and in_scope(domain, self.target) and domain not in new_subdomains:
+                                new_subdomains.add(domain)
+                                found.append(domain)
+                self._emit(found)
+                last_sort = results[-1].get('sort') if results else None
+                if not last_sort or not data.get('has_more', len(results) >= page_size):
+                    break
+                params['search_after'] = ','.join(str(value) for value in last_sort)
+            logger.info(f"   [Urlscan] Encontrados {len(new_subdomains)} subdominios vía API ({pages} páginas).")
+            return list(new_subdomains)
         except requests.exceptions.RequestException as e:
             logger.error(f"   [Urlscan] ❌ Error al conectar o timeout: {e}")
-        except json.JSONDecodeError:
+        except ValueError:
             logger.error("   [Urlscan] ❌ Error al decodificar la respuesta JSON.")
+        if new_subdomains:
+            # Las páginas ya leídas son válidas, pero al ser parciales no se cachean (None)
+            logger.warning(f"   [Urlscan] Se usan {len(new_subdomains)} subdominios de las páginas leídas.")
+            self.results['subdomains'].extend(new_subdomains)
+        return None
 
     def _query_crt_sh(self):
-        url = f"https://crt.sh/?q=%25.{self.target}&output=json"
-        user_agent = self.args.user_agent or 'BugBounty-Framework/v0.1'
-        headers = {'User-Agent': user_agent, 'Accept': 'application/json'}
-        logger.info(f"   [Crt.sh] Consultando crt.sh (Timeout: {self.API_TIMEOUT}s)...")
+        """
+        Descarga la respuesta de crt.sh en streaming y decodifica el array JSON elemento a
+        elemento: los nombres se deduplican y emiten según llegan, sin cargar en memoria
+        los (a veces cientos de MB de) certificados completos.
+        """
+        url = self._get_str_option('CRTSH_URL', self.CRTSH_URL)
+        session, deadline = self._api_budget('crtsh')
+        logger.info(f"   [Crt.sh] Consultando crt.sh (Timeout: {self.timeouts['crtsh']}s)...")
+        new_subdomains = set()
+        if not get_scheduler().rate_limit('crtsh', timeout=self.timeouts['crtsh']):
+            logger.error("   [Crt.sh] ⏱️ Sin turno del límite de ritmo ([RATE_LIMITS] CRTSH) antes del timeout.")
+            return None
         try:
-            response = requests.get(url, headers=headers, timeout=self.API_TIMEOUT) 
-            response.raise_for_status() 
-            new_subdomains = set()
-            data = response.json()
-            if isinstance(data, list):
-                for entry in data:
-                    name_value = entry.get('name_value', '')
-                    for name in name_value.split('\n'):
-                        name = name.strip()
-                        if name and name.endswith(self.target):
+            # Un Retry-After (429) no puede hacer esperar más allá del timeout de la fuente
+            with request_deadline(deadline):
+                response = session.get(url, params={'q': f"%.{self.target}", 'output': 'json'},
+                                       headers=self._headers(), timeout=self.timeouts['crtsh'], stream=True)
+            with response:
+                response.raise_for_status()
+                for entry in iter_json_array(self._until(response.iter_content(chunk_size=64 * 1024), deadline)):
+                    if not isinstance(entry, dict):
+                        continue
+                    found = []
+                    for name in (entry.get('name_value') or '').split('\n'):
+                        # Los certificados incluyen emails y wildcards: normalize_hostname los descarta
+                        name = normalize_hostname(name)
+                        if name and name not in new_subdomains and in_scope(name, self.target):
                             new_subdomains.add(name)
-            self.results['subdomains'].extend(list(new_subdomains))
+                            found.append(name)
+                    self._emit(found)
             logger.info(f"   [Crt.sh] Encontrados {len(new_subdomains)} subdominios vía Certificados.")
+            return list(new_subdomains)
+        except TimeoutError:
+            logger.error(f"   [Crt.sh] ⏱️ Timeout de {self.timeouts['crtsh']}s leyendo la respuesta.")
         except requests.exceptions.RequestException as e:
             logger.error(f"   [Crt.sh] ❌ Error al conectar o timeout: {e}")
         except json.JSONDecodeError:
             logger.error("   [Crt.sh] ❌ Error al decodificar la respuesta JSON.")
+        if new_subdomains:
+            # Lo leído antes del fallo se aprovecha, pero no se cachea (la fuente devuelve None)
+            logger.warning(f"   [Crt.sh] Se usan {len(new_subdomains)} subdominios de la respuesta parcial.")
+            self.results['subdomains'].extend(new_subdomains)
+        return None
+
+    @staticmethod
+    def _until(chunks, deadline):
+        """Corta la lectura en streaming al llegar al instante límite (el timeout de requests es por lectura)."""
+        for chunk in chunks:
+            if time.monotonic() > deadline:
+                raise TimeoutError()
+            yield chunk
 
     # --- Métodos de Parsing y Guardado (SIN CAMBIOS) ---
     
     def _parse_subdominator_output(self, output):
-        subdomains = []
-        target_suffix = self.target.lstrip('http://').lstrip('https://')
+        subdomains = set()
         for line in output.split('\n'):
-            line = line.strip()
-            if line and not line.startswith('[') and not line.startswith('_') and not line.startswith('|'):
-                if line.endswith(target_suffix):
-                    subdomains.append(line)
-        return list(set(subdomains)) 
+            sub = self._parse_subdominator_line(line)
+            if sub:
+                subdomains.add(sub)
+        return list(subdomains)
+
+    def _parse_subdominator_line(self, line):
+        target_suffix = self.target.lstrip('http://').lstrip('https://')
+        line = line.strip()
+        if line and not line.startswith('[') and not line.startswith('_') and not line.startswith('|'):
+            if line.endswith(target_suffix):
+                return line
+        return None
         
     def _save_recon_results(self):
         base_name = self.target.replace('.', '_')
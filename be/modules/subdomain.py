@@ -0,0 +1,176 @@
+# be/modules/subdomain.py
+
+import logging
+import os
+import re
+import uuid
+
+from be.modules.utils.dns import AsyncResolver
+from be.modules.utils.hosts import normalize_hostname, in_scope
+
+logger = logging.getLogger(__name__)
+
+
+class SubdomainModule:
+    """
+    Descubrimiento activo de subdominios: fuerza bruta DNS con un diccionario y
+    permutaciones de los nombres que ya encontró el reconocimiento pasivo.
+
+    Los candidatos se generan sobre la marcha (el diccionario se lee línea a línea) y se
+    resuelven con AsyncResolver con un número configurable de consultas en vuelo. Si el
+    dominio tiene un DNS comodín (*.dominio), se descartan las respuestas que solo
+    apuntan a las IPs del comodín.
+    """
+
+    DEFAULT_PERMUTATION_WORDS = 'dev, staging, stage, test, qa, uat, prod, api, admin, internal, beta, old, new, v1, v2'
+    # Nombres aleatorios que se resuelven para detectar un comodín
+    WILDCARD_PROBES = 3
+
+    def __init__(self, target, args, config, known_subdomains=None, output_dir=None, resolver=None):
+        self.target = target
+        self.args = args
+        self.config = config
+        self.output_dir = output_dir
+        self.known = set(known_subdomains or [])
+        self.results = {'subdomains': []}
+        # Callback opcional (modo streaming) que recibe cada subdominio nuevo en cuanto se resuelve.
+        self.on_subdomain = None
+        # Almacén de resultados (TargetStore) que asigna el Manager; None si está desactivado.
+        self.store = None
+
+        self.wordlist = getattr(args, 'wordlist', None) or self._get_option('WORDLIST', '')
+        self.permutations = self._get_bool_option('PERMUTATIONS', True)
+        self.permutation_words = [
+            word.strip().lower()
+            for word in self._get_option('PERMUTATION_WORDS', self.DEFAULT_PERMUTATION_WORDS).split(',')
+            if word.strip()
+        ]
+        # Resolver compartido (y su caché) si lo da el Manager; si no, uno propio según [DNS]
+        self.resolver = resolver or AsyncResolver.from_config(config)
+        self.wildcard_addresses = set()
+
+    def _get_option(self, option, default):
+        """Lee un valor de la sección [SUBDOMAINS] con un valor por defecto."""
+        try:
+            return self.config.get('SUBDOMAINS', option, fallback=default)
+        except AttributeError:
+            return default
+
+    def _get_bool_option(self, option, default):
+        try:
+            return self.config.getboolean('SUBDOMAINS', option, fallback=default)
+        except (AttributeError, ValueError):
+            return default
+
+    def run(self, on_subdomain=None):
+        """Genera candidatos, los resuelve y devuelve {'subdomains': [...]} con los nuevos encontrados."""
+        self.on_subdomain = on_subdomain
+        logger.info(f"   [Subdomains] Iniciando descubrimiento activo ({self.resolver.concurrency} consultas en vuelo, "
+                    f"{len(self.resolver.resolvers)} resolvers)...")
+
+        self._detect_wildcard()
+        found = set()
+
+        def on_answer(answer):
+            if self.wildcard_addresses and set(answer.addresses) <= self.wildcard_addresses:
+                return
+            if answer.name in found or answer.name in self.known:
+                return
+            found.add(answer.name)
+            logger.debug(f"   [Subdomains] {answer.name} -> {', '.join(answer.addresses)}")
+            if self.on_subdomain:
+                self.on_subdomain(answer.name)
+
+        stats = {'queries': 0, 'cache_hits': 0, 'timeouts': 0}
+        try:
+            stats = self.resolver.resolve_many(self._candidates(), on_answer)
+        except OSError as e:
+            logger.error(f"   [Subdomains] ❌ No se pudo usar el resolver DNS: {e}")
+
+        logger.info(f"   [Subdomains] {len(found)} subdominios nuevos ({stats['queries']} consultas, "
+                    f"{stats['cache_hits']} desde caché, {stats['timeouts']} timeouts).")
+        self.results['subdomains'] = sorted(found)
+        if self.store:
+            self.store.add_subdomains(self.results['subdomains'])
+        if self.output_dir and found and (self.store is None or self.store.write_files):
+            self._save_results()
+        return self.results
+
+    def _detect_wildcard(self):
+        """Resuelve nombres aleatorios: si existen, el dominio tiene comodín y se apuntan sus IPs."""
+        probes = [f"{uuid.uuid4().hex[:12]}.{self.target}" for _ in range(self.WILDCARD_PROBES)]
+        addresses = set()
+        try:
+            self.resolver.resolve_many(probes, lambda answer: addresses.update(answer.addresses))
+        except OSError as e:
+            logger.warning(f"   [Subdomains] No se pudo comprobar el DNS comodín: {e}")
+            return
+        if addresses:
+            self.wildcard_addresses = addresses
+            logger.warning(f"   [Subdomains] ⚠️  {self.target} tiene DNS comodín ({', '.join(sorted(addresses))}); "
+                           f"se ignoran las respuestas que solo apuntan ahí.")
+
+    def _candidates(self):
+        """Generador de candidatos únicos: diccionario y después permutaciones de los conocidos."""
+        seen = set(self.known)
+        for name in self._wordlist_candidates():
+            if name not in seen:
+                seen.add(name)
+                yield name
+        if self.permutations:
+            for name in self._permutation_candidates():
+                if name not in seen:
+                    seen.add(name)
+                    yield name
+
+    def _wordlist_candidates(self):
+        if not self.wordlist:
+            logger.info("   [Subdomains] Sin diccionario ([SUBDOMAINS] WORDLIST o --wordlist); solo permutaciones.")
+            return
+        try:
+            with open(self.wordlist, 'r', errors='ignore') as f:
+                for line in f:
+                    word = line.strip().lower().rstrip('.')
+                    if not word or word.startswith('#'):
+                        continue
+                    name = normalize_hostname(f"{word}.{self.target}")
+                    if name:
+                        yield name
+        except OSError as e:
+            logger.error(f"   [Subdomains] ❌ No se pudo leer el diccionario {self.wordlist}: {e}")
+
+    def _permutation_candidates(self):
+        """
+        Variaciones de los subdominios conocidos: palabra-etiqueta, etiqueta-palabra,
+        palabra.etiqueta y números vecinos (api2 -> api1, api3).
+        """
+        suffix = '.' + self.target
+        for known in sorted(self.known):
+            if not known.endswith(suffix):
+                continue
+            labels = known[:-len(suffix)].split('.')
+            first, rest = labels[0], '.'.join(labels[1:])
+            parent = f"{rest}{suffix}" if rest else self.target
+
+            variants = []
+            for word in self.permutation_words:
+                variants.extend((f"{word}-{first}", f"{first}-{word}", f"{word}{first}", f"{first}{word}"))
+                variants.append(f"{word}.{first}")
+            number = re.search(r'\d+', first)
+            if number:
+                value = int(number.group())
+                for neighbour in (value - 1, value + 1, value + 2):
+                    if neighbour >= 0:
+                        variants.append(f"{first[:number.start()]}{neighbour}{first[number.end():]}")
+
+            for variant in variants:
+                name = normalize_hostname(f"{variant}.{parent}")
+                if name and in_scope(name, self.target):
+                    yield name
+
+    def _save_results(self):
+        base_name = self.target.replace('.', '_')
+        output_txt = os.path.join(self.output_dir, f"{base_name}_bruteforce.txt")
+        with open(output_txt, 'w') as f:
+            f.write('\n'.join(self.results['subdomains']))
+        logger.info(f"   [Subdomains] Subdominios activos guardados en {output_txt}")
@@ -1,123 +1,370 @@
 # be/modules/urls.py
 
+import functools
+import hashlib
 import logging
 import os
 import re
+import threading
 from urllib.parse import urlparse
-from .utils.helpers import execute_command
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from .utils.helpers import stream_command, submit_with_context
+from .utils.scheduler import get_scheduler
+from .utils.classifier import UrlClassifier
+from .utils.hosts import group_crawl_units, crawl_unit_key
 
 logger = logging.getLogger(__name__)
 
+
+@functools.lru_cache(maxsize=8)
+def _compile_patterns(items):
+    """
+    Compila los patrones de [URL_PATTERNS] una sola vez por proceso (en modo servicio cada
+    trabajo crea sus UrlsModule y reutiliza los mismos patrones compilados).
+    """
+    patterns = {}
+    for key, pattern in items:
+        try:
+            patterns[key] = re.compile(pattern, re.IGNORECASE)
+        except re.error as e:
+            logger.error(f"   [URLs] ❌ Error compilando el patrón regex para '{key}': {e}")
+    return patterns
+
 class UrlsModule:
+    # Tiempo máximo (segundos) de cada herramienta de búsqueda por host
+    FINDER_TIMEOUT = 180
+    # Valores por defecto de la sección [URLS] de la configuración
+    DEFAULT_HOST_WORKERS = 4
+    DEFAULT_MAX_FINDER_PROCESSES = 6
+    DEFAULT_WRITER_WORKERS = 1
+
     def __init__(self, target_project_name, args, config, hosts):
         self.project_name = target_project_name
         self.args = args
         self.config = config
         self.hosts = hosts
         self.patterns = self._load_patterns()
+        self.classifier = UrlClassifier(self.patterns)
+        # Concurrencia: hosts rastreados a la vez, procesos gau/katana simultáneos
+        # e hilos dedicados a clasificar y escribir resultados.
+        self.host_workers = getattr(args, 'url_workers', None) or self._get_int_option('HOST_WORKERS', self.DEFAULT_HOST_WORKERS)
+        self.max_finder_processes = self._get_int_option('MAX_FINDER_PROCESSES', self.DEFAULT_MAX_FINDER_PROCESSES)
+        self.writer_workers = self._get_int_option('WRITER_WORKERS', self.DEFAULT_WRITER_WORKERS)
+        self._finder_pool = None
+        self._writer_pool = None
+        # Reanudación: hosts ya procesados que se saltan y callback al terminar cada host.
+        self.completed_hosts = set()
+        self.on_host_done = None
+        # Hosts en los que ninguna herramienta terminó bien (no se marcan como hechos)
+        self.failed_hosts = []
+        # Variantes (http/https, www/sin www) fusionadas en cada unidad de rastreo
+        self.aliases = {}
+        # Almacén de resultados (TargetStore) que asigna el Manager; None si está desactivado.
+        self.store = None
+        # Conjuntos de URLs ya guardados: huella -> (host, directorio, evento 'archivos escritos')
+        self.dedupe_identical = self._get_bool_option('DEDUPE_IDENTICAL', True)
+        self._stored_sets = {}
+        self._stored_lock = threading.Lock()
+        # URLs encontradas en total (métricas de la etapa)
+        self.urls_found = 0
+        # JS de cada host para la etapa de secretos: host -> (directorio del host, URLs)
+        self.js_files = {}
+
+    def _get_int_option(self, option, default):
+        """Lee un entero de la sección [URLS] con un valor por defecto."""
+        try:
+            return max(1, self.config.getint('URLS', option, fallback=default))
+        except (AttributeError, ValueError):
+            return default
+
+    def _get_bool_option(self, option, default):
+        """Lee un booleano de la sección [URLS] con un valor por defecto."""
+        try:
+            return self.config.getboolean('URLS', option, fallback=default)
+        except (AttributeError, ValueError):
+            return default
 
     def _load_patterns(self):
         """Carga y compila los patrones regex desde el archivo de configuración."""
-        patterns = {}
-        if self.config.has_section('URL_PATTERNS'):
-            for key, pattern in self.config.items('URL_PATTERNS'):
-                try:
-                    patterns[key] = re.compile(pattern, re.IGNORECASE)
-                except re.error as e:
-                    logger.error(f"   [URLs] ❌ Error compilando el patrón regex para '{key}': {e}")
-        return patterns
+        if not self.config.has_section('URL_PATTERNS'):
+            return {}
+        # Copia: cada módulo puede tener su propio diccionario, los patrones compilados se comparten
+        return dict(_compile_patterns(tuple(self.config.items('URL_PATTERNS'))))
 
     # --- MÉTODO 'RUN' MODIFICADO ---
     def run(self, base_output_dir):
         """
-        Orquesta la ejecución: Itera sobre cada host, busca sus URLs,
-        las clasifica y las guarda antes de pasar al siguiente host.
+        Orquesta la ejecución: reparte los hosts entre un pool de workers que buscan sus URLs;
+        la clasificación y el guardado se hacen en hilos aparte para no frenar el rastreo.
         """
         if not self.hosts:
             logger.warning("   [URLs] No hay hosts en la lista para procesar.")
             return
 
-        logger.info(f"   [URLs] Iniciando procesamiento para {len(self.hosts)} hosts...")
+        units = group_crawl_units(self.hosts)
+        self.aliases = {representative: aliases for representative, aliases in units if aliases}
+        merged = len(self.hosts) - len(units)
+        if merged > 0:
+            logger.info(f"   [URLs] {len(self.hosts)} entradas reducidas a {len(units)} unidades de rastreo "
+                        f"(variantes de esquema/www fusionadas o entradas inválidas).")
+        logger.info(f"   [URLs] Iniciando procesamiento para {len(units)} hosts "
+                    f"({self.host_workers} en paralelo, máx. {self.max_finder_processes} procesos)...")
+        self._process_hosts([representative for representative, _ in units], base_output_dir)
         
-        # Bucle principal que procesa un host a la vez
-        for host in self.hosts:
-            logger.info(f"\n   [URLs] -------------------------------------------------")
-            logger.info(f"   [URLs] 🎯 Procesando host: {host}")
-            
-            # 1. Recolecta URLs SOLO para el host actual
-            host_specific_urls = self._run_url_finders(host)
-            
-            if not host_specific_urls:
-                logger.info(f"   [URLs] No se encontraron URLs para {host}.")
-                continue # Pasa al siguiente host
+        logger.info(f"   [URLs] -------------------------------------------------")
+        logger.info(f"   [URLs] Procesamiento de todos los hosts finalizado.")
+
+    def run_stream(self, host_source, base_output_dir):
+        """
+        Modo streaming: procesa cada host en cuanto llega desde la etapa de probing
+        (cualquier iterable, normalmente una cola), sin esperar a la lista completa.
+        """
+        logger.info(f"   [URLs] Esperando hosts vivos en streaming...")
+        processed = self._process_hosts(self._dedupe_stream(host_source), base_output_dir, track_hosts=True)
+        logger.info(f"   [URLs] Procesamiento en streaming finalizado ({processed} hosts).")
 
-            logger.info(f"   [URLs] Se encontraron {len(host_specific_urls)} URLs para {host}. Guardando...")
+    def _dedupe_stream(self, host_source):
+        """En streaming, deja pasar solo la primera variante de cada unidad de rastreo."""
+        seen = {}
+        for host in host_source:
+            key = crawl_unit_key(host)
+            if key is None:
+                logger.info(f"   [URLs] Entrada descartada, no es un host válido: {host}")
+                continue
+            if key in seen:
+                self.aliases.setdefault(seen[key], []).append(host)
+                logger.debug(f"   [URLs] {host} es una variante de {seen[key]}; no se rastrea aparte.")
+                continue
+            seen[key] = host
+            yield host
 
-            try:
-                # 2. Prepara el directorio de salida para este host
-                host_dir_name = host.replace(':', '_').replace('/', '_')
-                host_output_dir = os.path.join(base_output_dir, host_dir_name)
+    def _process_hosts(self, host_source, base_output_dir, track_hosts=False):
+        """Envía cada host al pool de rastreo y espera a que se rastreen y guarden todos."""
+        host_pool = ThreadPoolExecutor(max_workers=self.host_workers, thread_name_prefix='urls-host')
+        self._finder_pool = ThreadPoolExecutor(max_workers=self.max_finder_processes, thread_name_prefix='urls-finder')
+        self._writer_pool = ThreadPoolExecutor(max_workers=self.writer_workers, thread_name_prefix='urls-writer')
+        futures = []
+        try:
+            for host in host_source:
+                if track_hosts:
+                    self.hosts.append(host)
+                if host in self.completed_hosts:
+                    logger.info(f"   [URLs] ⏭️  {host} ya procesado en una ejecución anterior; se omite.")
+                    self._load_previous_js(host, base_output_dir)
+                    continue
+                futures.append(submit_with_context(host_pool, self._process_host, host, base_output_dir))
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    logger.error(f"   [URLs] ❌ Error inesperado en un worker de rastreo: {e}")
+        finally:
+            host_pool.shutdown(wait=True)
+            self._finder_pool.shutdown(wait=True)
+            # El writer se cierra al final para que terminen de guardarse todos los hosts.
+            self._writer_pool.shutdown(wait=True)
+            self._finder_pool = self._writer_pool = None
+        return len(futures)
+
+    def _process_host(self, host, base_output_dir):
+        """Busca las URLs de un único host y delega su clasificación y guardado."""
+        logger.info(f"   [URLs] 🎯 Procesando host: {host}")
+        
+        # 1. Recolecta URLs SOLO para el host actual
+        host_specific_urls, finished = self._run_url_finders(host)
+        if not finished:
+            # Sin ninguna búsqueda completa el host no se da por hecho: --resume lo reintentará
+            with self._stored_lock:
+                self.failed_hosts.append(host)
+            logger.warning(f"   [URLs] ⚠️  Ninguna herramienta terminó correctamente para {host}; "
+                           f"queda pendiente para --resume.")
+        
+        if not host_specific_urls:
+            logger.info(f"   [URLs] No se encontraron URLs para {host}.")
+            if finished:
+                self._mark_host_done(host)
+            return
+
+        logger.info(f"   [URLs] Se encontraron {len(host_specific_urls)} URLs para {host}. Guardando...")
+        with self._stored_lock:
+            self.urls_found += len(host_specific_urls)
+        if self._writer_pool:
+            submit_with_context(self._writer_pool, self._store_host_results, host, host_specific_urls, base_output_dir,
+                                finished)
+        else:
+            self._store_host_results(host, host_specific_urls, base_output_dir, finished)
+
+    def _store_host_results(self, host, host_specific_urls, base_output_dir, mark_done=True):
+        """Clasifica y guarda en disco las URLs de un host (y lo marca como hecho si mark_done)."""
+        canonical = None
+        try:
+            # 2. Prepara el directorio de salida para este host
+            host_output_dir = self._host_output_dir(host, base_output_dir)
+            if self._write_files:
                 os.makedirs(host_output_dir, exist_ok=True)
-                
-                # 3. Clasifica las URLs encontradas
-                categorized = self._categorize_urls(list(host_specific_urls))
-                
-                # 4. Guarda los archivos clasificados para este host
+            if self._write_files and self.aliases.get(host):
+                self._save_categorized_files(host_output_dir, {'aliases': set(self.aliases[host])})
+
+            # Si otro host ya devolvió exactamente estas URLs, se enlaza a su resultado
+            if self.dedupe_identical:
+                fingerprint = self._url_set_fingerprint(host_specific_urls)
+                with self._stored_lock:
+                    canonical = self._stored_sets.get(fingerprint)
+                    if canonical is None:
+                        self._stored_sets[fingerprint] = (host, host_output_dir, threading.Event())
+                if canonical is not None:
+                    self._link_duplicate_results(host, host_output_dir, canonical)
+                    if mark_done:
+                        self._mark_host_done(host)
+                    return
+                canonical = self._stored_sets[fingerprint]
+
+            # 3. Clasifica las URLs encontradas
+            categorized = self._categorize_urls(host_specific_urls)
+            
+            # 4. Guarda los archivos clasificados para este host
+            if self.store:
+                self.store.add_urls(host, categorized)
+            if self._write_files:
                 self._save_categorized_files(host_output_dir, categorized)
-                logger.info(f"   [URLs] ✅ Resultados para '{host}' guardados en: {host_output_dir}")
+            if categorized.get('jsfiles'):
+                with self._stored_lock:
+                    self.js_files[host] = (host_output_dir, set(categorized['jsfiles']))
+            logger.info(f"   [URLs] ✅ Resultados para '{host}' guardados en: {host_output_dir}")
+            if mark_done:
+                self._mark_host_done(host)
 
-            except Exception as e:
-                logger.error(f"   [URLs] ❌ Falló el procesamiento para el host '{host}': {e}")
-        
-        logger.info(f"   [URLs] -------------------------------------------------")
-        logger.info(f"   [URLs] Procesamiento de todos los hosts finalizado.")
+        except Exception as e:
+            logger.error(f"   [URLs] ❌ Falló el procesamiento para el host '{host}': {e}")
+        finally:
+            # Libera a los duplicados que esperan los archivos de este host (aunque haya fallado)
+            if canonical is not None and canonical[0] == host:
+                canonical[2].set()
+
+    @staticmethod
+    def _host_output_dir(host, base_output_dir):
+        return os.path.join(base_output_dir, host.replace(':', '_').replace('/', '_'))
+
+    def _load_previous_js(self, host, base_output_dir):
+        """Al reanudar, recupera los JS de un host ya procesado (su jsfiles.txt) para la etapa de secretos."""
+        host_output_dir = self._host_output_dir(host, base_output_dir)
+        try:
+            with open(os.path.join(host_output_dir, 'jsfiles.txt')) as f:
+                urls = {line.strip() for line in f if line.strip()}
+        except OSError:
+            return
+        if urls:
+            with self._stored_lock:
+                self.js_files[host] = (host_output_dir, urls)
+
+    @staticmethod
+    def _url_set_fingerprint(urls):
+        """Huella SHA-256 del conjunto de URLs (independiente del orden en que llegaron)."""
+        digest = hashlib.sha256()
+        for url in sorted(urls):
+            digest.update(url.encode('utf-8', 'surrogateescape'))
+            digest.update(b'\n')
+        return digest.hexdigest()
+
+    def _link_duplicate_results(self, host, host_output_dir, canonical):
+        """
+        Sustituye la clasificación de un host cuyo conjunto de URLs es idéntico al de otro:
+        deja un duplicate_of.txt con el host original y enlaces simbólicos a sus archivos.
+        """
+        canonical_host, canonical_dir, written = canonical
+        if self.store:
+            self.store.add_duplicate(host, canonical_host)
+        if not self._write_files:
+            logger.info(f"   [URLs] ♻️  '{host}' devolvió las mismas URLs que '{canonical_host}'; no se vuelve a clasificar.")
+            return
+        # Con varios writers el original puede estar escribiéndose todavía
+        written.wait()
+        self._save_categorized_files(host_output_dir, {'duplicate_of': {canonical_host}})
+        linked = 0
+        for category in ('salidatodo', *self.classifier.category_names):
+            source = os.path.join(canonical_dir, f"{category}.txt")
+            if not os.path.exists(source):
+                continue
+            link_path = os.path.join(host_output_dir, f"{category}.txt")
+            try:
+                if os.path.lexists(link_path):
+                    os.remove(link_path)
+                os.symlink(os.path.relpath(source, host_output_dir), link_path)
+                linked += 1
+            except OSError as e:
+                # Sin enlaces (p. ej. sistema de archivos que no los admite) basta con duplicate_of.txt
+                logger.debug(f"   [URLs] No se pudo enlazar {link_path}: {e}")
+        logger.info(f"   [URLs] ♻️  '{host}' devolvió las mismas URLs que '{canonical_host}'; "
+                    f"no se vuelve a clasificar ({linked} archivos enlazados en {host_output_dir}).")
+
+    @property
+    def _write_files(self):
+        """Los TXT por host se escriben salvo que el almacén de resultados los sustituya."""
+        return self.store is None or self.store.write_files
+
+    def _mark_host_done(self, host):
+        if self.on_host_done:
+            self.on_host_done(host)
 
     def _run_url_finders(self, single_host):
         """
-        Ejecuta herramientas como gau y katana para un único host/dominio.
-        Devuelve un conjunto (set) de URLs encontradas.
+        Ejecuta herramientas como gau y katana para un único host/dominio, en paralelo
+        si hay un pool de búsqueda activo. Devuelve el conjunto (set) de URLs encontradas y
+        si al menos una herramienta terminó sin error.
         """
-        host_urls = set()
         tools = {
             "gau": self.config.get('TOOLS', 'GAU_PATH', fallback='gau'),
             "katana": self.config.get('TOOLS', 'KATANA_PATH', fallback='katana')
         }
         
+        # Hilos de cada herramienta según [SCHEDULER] (GAU_THREADS, KATANA_CONCURRENCY)
+        scheduler = get_scheduler()
+        # Listas de argumentos (sin shell): el host nunca se interpreta. gau lo lee de stdin.
         commands = {
-            "gau": f"echo {single_host} | {tools['gau']}",
-            "katana": f"{tools['katana']} -u {single_host} -silent -d 2"
+            "gau": ([tools['gau'], *scheduler.thread_args('gau').split()], [single_host]),
+            "katana": ([tools['katana'], '-u', single_host, '-silent', '-d', '2',
+                        *scheduler.thread_args('katana').split()], None)
         }
         
-        for tool_name, command in commands.items():
-            try:
-                logger.info(f"     -> Buscando en '{single_host}' con {tool_name}...")
-                stdout = execute_command(command, timeout=180)
-                urls = {u.strip() for u in stdout.strip().split('\n') if u.strip()}
-                if urls:
-                    logger.info(f"     [{tool_name}] Encontró {len(urls)} URLs.")
-                    host_urls.update(urls)
-            except Exception as e:
-                logger.error(f"     [{tool_name}] ❌ Error al ejecutar para '{single_host}': {e}")
-        return host_urls
+        host_urls = set()
+        finished = False
+        if self._finder_pool:
+            futures = [submit_with_context(self._finder_pool, self._run_url_finder, name, command, single_host,
+                                           input_lines)
+                       for name, (command, input_lines) in commands.items()]
+            results = (future.result() for future in as_completed(futures))
+        else:
+            results = (self._run_url_finder(tool_name, command, single_host, input_lines)
+                       for tool_name, (command, input_lines) in commands.items())
+        for urls, ok in results:
+            host_urls.update(urls)
+            finished = finished or ok
+        return host_urls, finished
+
+    def _run_url_finder(self, tool_name, command, single_host, input_lines=None):
+        """Ejecuta una herramienta de búsqueda y devuelve sus URLs y si terminó sin error."""
+        # Si la herramienta agota su timeout, lo que ya había emitido se conserva.
+        urls = set()
+        ok = False
+        try:
+            logger.info(f"     -> Buscando en '{single_host}' con {tool_name}...")
+            for line in stream_command(command, input_lines=input_lines, timeout=self.FINDER_TIMEOUT):
+                url = line.strip()
+                if url:
+                    urls.add(url)
+            ok = True
+        except Exception as e:
+            logger.error(f"     [{tool_name}] ❌ Error al ejecutar para '{single_host}': {e}")
+        if urls:
+            logger.info(f"     [{tool_name}] Encontró {len(urls)} URLs en '{single_host}'.")
+        return urls, ok
 
     # El método _process_and_save_by_host ya no es necesario, su lógica se movió al método run.
     # Los otros métodos (_is_url_from_host, _categorize_urls, _save_categorized_files) se mantienen igual.
 
     def _categorize_urls(self, url_list):
-        """Aplica los patrones regex a una lista de URLs para clasificarlas."""
-        categorized = {
-            "salidatodo": set(url_list), "dataExtensiones": set(), "imagenes": set(),
-            "jsfiles": set(), "openRedirect": set(), "xss": set(), "sql": set(), "keys": set()
-        }
-        pattern_map = {
-            "dataExtensiones": "sensitive_ext", "imagenes": "image_ext", "jsfiles": "js_files",
-            "openRedirect": "open_redirect", "xss": "xss", "sql": "sqli", "keys": "keys"
-        }
-        for url in url_list:
-            for filename, pattern_key in pattern_map.items():
-                if pattern_key in self.patterns and self.patterns[pattern_key].search(url):
-                    categorized[filename].add(url)
-        return categorized
+        """Clasifica las URLs en una sola pasada por URL (ver UrlClassifier)."""
+        return self.classifier.classify_many(url_list)
 
     def _save_categorized_files(self, output_dir, categorized_urls):
         """Escribe los resultados categorizados en sus respectivos archivos .txt."""
@@ -0,0 +1,192 @@
+# be/modules/utils/cache.py
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from .helpers import atomic_write_json
+
+logger = logging.getLogger(__name__)
+
+# Un único lock para todas las instancias: varios objetivos en paralelo comparten el directorio.
+_cache_lock = threading.Lock()
+# Tamaño en bytes de cada directorio de caché, llevado en memoria entre recorridos completos
+_cache_sizes = {}
+
+
+class ReconCache:
+    """
+    Caché en disco de resultados de reconocimiento pasivo, con clave (fuente, dominio raíz).
+
+    Cada entrada es un JSON en <DIR>/<fuente>/<dominio>.json. La caducidad se controla por
+    fuente (TTL_<FUENTE> en horas, sección [CACHE]) y el tamaño total se limita con
+    MAX_SIZE_MB expulsando las entradas usadas hace más tiempo (LRU por fecha de
+    modificación, que se actualiza en cada acierto). El tamaño se lleva como un total en
+    memoria y el directorio solo se recorre la primera vez y cuando el total pasa del límite.
+    """
+
+    DEFAULT_DIR = '.cache/recon'
+    DEFAULT_TTL_HOURS = 24
+    DEFAULT_MAX_SIZE_MB = 200
+    # Al pasarse del límite se expulsa hasta esta fracción, para no recorrer el directorio en cada put
+    EVICT_TO = 0.9
+
+    def __init__(self, cache_dir=DEFAULT_DIR, ttls=None, default_ttl_hours=DEFAULT_TTL_HOURS,
+                 max_size_mb=DEFAULT_MAX_SIZE_MB, enabled=True):
+        self.cache_dir = cache_dir
+        self.ttls = ttls or {}
+        self.default_ttl = default_ttl_hours * 3600
+        self.max_size = max_size_mb * 1024 * 1024
+        self.enabled = enabled
+
+    @classmethod
+    def from_config(cls, config):
+        """Construye la caché a partir de la sección [CACHE] (si no existe, usa los valores por defecto)."""
+        if not hasattr(config, 'has_section') or not config.has_section('CACHE'):
+            return cls()
+        section = config['CACHE']
+        ttls = {
+            key[len('ttl_'):]: float(value) * 3600
+            for key, value in section.items() if key.startswith('ttl_')
+        }
+        return cls(
+            cache_dir=section.get('DIR', cls.DEFAULT_DIR),
+            ttls=ttls,
+            default_ttl_hours=section.getfloat('DEFAULT_TTL', cls.DEFAULT_TTL_HOURS),
+            max_size_mb=section.getfloat('MAX_SIZE_MB', cls.DEFAULT_MAX_SIZE_MB),
+            enabled=section.getboolean('ENABLED', True),
+        )
+
+    def _path(self, source, domain):
+        safe_domain = domain.replace('/', '_').replace(':', '_')
+        return os.path.join(self.cache_dir, source, f"{safe_domain}.json")
+
+    def _ttl(self, source):
+        return self.ttls.get(source.lower(), self.default_ttl)
+
+    def get(self, source, domain):
+        """Devuelve la lista de subdominios cacheada, o None si no hay entrada válida."""
+        if not self.enabled:
+            return None
+        path = self._path(source, domain)
+        try:
+            with open(path, 'r') as f:
+                entry = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError, OSError):
+            return None
+
+        age = time.time() - entry.get('created', 0)
+        if age > self._ttl(source):
+            logger.debug(f"   [Cache] Entrada caducada para {source}/{domain} ({age / 3600:.1f}h).")
+            return None
+        try:
+            # Marca de uso reciente para la expulsión LRU
+            os.utime(path, None)
+        except OSError:
+            pass
+        return entry.get('subdomains', [])
+
+    def put(self, source, domain, subdomains):
+        """Guarda (de forma atómica) los resultados de una fuente y aplica el límite de tamaño."""
+        if not self.enabled:
+            return
+        entry = {'source': source, 'domain': domain, 'created': time.time(), 'subdomains': sorted(set(subdomains))}
+        path = self._path(source, domain)
+        try:
+            previous = os.path.getsize(path)
+        except OSError:
+            previous = 0
+        try:
+            atomic_write_json(path, entry)
+            written = os.path.getsize(path)
+        except OSError as e:
+            logger.warning(f"   [Cache] No se pudo guardar {source}/{domain}: {e}")
+            return
+        key = os.path.realpath(self.cache_dir)
+        with _cache_lock:
+            if key in _cache_sizes:
+                _cache_sizes[key] += written - previous
+                if _cache_sizes[key] <= self.max_size:
+                    return
+        self._evict()
+
+    def _evict(self):
+        """
+        Recorre el directorio, recalcula el total y, si pasa de MAX_SIZE_MB, borra las
+        entradas menos usadas recientemente hasta quedar en EVICT_TO del límite.
+        """
+        with _cache_lock:
+            entries = []
+            total = 0
+            for root, _, files in os.walk(self.cache_dir):
+                for name in files:
+                    if name.startswith('.tmp_'):
+                        continue # Escritura en curso de otro hilo o proceso
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, path))
+                    total += stat.st_size
+            if total > self.max_size:
+                entries.sort()
+                for _, size, path in entries:
+                    if total <= self.max_size * self.EVICT_TO:
+                        break
+                    try:
+                        os.remove(path)
+                        total -= size
+                        logger.debug(f"   [Cache] Expulsada entrada LRU: {path}")
+                    except FileNotFoundError:
+                        pass
+            _cache_sizes[os.path.realpath(self.cache_dir)] = total
+
+
+class ContentHashCache:
+    """
+    Caché persistente (SQLite) de archivos ya analizados, con clave el SHA-256 de su
+    contenido y la huella del conjunto de patrones. Un mismo bundle servido desde muchas
+    URLs, o que vuelve a aparecer en otra ejecución, se analiza una sola vez: la caché
+    devuelve los hallazgos de la primera vez. Si cambian los patrones, se vuelve a analizar.
+    """
+
+    DEFAULT_PATH = '.cache/js_hashes.db'
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS scanned (sha256 TEXT NOT NULL, rules TEXT NOT NULL, size INTEGER, '
+            'first_url TEXT, scanned REAL, findings TEXT, PRIMARY KEY (sha256, rules))'
+        )
+        self._conn.commit()
+
+    def get(self, sha256, rules):
+        """Hallazgos guardados para ese contenido y patrones, o None si no se ha analizado."""
+        with self._lock:
+            row = self._conn.execute('SELECT findings FROM scanned WHERE sha256 = ? AND rules = ?',
+                                     (sha256, rules)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, sha256, rules, size, url, findings):
+        with self._lock:
+            try:
+                with self._conn:
+                    self._conn.execute('INSERT OR REPLACE INTO scanned (sha256, rules, size, first_url, scanned, findings) '
+                                       'VALUES (?, ?, ?, ?, ?, ?)',
+                                       (sha256, rules, size, url, time.time(), json.dumps(findings)))
+            except sqlite3.Error as e:
+                logger.warning(f"   [Cache] No se pudo guardar el análisis de {url}: {e}")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
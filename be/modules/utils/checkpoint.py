@@ -0,0 +1,133 @@
+# be/modules/utils/checkpoint.py
+
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+
+from .helpers import atomic_write_json
+
+logger = logging.getLogger(__name__)
+
+
+class Checkpoint:
+    """
+    Registro de progreso de una ejecución del Manager, para poder reanudarla con --resume.
+
+    Guarda en <output>/checkpoint.json los pares (objetivo, etapa) completados y, dentro de
+    la etapa de URLs, los hosts ya procesados. Cada etapa completada reescribe el archivo
+    de forma atómica, así que un Ctrl-C o un fallo a mitad nunca lo deja corrupto.
+
+    Los hosts, que pueden ser miles por objetivo, no reescriben el archivo entero: cada uno
+    añade una línea JSON al diario checkpoint.hosts.jsonl, que se incorpora al archivo
+    principal (y se vacía) en la siguiente etapa completada.
+    """
+
+    FILENAME = 'checkpoint.json'
+    JOURNAL_FILENAME = 'checkpoint.hosts.jsonl'
+
+    def __init__(self, output_dir, resume=False):
+        self.path = os.path.join(output_dir, self.FILENAME)
+        self.journal_path = os.path.join(output_dir, self.JOURNAL_FILENAME)
+        self._lock = threading.Lock()
+        self.targets = {}
+        if resume:
+            self._load()
+        else:
+            if os.path.exists(self.path):
+                logger.debug(f"[Checkpoint] Se ignora el checkpoint previo (sin --resume): {self.path}")
+            # El diario de una ejecución anterior no debe mezclarse con el checkpoint nuevo
+            try:
+                os.remove(self.journal_path)
+            except FileNotFoundError:
+                pass
+
+    def _load(self):
+        try:
+            with open(self.path, 'r') as f:
+                self.targets = json.load(f).get('targets', {})
+        except FileNotFoundError:
+            if not os.path.exists(self.journal_path):
+                logger.warning(f"[Checkpoint] No hay checkpoint en {self.path}; se empieza desde el principio.")
+                return
+        except (json.JSONDecodeError, OSError) as e:
+            logger.warning(f"[Checkpoint] Checkpoint ilegible ({e}); se empieza desde el principio.")
+            self.targets = {}
+            return
+        for entry in self.targets.values():
+            entry['hosts'] = set(entry.get('hosts', []))
+        replayed = self._replay_journal()
+        done = sum(1 for entry in self.targets.values() if 'done' in entry.get('stages', []))
+        logger.info(f"[Checkpoint] Reanudando: {done} objetivos completos, {len(self.targets) - done} a medias"
+                    f"{f' ({replayed} hosts desde el diario)' if replayed else ''}.")
+
+    def _replay_journal(self):
+        """Añade los hosts del diario. Devuelve cuántas líneas se aplicaron."""
+        replayed = 0
+        try:
+            with open(self.journal_path, 'r') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                        self._entry(record['target'])['hosts'].add(record['host'])
+                    except (ValueError, KeyError, TypeError):
+                        continue # Última línea a medias tras un corte: ese host se repite
+                    replayed += 1
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"[Checkpoint] No se pudo leer el diario de hosts ({e}); esos hosts se repetirán.")
+        return replayed
+
+    def _entry(self, target):
+        return self.targets.setdefault(target, {'stages': [], 'hosts': set()})
+
+    def _save(self):
+        """Reescribe el checkpoint completo (con los hosts del diario) y vacía el diario."""
+        targets = {target: {'stages': entry['stages'], 'hosts': sorted(entry['hosts'])}
+                   for target, entry in self.targets.items()}
+        data = {'updated': datetime.now().isoformat(timespec='seconds'), 'targets': targets}
+        try:
+            atomic_write_json(self.path, data)
+        except OSError as e:
+            logger.warning(f"[Checkpoint] No se pudo guardar el checkpoint: {e}")
+            return
+        # Si se corta aquí, el diario solo repite hosts que ya están en el checkpoint
+        try:
+            os.remove(self.journal_path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"[Checkpoint] No se pudo vaciar el diario de hosts: {e}")
+
+    def _append_journal(self, target, host):
+        try:
+            with open(self.journal_path, 'a') as f:
+                f.write(json.dumps({'target': target, 'host': host}) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+        except OSError as e:
+            logger.warning(f"[Checkpoint] No se pudo apuntar el host {host} en el diario: {e}")
+
+    def is_done(self, target, stage):
+        with self._lock:
+            return stage in self.targets.get(target, {}).get('stages', [])
+
+    def mark_done(self, target, stage):
+        with self._lock:
+            stages = self._entry(target)['stages']
+            if stage not in stages:
+                stages.append(stage)
+                self._save()
+
+    def completed_hosts(self, target):
+        with self._lock:
+            return set(self.targets.get(target, {}).get('hosts', ()))
+
+    def mark_host_done(self, target, host):
+        with self._lock:
+            hosts = self._entry(target)['hosts']
+            if host not in hosts:
+                hosts.add(host)
+                self._append_journal(target, host)
@@ -0,0 +1,161 @@
+# be/modules/utils/classifier.py
+
+import re
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Archivo de salida (categoría) -> clave del patrón en la sección [URL_PATTERNS]
+CATEGORY_PATTERNS = {
+    "dataExtensiones": "sensitive_ext", "imagenes": "image_ext", "jsfiles": "js_files",
+    "openRedirect": "open_redirect", "xss": "xss", "sql": "sqli", "keys": "keys"
+}
+
+# Forma de los patrones de extensión del default.conf: \.(xls|xml|tar\.gz)(\?|$) o \.js(\?|$)
+_EXTENSION_FORM = re.compile(r'^\\\.(?:\((?P<group>[^()]*)\)|(?P<single>[^()|]+))\(\\\?\|\$\)$')
+# Caracteres con significado especial en una regex (fuera de un escape)
+_REGEX_META = set('.^$*+?{}[]()|\\')
+# Flags con los que el análisis literal sigue siendo exacto
+_SUPPORTED_FLAGS = re.IGNORECASE | re.UNICODE
+
+
+def _parse_literal(text):
+    """Convierte 'tar\\.gz' en 'tar.gz'. Devuelve None si contiene metacaracteres reales."""
+    literal = []
+    escaped = False
+    for char in text:
+        if escaped:
+            # Solo aceptamos escapes de puntuación (\. \- \= ...), no clases como \d o \s
+            if char.isalnum():
+                return None
+            literal.append(char)
+            escaped = False
+        elif char == '\\':
+            escaped = True
+        elif char in _REGEX_META:
+            return None
+        else:
+            literal.append(char)
+    if escaped or not literal:
+        return None
+    return ''.join(literal)
+
+
+def _parse_alternatives(text):
+    """'a|b\\.c' -> ['a', 'b.c'] si todas las alternativas son literales; si no, None."""
+    alternatives = [_parse_literal(part) for part in text.split('|')]
+    if not alternatives or any(alt is None for alt in alternatives):
+        return None
+    return alternatives
+
+
+class _CompiledCategory:
+    """
+    Una categoría lista para evaluar. Si el patrón tiene una forma conocida se evalúa con
+    operaciones de cadena equivalentes; en otro caso se usa el re.search() de siempre.
+      - 'extension': \\.(ext1|ext2)(\\?|$) -> alguna extensión justo antes de un '?' o del final.
+      - 'substring': lit1|lit2 o (lit1|lit2) -> algún literal aparece en la URL.
+    """
+
+    def __init__(self, name, pattern):
+        self.name = name
+        self.pattern = pattern
+        self.kind = 'regex'
+        self.ignorecase = bool(pattern.flags & re.IGNORECASE)
+        self.literals = None
+        if pattern.flags & ~_SUPPORTED_FLAGS:
+            return
+
+        source = pattern.pattern
+        extension = _EXTENSION_FORM.match(source)
+        if extension:
+            alternatives = _parse_alternatives(extension.group('group') or extension.group('single'))
+            if alternatives:
+                self.kind = 'extension'
+                self.literals = tuple('.' + alt for alt in alternatives)
+        else:
+            if source.startswith('(') and source.endswith(')'):
+                source = source[1:-1]
+            alternatives = _parse_alternatives(source)
+            if alternatives:
+                self.kind = 'substring'
+                self.literals = tuple(alternatives)
+
+        if self.literals is not None:
+            if not all(literal.isascii() for literal in self.literals):
+                self.kind, self.literals = 'regex', None
+            elif self.ignorecase:
+                self.literals = tuple(literal.lower() for literal in self.literals)
+
+    def matches(self, url, folded):
+        """'folded' es la URL en minúsculas (o None si no es ASCII y hay que usar la regex)."""
+        if self.kind == 'regex' or folded is None:
+            return self.pattern.search(url) is not None
+        text = folded if self.ignorecase else url
+        if self.kind == 'substring':
+            return any(literal in text for literal in self.literals)
+        # 'extension': posiciones donde puede casar (\?|$): cada '?', el final, y antes de un '\n' final.
+        endswith = self.literals
+        if text.endswith(endswith):
+            return True
+        if text.endswith('\n') and text[:-1].endswith(endswith):
+            return True
+        position = text.find('?')
+        while position != -1:
+            if text.endswith(endswith, 0, position):
+                return True
+            position = text.find('?', position + 1)
+        return False
+
+
+class UrlClassifier:
+    """
+    Clasifica una URL en todas sus categorías en una sola pasada.
+
+    Los patrones de [URL_PATTERNS] se analizan una vez al crear el clasificador: los de
+    extensión se convierten en búsquedas de sufijo y los de parámetros/palabras clave en
+    búsquedas de subcadena sobre la URL en minúsculas, que es exactamente lo que hacen
+    esas regex con IGNORECASE. Los patrones que no encajan en esas formas (o las URLs no
+    ASCII) se evalúan con su regex original, así que el resultado es siempre idéntico.
+    """
+
+    def __init__(self, patterns, category_patterns=CATEGORY_PATTERNS):
+        # patterns: clave -> patrón compilado (como los carga UrlsModule._load_patterns)
+        self.category_names = list(category_patterns)
+        self.categories = [
+            _CompiledCategory(category, patterns[key])
+            for category, key in category_patterns.items() if key in patterns
+        ]
+        fallback = [c.name for c in self.categories if c.kind == 'regex']
+        if fallback:
+            logger.debug(f"   [URLs] Categorías evaluadas con regex completa: {', '.join(fallback)}")
+
+    def classify(self, url):
+        """Devuelve la lista de categorías a las que pertenece la URL."""
+        folded = url.lower() if url.isascii() else None
+        return [category.name for category in self.categories if category.matches(url, folded)]
+
+    def iter_classified(self, urls):
+        """Genera (url, categorías) para cada URL única de un iterable, sin materializarlo."""
+        seen = set()
+        for url in urls:
+            if url in seen:
+                continue
+            seen.add(url)
+            yield url, self.classify(url)
+
+    def classify_many(self, urls, include_all="salidatodo"):
+        """
+        API por lotes: clasifica cualquier iterable de URLs (lista, set o generador) y
+        devuelve {categoría: set(urls)}. Con 'include_all' se añade además una categoría
+        con todas las URLs, como el salidatodo.txt del módulo de URLs.
+        """
+        categorized = {name: set() for name in self.category_names}
+        everything = set()
+        for url, categories in self.iter_classified(urls):
+            everything.add(url)
+            for category in categories:
+                categorized[category].add(url)
+        if include_all:
+            return {include_all: everything, **categorized}
+        return categorized
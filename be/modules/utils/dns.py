@@ -0,0 +1,350 @@
+# be/modules/utils/dns.py
+
+import asyncio
+import logging
+import random
+import struct
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Tipos y códigos de respuesta DNS que usamos
+TYPE_A = 1
+TYPE_CNAME = 5
+CLASS_IN = 1
+RCODE_NOERROR = 0
+RCODE_NXDOMAIN = 3
+
+DEFAULT_RESOLVERS = ('1.1.1.1:53', '8.8.8.8:53', '9.9.9.9:53')
+
+
+class DnsError(Exception):
+    """Respuesta DNS ilegible o que no corresponde a la consulta."""
+
+
+def parse_resolvers(value):
+    """'1.1.1.1, 8.8.8.8:5353' -> [('1.1.1.1', 53), ('8.8.8.8', 5353)]"""
+    resolvers = []
+    items = value.split(',') if isinstance(value, str) else value
+    for item in items:
+        item = item.strip()
+        if not item:
+            continue
+        host, _, port = item.rpartition(':') if ':' in item else (item, '', '53')
+        resolvers.append((host, int(port or 53)))
+    return resolvers
+
+
+def build_query(query_id, name, qtype=TYPE_A):
+    """Construye una consulta DNS (RD activado) para 'name'."""
+    header = struct.pack('!HHHHHH', query_id, 0x0100, 1, 0, 0, 0)
+    question = b''.join(
+        bytes([len(label)]) + label for label in (part.encode('idna') for part in name.rstrip('.').split('.'))
+    ) + b'\x00'
+    return header + question + struct.pack('!HH', qtype, CLASS_IN)
+
+
+def _read_name(data, offset):
+    """Lee un nombre (con compresión) y devuelve (nombre, offset tras el nombre)."""
+    labels = []
+    end = None
+    jumps = 0
+    while True:
+        if offset >= len(data):
+            raise DnsError('nombre truncado')
+        length = data[offset]
+        if length & 0xC0 == 0xC0:
+            if offset + 1 >= len(data) or jumps > 16:
+                raise DnsError('puntero de compresión inválido')
+            if end is None:
+                end = offset + 2
+            offset = ((length & 0x3F) << 8) | data[offset + 1]
+            jumps += 1
+            continue
+        offset += 1
+        if length == 0:
+            break
+        labels.append(data[offset:offset + length].decode('ascii', 'replace'))
+        offset += length
+    return '.'.join(labels).lower(), (end if end is not None else offset)
+
+
+def parse_response(data):
+    """
+    Analiza una respuesta DNS. Devuelve (id, rcode, direcciones A, CNAMEs, ttl mínimo).
+    Lanza DnsError si el paquete está mal formado.
+    """
+    if len(data) < 12:
+        raise DnsError('respuesta demasiado corta')
+    query_id, flags, qdcount, ancount, _, _ = struct.unpack('!HHHHHH', data[:12])
+    rcode = flags & 0x000F
+    offset = 12
+    for _ in range(qdcount):
+        _, offset = _read_name(data, offset)
+        offset += 4
+    addresses, cnames, ttls = [], [], []
+    for _ in range(ancount):
+        _, offset = _read_name(data, offset)
+        if offset + 10 > len(data):
+            raise DnsError('registro truncado')
+        rtype, rclass, ttl, rdlength = struct.unpack('!HHIH', data[offset:offset + 10])
+        offset += 10
+        rdata_offset = offset
+        offset += rdlength
+        if rclass != CLASS_IN:
+            continue
+        if rtype == TYPE_A and rdlength == 4:
+            addresses.append('.'.join(str(b) for b in data[rdata_offset:offset]))
+            ttls.append(ttl)
+        elif rtype == TYPE_CNAME:
+            cnames.append(_read_name(data, rdata_offset)[0])
+            ttls.append(ttl)
+    return query_id, rcode, addresses, cnames, min(ttls) if ttls else 0
+
+
+class DnsAnswer:
+    """
+    Resultado de resolver un nombre: direcciones IPv4 y cadena de CNAMEs. Sin direcciones
+    es una respuesta NODATA: el nombre existe pero no tiene registros A (p. ej. solo AAAA).
+    """
+
+    __slots__ = ('name', 'addresses', 'cnames')
+
+    def __init__(self, name, addresses, cnames):
+        self.name = name
+        self.addresses = addresses
+        self.cnames = cnames
+
+    def __repr__(self):
+        return f"DnsAnswer({self.name!r}, {self.addresses!r}, {self.cnames!r})"
+
+
+class DnsCache:
+    """
+    Caché de respuestas de AsyncResolver: nombre -> DnsAnswer (sin direcciones si es NODATA)
+    o None (NXDOMAIN). Cada entrada caduca según el TTL de la respuesta, acotado entre
+    MIN_TTL y max_ttl (las negativas, a negative_ttl), y como mucho se guardan max_entries
+    nombres: al llenarse se descartan los usados hace más tiempo (LRU). Una entrada
+    caducada se trata como si no estuviera. Se puede usar desde varios hilos.
+    """
+
+    # Aunque el TTL sea 0, la respuesta se conserva lo que dura una etapa (p. ej. el prefiltro
+    # consulta la caché justo después de resolver)
+    MIN_TTL = 60
+
+    def __init__(self, max_entries=200000, max_ttl=3600, negative_ttl=300):
+        self.max_entries = max(1, max_entries)
+        self.max_ttl = max(self.MIN_TTL, max_ttl)
+        self.negative_ttl = max(self.MIN_TTL, negative_ttl)
+        self._entries = OrderedDict() # nombre -> (respuesta, instante de caducidad)
+        self._lock = threading.Lock()
+
+    def _lookup(self, name):
+        """(True, respuesta) si hay una entrada vigente; (False, None) si no. Llamar con el lock."""
+        entry = self._entries.get(name)
+        if entry is None:
+            return False, None
+        if entry[1] <= time.monotonic():
+            del self._entries[name]
+            return False, None
+        self._entries.move_to_end(name)
+        return True, entry[0]
+
+    def put(self, name, answer, ttl=0):
+        if answer is None or not answer.addresses:
+            ttl = self.negative_ttl
+        else:
+            ttl = min(max(ttl, self.MIN_TTL), self.max_ttl)
+        with self._lock:
+            self._entries[name] = (answer, time.monotonic() + ttl)
+            self._entries.move_to_end(name)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, name, default=None):
+        with self._lock:
+            found, answer = self._lookup(name)
+        return answer if found else default
+
+    def __contains__(self, name):
+        with self._lock:
+            return self._lookup(name)[0]
+
+    def __getitem__(self, name):
+        with self._lock:
+            found, answer = self._lookup(name)
+        if not found:
+            raise KeyError(name)
+        return answer
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+
+class _ResolverProtocol(asyncio.DatagramProtocol):
+    """Socket UDP hacia un resolver: entrega cada respuesta a la consulta pendiente con su id."""
+
+    def __init__(self):
+        self.pending = {}
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        if len(data) < 2:
+            return
+        future = self.pending.get(struct.unpack('!H', data[:2])[0])
+        if future and not future.done():
+            future.set_result(data)
+
+    def error_received(self, exc):
+        # ICMP 'port unreachable' y similares: las consultas pendientes acabarán por timeout.
+        logger.debug(f"   [DNS] Error de socket: {exc}")
+
+
+class AsyncResolver:
+    """
+    Cliente DNS asíncrono (UDP) para resolver muchos nombres con alto rendimiento.
+
+    Cada llamada a resolve_many abre un socket por resolver y mantiene hasta 'concurrency'
+    consultas en vuelo, reparte las consultas entre los resolvers y reintenta en otro si hay
+    timeout o SERVFAIL. Las respuestas (también las negativas) se guardan en una DnsCache
+    compartida por todas las llamadas: una misma instancia puede usarse desde varios hilos
+    y etapas (fuerza bruta, pre-resolución) y cada nombre se consulta una vez mientras su
+    respuesta no caduque.
+    """
+
+    def __init__(self, resolvers=DEFAULT_RESOLVERS, concurrency=500, timeout=2.0, retries=2, cache=None):
+        self.resolvers = parse_resolvers(resolvers) or parse_resolvers(DEFAULT_RESOLVERS)
+        self.concurrency = max(1, concurrency)
+        self.timeout = timeout
+        self.retries = max(0, retries)
+        # nombre -> DnsAnswer (sin direcciones si es NODATA) o None si no existe (NXDOMAIN)
+        self.cache = cache if cache is not None else DnsCache()
+
+    @classmethod
+    def from_config(cls, config):
+        """Construye el resolver a partir de la sección [DNS] (valores por defecto si no existe)."""
+        def option(name, default, cast):
+            try:
+                return cast(config.get('DNS', name, fallback=default))
+            except (AttributeError, TypeError, ValueError):
+                return default
+
+        return cls(
+            resolvers=option('RESOLVERS', ', '.join(DEFAULT_RESOLVERS), str),
+            concurrency=option('CONCURRENCY', 500, int),
+            timeout=option('TIMEOUT', 2.0, float),
+            retries=option('RETRIES', 2, int),
+            cache=DnsCache(
+                max_entries=option('CACHE_SIZE', 200000, int),
+                max_ttl=option('CACHE_MAX_TTL', 3600, int),
+                negative_ttl=option('CACHE_NEGATIVE_TTL', 300, int),
+            ),
+        )
+
+    async def _open(self):
+        loop = asyncio.get_running_loop()
+        protocols = []
+        for host, port in self.resolvers:
+            _, protocol = await loop.create_datagram_endpoint(_ResolverProtocol, remote_addr=(host, port))
+            protocols.append(protocol)
+        return protocols
+
+    @staticmethod
+    def _close(protocols):
+        for protocol in protocols:
+            if protocol.transport:
+                protocol.transport.close()
+
+    def is_nxdomain(self, name):
+        """True si la caché tiene confirmado que el nombre no existe (NXDOMAIN)."""
+        name = name.lower().rstrip('.')
+        return self.cache.get(name, False) is None
+
+    async def _resolve(self, name, protocols, stats):
+        """Resuelve el registro A de 'name'. Devuelve DnsAnswer o None (NXDOMAIN, sin datos o sin respuesta)."""
+        name = name.lower().rstrip('.')
+        marker = object()
+        cached = self.cache.get(name, marker)
+        if cached is not marker:
+            stats['cache_hits'] += 1
+            return cached if cached and cached.addresses else None
+
+        answer = None
+        ttl = 0
+        start = random.randrange(len(protocols))
+        for attempt in range(self.retries + 1):
+            protocol = protocols[(start + attempt) % len(protocols)]
+            result = await self._query(protocol, name, stats)
+            if result is None:
+                continue # Timeout o SERVFAIL: se reintenta en el siguiente resolver
+            rcode, addresses, cnames, ttl = result
+            if rcode == RCODE_NOERROR:
+                # Sin direcciones (NODATA) se cachea aparte de NXDOMAIN: el nombre existe
+                answer = DnsAnswer(name, addresses, cnames)
+            break
+        else:
+            # Sin respuesta válida de ningún resolver: no se cachea, pero cuenta como inexistente.
+            return None
+        self.cache.put(name, answer, ttl)
+        return answer if answer and answer.addresses else None
+
+    async def _query(self, protocol, name, stats):
+        """Una consulta a un resolver. Devuelve (rcode, direcciones, cnames, ttl) o None si hay que reintentar."""
+        loop = asyncio.get_running_loop()
+        query_id = random.randrange(0x10000)
+        while query_id in protocol.pending:
+            query_id = random.randrange(0x10000)
+        future = loop.create_future()
+        protocol.pending[query_id] = future
+        stats['queries'] += 1
+        try:
+            protocol.transport.sendto(build_query(query_id, name))
+            data = await asyncio.wait_for(future, self.timeout)
+            _, rcode, addresses, cnames, ttl = parse_response(data)
+        except asyncio.TimeoutError:
+            stats['timeouts'] += 1
+            return None
+        except (DnsError, UnicodeError, OSError) as e:
+            logger.debug(f"   [DNS] Respuesta inválida para {name}: {e}")
+            return None
+        finally:
+            protocol.pending.pop(query_id, None)
+        if rcode not in (RCODE_NOERROR, RCODE_NXDOMAIN):
+            return None
+        return rcode, addresses, cnames, ttl
+
+    async def _resolve_stream(self, names, on_answer, on_missing, stats):
+        protocols = await self._open()
+        try:
+            iterator = iter(names)
+
+            async def worker():
+                # Todos los workers comparten el iterador: la lista de nombres nunca se materializa.
+                for name in iterator:
+                    answer = await self._resolve(name, protocols, stats)
+                    if answer:
+                        on_answer(answer)
+                    elif on_missing:
+                        on_missing(name)
+
+            await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+        finally:
+            self._close(protocols)
+
+    def resolve_many(self, names, on_answer, on_missing=None):
+        """
+        Resuelve un iterable de nombres (puede ser un generador de millones de entradas)
+        con 'concurrency' consultas en vuelo, llamando a on_answer(DnsAnswer) por cada
+        nombre que existe y, si se indica, a on_missing(nombre) por los que no.
+        Bloquea hasta terminar; se puede llamar desde cualquier hilo.
+        Devuelve las estadísticas de la llamada (consultas, aciertos de caché, timeouts).
+        """
+        stats = {'queries': 0, 'cache_hits': 0, 'timeouts': 0}
+        asyncio.run(self._resolve_stream(names, on_answer, on_missing, stats))
+        return stats
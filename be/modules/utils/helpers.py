@@ -3,9 +3,95 @@
 import subprocess
 import os
 import logging
+import threading
+import contextvars
+import signal
+import time
+import json
+import shlex
+import tempfile
+from collections import deque
+
+from .scheduler import Scheduler, get_scheduler, configure_scheduler
+from .metrics import get_metrics
 
 logger = logging.getLogger(__name__)
 
+# Límite global de herramientas externas ejecutándose a la vez (compartido por todos los
+# objetivos que se escanean en paralelo). Lo aplica el planificador (ver scheduler.py),
+# junto con los límites por objetivo y de herramientas pesadas.
+DEFAULT_MAX_CONCURRENT_TOOLS = Scheduler.DEFAULT_MAX_TOOLS
+
+# Líneas finales de stderr que se guardan de cada herramienta para diagnosticar fallos.
+STDERR_TAIL_LINES = 50
+# Cada cuánto (segundos) revisa el watchdog el timeout y la cancelación.
+WATCHDOG_INTERVAL = 0.2
+
+def set_max_concurrent_tools(limit, config=None):
+    """
+    Define cuántos procesos externos pueden correr simultáneamente en todo el programa.
+    Con 'config' se cargan además el resto de límites de [SCHEDULER] y [RATE_LIMITS].
+    """
+    configure_scheduler(config, max_tools=max(1, int(limit)))
+    logger.debug(f"Límite global de herramientas concurrentes: {limit}")
+
+def submit_with_context(executor, func, *args, **kwargs):
+    """
+    Envía una tarea a un executor conservando las contextvars del hilo actual
+    (por ejemplo, el objetivo que aparece en los logs).
+    """
+    context = contextvars.copy_context()
+    return executor.submit(context.run, func, *args, **kwargs)
+
+def _current_umask():
+    # os.umask() solo se puede leer cambiándola; se hace una vez, al importar el módulo
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+# Permisos de los archivos que escriben atomic_write_*: los de un open() normal
+# (mkstemp los crea con 0600).
+NEW_FILE_MODE = 0o666 & ~_current_umask()
+
+def atomic_write_json(path, data, **dump_kwargs):
+    """
+    Escribe un JSON de forma atómica: primero en un temporal del mismo directorio y luego
+    os.replace(), de modo que un corte a mitad nunca deja el archivo a medias.
+    """
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp_', suffix='.json')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f, **dump_kwargs)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, NEW_FILE_MODE)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+def atomic_write_text(path, text):
+    """Como atomic_write_json, para texto (p. ej. el textfile de Prometheus)."""
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp_')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(text)
+        os.chmod(tmp_path, NEW_FILE_MODE)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
 def update_execution_environment():
     """
     Actualiza la variable PATH para incluir $HOME/go/bin.
@@ -19,36 +105,216 @@ def update_execution_environment():
         os.environ['PATH'] = f"{go_bin_path}:{current_path}"
         logger.debug(f"PATH de ejecución actualizado para incluir: {go_bin_path}")
 
+class CommandError(Exception):
+    """Fallo de una herramienta externa. 'stderr_tail' guarda sus últimas líneas de stderr."""
+
+    def __init__(self, message, returncode=None, stderr_tail=None):
+        super().__init__(message)
+        self.returncode = returncode
+        self.stderr_tail = list(stderr_tail or [])
+
+
+class CommandTimeout(CommandError):
+    """La herramienta externa superó su tiempo límite y fue terminada."""
+
+
+class CommandCancelled(CommandError):
+    """La ejecución se canceló desde fuera mediante el evento de cancelación."""
+
+
 def execute_command(command, timeout=30000):
     """
     Ejecuta un comando de shell y retorna la salida estándar.
     Lanza una excepción en caso de error o timeout.
+    Para salidas grandes es preferible stream_command(), que no acumula todo en memoria.
+    """
+    return '\n'.join(stream_command(command, timeout=timeout))
+
+def stream_command(command, input_lines=None, timeout=None, cancel_event=None, stderr_lines=STDERR_TAIL_LINES,
+                   streaming=False):
+    """
+    Ejecuta un comando y va devolviendo su salida estándar línea a línea, sin acumularla
+    en memoria. 'command' es una lista de argumentos (se ejecuta sin shell, así que los
+    objetivos y rutas que lleve nunca se interpretan) o, para tuberías fijas, una cadena
+    de shell que no debe contener datos externos.
+
+    - input_lines: iterable (incluso uno que bloquea a la espera de datos) que se
+      escribe en el stdin del proceso a medida que llega.
+    - timeout: segundos máximos de ejecución (None = sin límite).
+    - cancel_event: threading.Event; si se activa, el proceso se termina.
+    - stderr_lines: cuántas líneas finales de stderr se conservan para diagnóstico.
+    - streaming: input_lines llega de otra etapa que sigue en marcha; el proceso ocupa
+      una plaza de consumidor de streaming del planificador en lugar de una global.
+
+    Lanza CommandTimeout, CommandCancelled o CommandError al terminar si algo falló.
     """
     # 1. Aseguramos que el PATH esté actualizado antes de ejecutar cualquier cosa
-    update_execution_environment() 
-    
+    update_execution_environment()
+    use_shell = isinstance(command, str)
+    display = command if use_shell else shlex.join(command)
+    logger.debug(f"Ejecutando comando: {display}")
+
+    with get_scheduler().tool_slot(command, streaming=streaming):
+        if cancel_event is not None and cancel_event.is_set():
+            # Cancelado mientras esperaba plaza: ni siquiera se lanza
+            raise CommandCancelled("Ejecución cancelada")
+        try:
+            process = subprocess.Popen(
+                command,
+                shell=use_shell,
+                stdin=subprocess.PIPE if input_lines is not None else subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                bufsize=1,
+                start_new_session=True, # Para poder terminar también los procesos hijos del shell
+                env=os.environ.copy() # Usamos el entorno modificado
+            )
+        except FileNotFoundError:
+            logger.error(f"Herramienta no encontrada: Asegúrate de que esté en tu PATH o la ruta sea correcta.")
+            raise CommandError("Herramienta no encontrada")
+
+        started = time.monotonic()
+        returncode, usage = None, None
+        output_bytes = output_lines = 0
+        completed = False
+        stderr_tail = deque(maxlen=stderr_lines)
+        finished = threading.Event()
+        stop_reason = []
+        peak_rss = [0]
+        threads = [
+            threading.Thread(target=_drain_stream, args=(process.stderr, stderr_tail), daemon=True),
+            threading.Thread(target=_watchdog, args=(process, timeout, cancel_event, finished, stop_reason, peak_rss), daemon=True),
+        ]
+        if input_lines is not None:
+            threads.append(threading.Thread(target=_feed_stdin, args=(process.stdin, input_lines), daemon=True))
+        for thread in threads:
+            thread.start()
+
+        try:
+            for line in process.stdout:
+                output_bytes += len(line)
+                output_lines += 1
+                yield line.rstrip('\n')
+            returncode, usage = _reap(process)
+            completed = True
+        finally:
+            finished.set()
+            if process.returncode is None:
+                # El consumidor dejó de leer (o hubo una excepción): no dejamos procesos huérfanos.
+                _kill_process_group(process)
+                returncode, usage = _reap(process)
+            process.stdout.close()
+            # Damos un instante al hilo de stderr para recoger las últimas líneas.
+            threads[0].join(timeout=1)
+            if stop_reason:
+                status = stop_reason[0] # 'timeout' o 'cancelled'
+            elif not completed:
+                status = 'aborted'
+            else:
+                status = 'ok' if returncode == 0 else 'error'
+            get_metrics().record_command(command, returncode, time.monotonic() - started, status, usage,
+                                         peak_rss[0] or None, output_bytes, output_lines)
+
+    if stop_reason and stop_reason[0] == 'timeout':
+        logger.warning(f"Comando excedió el tiempo límite ({timeout}s): {display}")
+        raise CommandTimeout("Timeout en herramienta externa", returncode, stderr_tail)
+    if stop_reason and stop_reason[0] == 'cancelled':
+        logger.info(f"Comando cancelado: {display}")
+        raise CommandCancelled("Ejecución cancelada", returncode, stderr_tail)
+    if returncode != 0:
+        logger.warning(f"Comando falló con código {returncode}. Stderr: {' | '.join(stderr_tail)}")
+        raise CommandError(f"Fallo en herramienta externa: {display.split()[0]}", returncode, stderr_tail)
+
+def _reap(process):
+    """
+    Espera al proceso con wait4() para obtener, además del código de salida, su uso de
+    recursos (tiempo de CPU, incluidos los hijos del shell). Devuelve (código, rusage).
+    """
     try:
-        logger.debug(f"Ejecutando comando: {command}")
-        
-        process = subprocess.run(
-            command,
-            shell=True,
-            capture_output=True,
-            text=True,
-            timeout=timeout,
-            check=True, # Lanza CalledProcessError si el código de salida no es cero
-            env=os.environ.copy() # Usamos el entorno modificado
-        )
-        return process.stdout
-    except subprocess.CalledProcessError as e:
-        logger.warning(f"Comando falló con código {e.returncode}. Stderr: {e.stderr.strip()}")
-        raise Exception(f"Fallo en herramienta externa: {command.split()[0]}") from e
-    except subprocess.TimeoutExpired:
-        logger.warning(f"Comando excedió el tiempo límite ({timeout}s): {command}")
-        raise Exception("Timeout en herramienta externa")
-    except FileNotFoundError:
-        logger.error(f"Herramienta no encontrada: Asegúrate de que esté en tu PATH o la ruta sea correcta.")
-        raise Exception("Herramienta no encontrada")
-    except Exception as e:
-        logger.error(f"Error desconocido al ejecutar comando: {e}")
-        raise
\ No newline at end of file
+        while True:
+            try:
+                _, status, usage = os.wait4(process.pid, 0)
+                break
+            except InterruptedError:
+                continue
+    except ChildProcessError:
+        # Ya recogido por otro camino: sin datos de recursos
+        return process.wait(), None
+    process.returncode = os.waitstatus_to_exitcode(status)
+    return process.returncode, usage
+
+def _watchdog(process, timeout, cancel_event, finished, stop_reason, peak_rss):
+    """
+    Termina el proceso si vence el timeout o se activa el evento de cancelación. De paso
+    muestrea el pico de memoria del árbol de procesos para las métricas.
+    """
+    deadline = time.monotonic() + timeout if timeout else None
+    while not finished.wait(WATCHDOG_INTERVAL):
+        peak_rss[0] = max(peak_rss[0], _tree_peak_rss(process.pid))
+        if cancel_event is not None and cancel_event.is_set():
+            stop_reason.append('cancelled')
+        elif deadline is not None and time.monotonic() >= deadline:
+            stop_reason.append('timeout')
+        else:
+            continue
+        _kill_process_group(process)
+        return
+
+def _tree_peak_rss(pid):
+    """
+    Suma del pico de RSS (VmHWM, en bytes) del shell y sus descendientes según /proc.
+    El ru_maxrss de wait4() no sirve aquí: incluye la memoria del propio Python en el
+    momento del fork. Devuelve 0 si /proc no está disponible.
+    """
+    total, pending = 0, [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            with open(f"/proc/{current}/status") as f:
+                for line in f:
+                    if line.startswith('VmHWM:'):
+                        total += int(line.split()[1]) * 1024
+                        break
+            with open(f"/proc/{current}/task/{current}/children") as f:
+                pending.extend(int(child) for child in f.read().split())
+        except (OSError, ValueError):
+            continue
+    return total
+
+def _kill_process_group(process):
+    """Mata el shell y todo lo que haya lanzado (p. ej. 'echo x | gau')."""
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+def _feed_stdin(stdin, input_lines):
+    """Escribe cada elemento de input_lines en el stdin del proceso y lo cierra al terminar."""
+    try:
+        for item in input_lines:
+            stdin.write(f"{item}\n")
+            stdin.flush()
+    except (BrokenPipeError, ValueError):
+        pass
+    finally:
+        try:
+            stdin.close()
+        except (BrokenPipeError, ValueError):
+            pass
+
+def _drain_stream(stream, tail):
+    """Consume un stream (stderr) guardando solo las últimas líneas."""
+    for line in stream:
+        line = line.strip()
+        if line:
+            tail.append(line)
+    stream.close()
+
+def iter_queue(source_queue, sentinel=None):
+    """Itera sobre una cola hasta recibir el centinela; permite encadenar etapas."""
+    while True:
+        item = source_queue.get()
+        if item is sentinel:
+            return
+        yield item
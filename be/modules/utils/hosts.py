@@ -0,0 +1,122 @@
+# be/modules/utils/hosts.py
+
+import ipaddress
+import logging
+import re
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+# Etiqueta DNS: letras, dígitos, '-' y '_' (frecuente en registros de servicio), sin '-' en los extremos
+_LABEL = re.compile(r'^(?!-)[a-z0-9_-]{1,63}(?<!-)$')
+_DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def normalize_hostname(value, allow_ip=False):
+    """
+    Reduce una entrada (subdominio, URL, 'host:puerto'...) a un hostname limpio en minúsculas.
+    Devuelve None si no es un hostname válido: emails, wildcards, espacios, etiquetas
+    inválidas o, salvo allow_ip, direcciones IP.
+    """
+    if not value:
+        return None
+    value = value.strip().lower()
+    if '://' in value:
+        value = value.split('://', 1)[1]
+    # Fuera ruta, query y fragmento
+    value = re.split(r'[/?#]', value, maxsplit=1)[0]
+    # Un '@' indica un email (Nombre.Apellido@dominio) o credenciales en la URL: se descarta
+    if '@' in value or '*' in value or any(char.isspace() for char in value):
+        return None
+    if value.startswith('['):
+        return None # IPv6 literal: no es un hostname que sondear/rastrear por nombre
+    value = value.rsplit(':', 1)[0] if value.count(':') == 1 else value
+    value = value.rstrip('.')
+    if not value or len(value) > 253:
+        return None
+
+    try:
+        ipaddress.IPv4Address(value)
+        return value if allow_ip else None
+    except ValueError:
+        pass
+
+    labels = value.split('.')
+    if len(labels) < 2 or not all(_LABEL.match(label) for label in labels):
+        return None
+    if labels[-1].isdigit():
+        return None # TLD numérico: restos de IPs mal formadas
+    return value
+
+
+def in_scope(hostname, root_domain):
+    """True si hostname es el dominio raíz o uno de sus subdominios (no basta con endswith)."""
+    root_domain = root_domain.lower().rstrip('.')
+    return hostname == root_domain or hostname.endswith('.' + root_domain)
+
+
+def clean_hostnames(values, root_domain=None):
+    """Normaliza, valida y deduplica una colección de nombres; opcionalmente exige el dominio raíz."""
+    cleaned = set()
+    for value in values:
+        hostname = normalize_hostname(value)
+        if hostname and (root_domain is None or in_scope(hostname, root_domain)):
+            cleaned.add(hostname)
+    return cleaned
+
+
+def crawl_unit_key(value):
+    """
+    Clave que identifica una unidad de rastreo: hostname sin 'www.', puerto (si no es el
+    por defecto del esquema) y ruta. http/https y www/sin www caen en la misma clave.
+    Devuelve None si la entrada no es un host válido.
+    """
+    raw = value.strip()
+    parts = urlsplit(raw if '://' in raw else f"//{raw}")
+    hostname = normalize_hostname(parts.netloc, allow_ip=True)
+    if not hostname:
+        return None
+    try:
+        port = parts.port
+    except ValueError:
+        return None
+    if port is not None and port == _DEFAULT_PORTS.get(parts.scheme.lower()):
+        port = None
+    if port in (80, 443) and not parts.scheme:
+        port = None
+    if hostname.startswith('www.') and hostname.count('.') >= 2:
+        hostname = hostname[len('www.'):]
+    return hostname, port, parts.path.rstrip('/')
+
+
+def _preference(value):
+    """Orden de preferencia del representante: https primero y luego la forma sin 'www.'."""
+    lowered = value.strip().lower()
+    host_part = lowered.split('://', 1)[-1]
+    return (not lowered.startswith('https://'), host_part.startswith('www.'), lowered)
+
+
+def group_crawl_units(values):
+    """
+    Agrupa hosts/URLs equivalentes en unidades de rastreo.
+    Devuelve una lista de (representante, [alias]) en el orden de la primera aparición;
+    las entradas inválidas (emails, basura) se descartan con un aviso.
+    """
+    groups = {}
+    rejected = 0
+    for value in values:
+        key = crawl_unit_key(value)
+        if key is None:
+            rejected += 1
+            continue
+        groups.setdefault(key, [])
+        if value not in groups[key]:
+            groups[key].append(value)
+    if rejected:
+        logger.info(f"   [Hosts] Se descartaron {rejected} entradas que no son hosts válidos.")
+
+    units = []
+    for members in groups.values():
+        representative = min(members, key=_preference)
+        units.append((representative, [member for member in members if member != representative]))
+    return units
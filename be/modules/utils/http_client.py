@@ -0,0 +1,149 @@
+# be/modules/utils/http_client.py
+
+import codecs
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import MaxRetryError, ResponseError
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+# Estados que merecen reintento: límite de peticiones y errores transitorios del servidor
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+_session = None
+_session_lock = threading.Lock()
+# Instante límite (time.monotonic()) de las peticiones del hilo actual; ver request_deadline
+_deadline = threading.local()
+
+
+@contextmanager
+def request_deadline(deadline):
+    """
+    Las peticiones que haga este hilo dentro del bloque no esperan a reintentar (por
+    Retry-After o backoff) más allá de 'deadline': si la espera lo supera, fallan con
+    requests.exceptions.RetryError en lugar de dormir.
+    """
+    previous = getattr(_deadline, 'value', None)
+    _deadline.value = deadline
+    try:
+        yield
+    finally:
+        _deadline.value = previous
+
+
+class DeadlineRetry(Retry):
+    """Retry que respeta el plazo de request_deadline antes de dormir entre reintentos."""
+
+    def sleep(self, response=None):
+        deadline = getattr(_deadline, 'value', None)
+        if deadline is not None:
+            wait = self.get_retry_after(response) if self.respect_retry_after_header and response else None
+            if wait is None:
+                wait = self.get_backoff_time()
+            if time.monotonic() + wait > deadline:
+                raise MaxRetryError(None, None, ResponseError(f"la espera para reintentar ({wait:.0f}s) supera el plazo"))
+        super().sleep(response)
+
+
+def build_session(pool_size=10, retries=3, backoff=1.0, user_agent=None):
+    """
+    Crea una sesión de requests con pool de conexiones y reintentos con backoff
+    exponencial (respetando Retry-After) para 429 y errores 5xx.
+    """
+    retry = DeadlineRetry(
+        total=retries, connect=retries, read=retries, status=retries,
+        backoff_factor=backoff, status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(['GET']), respect_retry_after_header=True,
+        # Agotados los reintentos se devuelve la última respuesta: raise_for_status la convierte en error
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update({'User-Agent': user_agent or 'BugBounty-Framework/v0.1', 'Accept': 'application/json'})
+    return session
+
+
+def shared_session(config=None):
+    """
+    Sesión única del proceso para las APIs de reconocimiento (los objetivos en paralelo
+    reutilizan las conexiones). Se configura con [RECON] API_POOL_SIZE, API_RETRIES y
+    API_BACKOFF la primera vez que se pide.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            try:
+                options = dict(
+                    pool_size=config.getint('RECON', 'API_POOL_SIZE', fallback=10),
+                    retries=config.getint('RECON', 'API_RETRIES', fallback=3),
+                    backoff=config.getfloat('RECON', 'API_BACKOFF', fallback=1.0),
+                )
+            except (AttributeError, ValueError):
+                options = {}
+            _session = build_session(**options)
+        return _session
+
+
+def iter_json_array(chunks):
+    """
+    Decodifica un array JSON que llega por trozos (bytes) y devuelve sus elementos uno a
+    uno, sin cargar el documento completo en memoria. Lanza json.JSONDecodeError si el
+    contenido no es un array JSON válido.
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    buffer, pos = '', 0
+    started = finished = False
+
+    def skip(position):
+        while position < len(buffer) and buffer[position] in ' \t\r\n,':
+            position += 1
+        return position
+
+    for chunk in chunks:
+        if not chunk:
+            continue
+        # Se descarta lo ya consumido para que el buffer no crezca con la respuesta
+        buffer = buffer[pos:] + text_decoder.decode(chunk)
+        pos = 0
+        while True:
+            pos = skip(pos)
+            if pos >= len(buffer):
+                break
+            if not started:
+                if buffer[pos] != '[':
+                    raise json.JSONDecodeError("Se esperaba un array JSON", buffer, pos)
+                started = True
+                pos += 1
+                continue
+            if buffer[pos] == ']':
+                finished = True
+                break
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                break # Elemento incompleto: hace falta el siguiente trozo
+            following = end
+            while following < len(buffer) and buffer[following] in ' \t\r\n':
+                following += 1
+            if following >= len(buffer) or buffer[following] not in ',]':
+                # Tras un elemento siempre viene ',' o ']': si aún no ha llegado, un número
+                # puede estar partido entre trozos ('3' o '3.' de '3.5')
+                break
+            pos = end
+            yield item
+        if finished:
+            break # Lo que venga después del ']' no se lee
+
+    if not finished:
+        # Falta el ']' final: respuesta cortada (o vacía)
+        raise json.JSONDecodeError("Array JSON incompleto", buffer[pos:], 0)
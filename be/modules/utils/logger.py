@@ -0,0 +1,223 @@
+# be/modules/utils/logger.py
+
+import atexit
+import contextvars
+import gzip
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import shutil
+import sys
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+try:
+    import fcntl
+except ImportError: # Sin bloqueos de archivo (no POSIX): cada proceso usa su propio log
+    fcntl = None
+
+# Objetivo que se está procesando en el hilo/contexto actual. Se usa para que cada
+# línea de log indique a qué dominio pertenece cuando se escanean varios a la vez.
+current_target = contextvars.ContextVar('current_target', default='-')
+# Etapa en curso en el hilo/contexto actual (la fija RunMetrics.stage); los comandos que
+# se ejecutan dentro se le atribuyen y las líneas de log la llevan.
+current_stage = contextvars.ContextVar('current_stage', default='-')
+
+LOG_FORMAT = '%(asctime)s - [%(target)s] [%(stage)s] - %(name)s - %(levelname)s - %(message)s'
+
+_listener = None
+# Bloqueos de los logs compartidos que este proceso tiene en propiedad: ruta -> archivo abierto
+_owned_logs = {}
+
+
+class TargetContextFilter(logging.Filter):
+    """Añade los atributos 'target' y 'stage' a cada registro a partir del contexto actual."""
+
+    def filter(self, record):
+        if not hasattr(record, 'target'):
+            record.target = current_target.get()
+        if not hasattr(record, 'stage'):
+            record.stage = current_stage.get()
+        return True
+
+
+@contextmanager
+def target_context(target):
+    """Marca todas las líneas de log emitidas dentro del bloque con el objetivo dado."""
+    token = current_target.set(target)
+    try:
+        yield
+    finally:
+        current_target.reset(token)
+
+
+class ContextQueueHandler(logging.handlers.QueueHandler):
+    """
+    Deja el registro en la cola sin formatearlo: el hilo que registra solo copia el
+    contexto (objetivo y etapa, que son del hilo que llama) y el formateo y la escritura
+    los hace el QueueListener en segundo plano.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.addFilter(TargetContextFilter())
+
+    def prepare(self, record):
+        # El listener está en el mismo proceso: no hace falta que el registro sea serializable
+        return record
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """Un objeto JSON por línea, con el objetivo y la etapa como campos propios."""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'target': getattr(record, 'target', '-'),
+            'stage': getattr(record, 'stage', '-'),
+            'thread': record.threadName,
+            'message': record.getMessage(),
+        }
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def _gzip_namer(name):
+    return name + '.gz'
+
+
+def _gzip_rotator(source, dest):
+    """Comprime el archivo rotado (lo ejecuta el listener, no los hilos de escaneo)."""
+    with open(source, 'rb') as src, gzip.open(dest, 'wb') as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(source)
+
+
+def _rotating_handler(path, max_bytes, backups, compress):
+    handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups,
+                                                   encoding='utf-8', delay=True)
+    if compress:
+        handler.namer = _gzip_namer
+        handler.rotator = _gzip_rotator
+    return handler
+
+
+def _claim_log(path):
+    """
+    Intenta quedarse en exclusiva el log 'path' (flock sobre 'path.lock', mientras viva el
+    proceso). RotatingFileHandler no admite que varios procesos roten el mismo archivo.
+    """
+    if path in _owned_logs:
+        return True
+    if fcntl is None:
+        return False
+    lock_file = open(path + '.lock', 'a')
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return False
+    _owned_logs[path] = lock_file
+    return True
+
+
+def _process_log_name(name):
+    """'bugbounty.log' -> 'bugbounty.<pid>.log'"""
+    base, extension = os.path.splitext(name)
+    return f"{base}.{os.getpid()}{extension}"
+
+
+def _logging_options(config, output_dir):
+    """Opciones de la sección [LOGGING] con sus valores por defecto."""
+    options = {'dir': output_dir or 'logs', 'file': 'bugbounty.log', 'max_mb': 20, 'backups': 10,
+               'compress': True, 'jsonl_file': ''}
+    try:
+        options['dir'] = config.get('LOGGING', 'DIR', fallback=options['dir']).strip() or options['dir']
+        options['file'] = config.get('LOGGING', 'FILE', fallback=options['file']).strip()
+        options['max_mb'] = max(0, config.getint('LOGGING', 'MAX_MB', fallback=options['max_mb']))
+        options['backups'] = max(0, config.getint('LOGGING', 'BACKUPS', fallback=options['backups']))
+        options['compress'] = config.getboolean('LOGGING', 'COMPRESS', fallback=options['compress'])
+        options['jsonl_file'] = config.get('LOGGING', 'JSONL_FILE', fallback='').strip()
+    except (AttributeError, ValueError):
+        pass
+    return options
+
+
+def configure_logging(config=None, verbose=False, stream=None, output_dir=None):
+    """
+    Configura el logging de la aplicación: el logger raíz solo deja cada registro en una
+    cola y un QueueListener lo escribe en segundo plano en la consola, en el archivo de
+    log rotativo (comprimido al rotar si COMPRESS) y, si JSONL_FILE, en un log JSONL.
+    Llamarla de nuevo sustituye la configuración anterior. Devuelve el listener.
+
+    Los logs rotativos tienen un único proceso dueño a la vez: si otro proceso (un worker,
+    una ejecución de cron solapada...) ya escribe en ellos, este usa los suyos propios
+    con el pid en el nombre (bugbounty.<pid>.log).
+    """
+    options = _logging_options(config, output_dir)
+    os.makedirs(options['dir'], exist_ok=True)
+    formatter = logging.Formatter(LOG_FORMAT)
+    owner_file = options['file'] or options['jsonl_file']
+    if owner_file and not _claim_log(os.path.join(options['dir'], owner_file)):
+        options['file'] = options['file'] and _process_log_name(options['file'])
+        options['jsonl_file'] = options['jsonl_file'] and _process_log_name(options['jsonl_file'])
+
+    handlers = []
+    console = logging.StreamHandler(stream or sys.stdout)
+    console.setFormatter(formatter)
+    handlers.append(console)
+    max_bytes = options['max_mb'] * 1024 * 1024
+    if options['file']:
+        file_handler = _rotating_handler(os.path.join(options['dir'], options['file']), max_bytes,
+                                         options['backups'], options['compress'])
+        file_handler.setFormatter(formatter)
+        handlers.append(file_handler)
+    if options['jsonl_file']:
+        jsonl_handler = _rotating_handler(os.path.join(options['dir'], options['jsonl_file']), max_bytes,
+                                          options['backups'], options['compress'])
+        jsonl_handler.setFormatter(JsonLinesFormatter())
+        handlers.append(jsonl_handler)
+
+    # Cola sin límite: registrar nunca bloquea al hilo que llama
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
+    root.addHandler(ContextQueueHandler(log_queue))
+    root.setLevel(logging.DEBUG if verbose else logging.INFO)
+
+    global _listener
+    previous, _listener = _listener, logging.handlers.QueueListener(log_queue, *handlers,
+                                                                    respect_handler_level=True)
+    _listener.start()
+    if previous is not None:
+        # Lo que quedara en la cola anterior se escribe con la configuración anterior
+        previous.stop()
+        for handler in previous.handlers:
+            handler.close()
+    return _listener
+
+
+def stop_logging():
+    """Vacía la cola, detiene el listener y cierra sus handlers (se llama también al salir)."""
+    global _listener
+    listener, _listener = _listener, None
+    if listener is None:
+        return
+    # Lo que se registre después ya no pasa por la cola (Python usa su handler de último recurso)
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        if isinstance(handler, ContextQueueHandler):
+            root.removeHandler(handler)
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
+
+
+atexit.register(stop_logging)
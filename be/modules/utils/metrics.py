@@ -0,0 +1,236 @@
+# be/modules/utils/metrics.py
+
+import contextvars
+import cProfile
+import io
+import logging
+import pstats
+import shlex
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+from .logger import current_target, current_stage
+from .scheduler import Scheduler
+
+logger = logging.getLogger(__name__)
+
+
+class RunMetrics:
+    """
+    Métricas de una ejecución: por objetivo y etapa (tiempo real, elementos de entrada y
+    salida, errores y timeouts) y por comando externo (código de salida, duración, CPU,
+    pico de memoria RSS y tamaño de la salida). El Manager las guarda al final como
+    resumen JSON y como textfile de Prometheus (para el textfile collector de node_exporter).
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self.stages = []
+        self.commands = []
+        self.errors = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name, items_in=None):
+        """
+        Mide una etapa del objetivo actual. El bloque recibe el registro y puede rellenar
+        record['items_out']; una excepción se cuenta como error y se vuelve a lanzar.
+        """
+        record = {
+            'target': current_target.get(), 'stage': name, 'items_in': items_in, 'items_out': None,
+            'duration': 0.0, 'errors': 0, 'timeouts': 0, 'commands': 0, 'status': 'ok',
+        }
+        token = current_stage.set(name)
+        start = time.monotonic()
+        try:
+            yield record
+        except BaseException:
+            record['status'] = 'error'
+            record['errors'] += 1
+            raise
+        finally:
+            record['duration'] = round(time.monotonic() - start, 3)
+            current_stage.reset(token)
+            with self._lock:
+                self.stages.append(record)
+
+    def record_command(self, command, returncode, duration, status, usage=None, max_rss=None, output_bytes=0,
+                       output_lines=0):
+        """Registra un proceso externo (lo llama stream_command al terminar cada uno)."""
+        names = Scheduler.tool_names(command)
+        record = {
+            'target': current_target.get(), 'stage': current_stage.get(), 'tool': names[-1] if names else '?',
+            'command': command if isinstance(command, str) else shlex.join(command), 'returncode': returncode, 'status': status, 'duration': round(duration, 3),
+            'cpu_user': round(usage.ru_utime, 3) if usage else None,
+            'cpu_system': round(usage.ru_stime, 3) if usage else None,
+            # Muestreado durante la ejecución: None si el comando duró menos que un muestreo
+            'max_rss_bytes': max_rss,
+            'output_bytes': output_bytes, 'output_lines': output_lines,
+        }
+        with self._lock:
+            self.commands.append(record)
+
+    def count_error(self, kind):
+        """Cuenta un error o timeout que no es de un comando (p. ej. una API que falla)."""
+        key = (current_target.get(), current_stage.get(), kind)
+        with self._lock:
+            self.errors[key] = self.errors.get(key, 0) + 1
+
+    def summary(self):
+        """Resumen serializable: etapas (con sus comandos agregados), comandos y totales por herramienta."""
+        with self._lock:
+            stages = [dict(stage) for stage in self.stages]
+            commands = list(self.commands)
+            errors = dict(self.errors)
+
+        for stage in stages:
+            key = (stage['target'], stage['stage'])
+            related = [c for c in commands if (c['target'], c['stage']) == key]
+            stage['commands'] = len(related)
+            stage['errors'] += sum(1 for c in related if c['status'] == 'error')
+            stage['timeouts'] += sum(1 for c in related if c['status'] == 'timeout')
+            stage['errors'] += errors.get((*key, 'error'), 0)
+            stage['timeouts'] += errors.get((*key, 'timeout'), 0)
+
+        tools = {}
+        for command in commands:
+            tool = tools.setdefault(command['tool'], {
+                'runs': 0, 'duration': 0.0, 'cpu_seconds': 0.0, 'max_rss_bytes': 0, 'output_bytes': 0, 'statuses': {},
+            })
+            tool['runs'] += 1
+            tool['duration'] = round(tool['duration'] + command['duration'], 3)
+            tool['cpu_seconds'] = round(tool['cpu_seconds'] + (command['cpu_user'] or 0) + (command['cpu_system'] or 0), 3)
+            tool['max_rss_bytes'] = max(tool['max_rss_bytes'], command['max_rss_bytes'] or 0)
+            tool['output_bytes'] += command['output_bytes']
+            tool['statuses'][command['status']] = tool['statuses'].get(command['status'], 0) + 1
+
+        return {
+            'started': self.started,
+            'duration': round(time.time() - self.started, 3),
+            'stages': stages,
+            'tools': tools,
+            'commands': commands,
+            'errors': [{'target': t, 'stage': s, 'kind': k, 'count': n} for (t, s, k), n in sorted(errors.items())],
+        }
+
+    @staticmethod
+    def prometheus(summary):
+        """Formato de exposición de texto de Prometheus."""
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP bugtool_{name} {help_text}")
+            lines.append(f"# TYPE bugtool_{name} {kind}")
+            for labels, value in samples:
+                label_text = ','.join(f'{key}="{_escape(val)}"' for key, val in labels.items())
+                lines.append(f"bugtool_{name}{{{label_text}}} {value}" if label_text else f"bugtool_{name} {value}")
+
+        stages = summary['stages']
+        metric('run_duration_seconds', 'gauge', 'Duración total de la ejecución.', [({}, summary['duration'])])
+        metric('stage_duration_seconds', 'gauge', 'Tiempo real de cada etapa por objetivo.',
+               [({'target': s['target'], 'stage': s['stage']}, s['duration']) for s in stages])
+        metric('stage_items_in', 'gauge', 'Elementos de entrada de la etapa.',
+               [({'target': s['target'], 'stage': s['stage']}, s['items_in']) for s in stages if s['items_in'] is not None])
+        metric('stage_items_out', 'gauge', 'Elementos de salida de la etapa.',
+               [({'target': s['target'], 'stage': s['stage']}, s['items_out']) for s in stages if s['items_out'] is not None])
+        metric('stage_errors', 'gauge', 'Errores en la etapa.',
+               [({'target': s['target'], 'stage': s['stage']}, s['errors']) for s in stages])
+        metric('stage_timeouts', 'gauge', 'Timeouts en la etapa.',
+               [({'target': s['target'], 'stage': s['stage']}, s['timeouts']) for s in stages])
+
+        tools = summary['tools']
+        metric('tool_runs_total', 'counter', 'Ejecuciones de cada herramienta por estado final.',
+               [({'tool': tool, 'status': status}, count)
+                for tool, data in sorted(tools.items()) for status, count in sorted(data['statuses'].items())])
+        metric('tool_duration_seconds_total', 'counter', 'Tiempo real acumulado por herramienta.',
+               [({'tool': tool}, data['duration']) for tool, data in sorted(tools.items())])
+        metric('tool_cpu_seconds_total', 'counter', 'CPU (usuario + sistema) acumulada por herramienta.',
+               [({'tool': tool}, data['cpu_seconds']) for tool, data in sorted(tools.items())])
+        metric('tool_max_rss_bytes', 'gauge', 'Pico de memoria RSS de la herramienta.',
+               [({'tool': tool}, data['max_rss_bytes']) for tool, data in sorted(tools.items())])
+        metric('tool_output_bytes_total', 'counter', 'Bytes de salida estándar por herramienta.',
+               [({'tool': tool}, data['output_bytes']) for tool, data in sorted(tools.items())])
+        return '\n'.join(lines) + '\n'
+
+    def log_summary(self, summary):
+        """Tabla corta en el log: etapas más lentas y coste por herramienta."""
+        logger.info(f"📊 Métricas de la ejecución ({summary['duration']:.1f}s):")
+        for stage in sorted(summary['stages'], key=lambda s: -s['duration'])[:10]:
+            counts = f"{stage['items_in'] if stage['items_in'] is not None else '-'} -> " \
+                     f"{stage['items_out'] if stage['items_out'] is not None else '-'}"
+            logger.info(f"   {stage['target']:<24} {stage['stage']:<11} {stage['duration']:>8.1f}s  {counts:<15} "
+                        f"errores: {stage['errors']}, timeouts: {stage['timeouts']}")
+        for tool, data in sorted(summary['tools'].items(), key=lambda item: -item[1]['duration']):
+            logger.info(f"   {tool:<24} {data['runs']:>4} ejecuciones {data['duration']:>9.1f}s  "
+                        f"CPU {data['cpu_seconds']:.1f}s  RSS máx. {data['max_rss_bytes'] / 1048576:.0f} MiB")
+
+
+class RunProfiler:
+    """
+    cProfile de la parte Python de la ejecución (--profile). cProfile solo perfila el hilo
+    que lo activa, así que cada hilo nuevo arranca su propio perfilador y al final se
+    combinan todos en un único archivo .prof (visible con snakeviz, pstats...).
+    """
+
+    def __init__(self):
+        self.profiles = []
+        self._lock = threading.Lock()
+        self._main = cProfile.Profile()
+
+    def _start_thread(self, *_):
+        # Primer evento de perfilado del hilo: se sustituye este gancho por un cProfile propio
+        sys.setprofile(None)
+        profile = cProfile.Profile()
+        with self._lock:
+            self.profiles.append(profile)
+        profile.enable()
+
+    def start(self):
+        threading.setprofile(self._start_thread)
+        self._main.enable()
+
+    def stop(self, path, top=20):
+        """Detiene el perfilado, guarda el .prof combinado y registra las funciones más costosas."""
+        self._main.disable()
+        threading.setprofile(None)
+        stats = pstats.Stats(self._main)
+        with self._lock:
+            for profile in self.profiles:
+                try:
+                    stats.add(profile)
+                except (TypeError, ValueError):
+                    continue # Hilo sin ninguna llamada registrada
+        try:
+            stats.dump_stats(path)
+            logger.info(f"🔬 Perfil de la ejecución guardado en {path}")
+        except OSError as e:
+            logger.warning(f"[Metrics] No se pudo guardar el perfil: {e}")
+        report = io.StringIO()
+        stats.stream = report
+        stats.sort_stats('cumulative').print_stats(top)
+        logger.debug(report.getvalue())
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+_metrics = RunMetrics()
+# Métricas propias del contexto actual: en modo servicio cada trabajo corre en su propio
+# contexto y no mezcla sus métricas con las de los trabajos simultáneos
+_context_metrics = contextvars.ContextVar('run_metrics', default=None)
+
+
+def get_metrics():
+    """Métricas de la ejecución en curso (compartidas por todos los módulos)."""
+    return _context_metrics.get() or _metrics
+
+
+def reset_metrics():
+    """Empieza a medir una ejecución nueva."""
+    global _metrics
+    _metrics = RunMetrics()
+    _context_metrics.set(_metrics)
+    return _metrics
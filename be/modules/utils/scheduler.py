@@ -0,0 +1,233 @@
+# be/modules/utils/scheduler.py
+
+import logging
+import os
+import shlex
+import threading
+import time
+from contextlib import contextmanager
+
+from .logger import current_target
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Limitador de ritmo: 'rate' peticiones por segundo con ráfagas de hasta 'burst'."""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.capacity = max(1.0, float(burst))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, timeout=None):
+        """Espera a tener un token. Devuelve False si no llega antes de 'timeout' segundos."""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait = (1 - self.tokens) / self.rate
+            if deadline is not None:
+                if now + wait > deadline:
+                    return False
+            time.sleep(wait)
+
+
+class Scheduler:
+    """
+    Planificador central de trabajo externo, compartido por todas las etapas y objetivos.
+
+    Cada proceso que lanza stream_command() pide plaza en tres límites (en este orden,
+    siempre el mismo para no bloquearse entre sí): por objetivo, de herramientas
+    pesadas (amass, katana, httpx...) y global. Los consumidores de streaming (el httpx
+    que lee por stdin lo que va saliendo del reconocimiento) solo cuentan en un límite
+    propio: viven tanto como sus productores y, si ocuparan plazas globales, pesadas o de
+    su objetivo, podrían dejar sin plaza a las herramientas de las que esperan la entrada.
+    Las llamadas a APIs pasan por un token bucket por servicio. Además centraliza los
+    flags de hilos de cada herramienta.
+    Todo se configura en [SCHEDULER] y [RATE_LIMITS].
+    """
+
+    DEFAULT_MAX_TOOLS = 8
+    DEFAULT_PER_TARGET_TOOLS = 4
+    DEFAULT_MAX_HEAVY_TOOLS = 3
+    DEFAULT_MAX_STREAM_TOOLS = 4
+    DEFAULT_HEAVY_TOOLS = 'amass, katana, httpx, subdominator'
+    # Flags de concurrencia de cada herramienta: opción de [SCHEDULER] -> (herramienta, flag)
+    THREAD_FLAGS = {
+        'GAU_THREADS': ('gau', '--threads'),
+        'KATANA_CONCURRENCY': ('katana', '-c'),
+        'SUBFINDER_THREADS': ('subfinder', '-t'),
+    }
+
+    def __init__(self, max_tools=DEFAULT_MAX_TOOLS, per_target_tools=DEFAULT_PER_TARGET_TOOLS,
+                 max_heavy_tools=DEFAULT_MAX_HEAVY_TOOLS, heavy_tools=None, rate_limits=None, tool_threads=None,
+                 max_stream_tools=DEFAULT_MAX_STREAM_TOOLS):
+        self.max_tools = max(1, int(max_tools))
+        self.per_target_tools = max(1, int(per_target_tools))
+        self.max_heavy_tools = max(1, int(max_heavy_tools))
+        self.max_stream_tools = max(1, int(max_stream_tools))
+        self.heavy_tools = set(heavy_tools if heavy_tools is not None else _split(self.DEFAULT_HEAVY_TOOLS))
+        self.buckets = {name: TokenBucket(rate, burst) for name, (rate, burst) in (rate_limits or {}).items()}
+        self.tool_threads = dict(tool_threads or {})
+        self._global_slots = threading.BoundedSemaphore(self.max_tools)
+        self._heavy_slots = threading.BoundedSemaphore(self.max_heavy_tools)
+        self._stream_slots = threading.BoundedSemaphore(self.max_stream_tools)
+        # objetivo -> [semáforo, procesos que lo usan o esperan]; se borra al quedar sin uso
+        self._target_slots = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config, max_tools=None):
+        """
+        Construye el planificador con [SCHEDULER] y [RATE_LIMITS]. El límite global sigue
+        siendo [RUN] MAX_CONCURRENT_TOOLS, con prioridad para 'max_tools' (--max-tools).
+        """
+        def get_int(option, default, section='SCHEDULER'):
+            try:
+                return config.getint(section, option, fallback=default)
+            except (AttributeError, ValueError):
+                return default
+
+        try:
+            heavy = _split(config.get('SCHEDULER', 'HEAVY_TOOLS', fallback=cls.DEFAULT_HEAVY_TOOLS))
+        except AttributeError:
+            heavy = None
+        rate_limits = {}
+        if hasattr(config, 'has_section') and config.has_section('RATE_LIMITS'):
+            for name, value in config.items('RATE_LIMITS'):
+                limit = parse_rate(value)
+                if limit:
+                    rate_limits[name.lower()] = limit
+                else:
+                    logger.warning(f"   [Scheduler] Límite inválido en [RATE_LIMITS] {name} = {value} (formato: peticiones/segundos)")
+        tool_threads = {}
+        for option, (tool, flag) in cls.THREAD_FLAGS.items():
+            threads = get_int(option, 0)
+            if threads > 0:
+                tool_threads[tool] = (flag, threads)
+        return cls(
+            max_tools=max_tools or get_int('MAX_CONCURRENT_TOOLS', cls.DEFAULT_MAX_TOOLS, section='RUN'),
+            per_target_tools=get_int('PER_TARGET_TOOLS', cls.DEFAULT_PER_TARGET_TOOLS),
+            max_heavy_tools=get_int('MAX_HEAVY_TOOLS', cls.DEFAULT_MAX_HEAVY_TOOLS),
+            max_stream_tools=get_int('MAX_STREAM_TOOLS', cls.DEFAULT_MAX_STREAM_TOOLS),
+            heavy_tools=heavy, rate_limits=rate_limits, tool_threads=tool_threads,
+        )
+
+    @staticmethod
+    def tool_names(command):
+        """
+        Nombres de los ejecutables de un comando: de una lista de argumentos, el primero;
+        de una cadena de shell, el de cada tramo ('echo x | /go/bin/gau' -> ['echo', 'gau']).
+        """
+        if not isinstance(command, str):
+            return [os.path.basename(command[0])] if command else []
+        names = []
+        for segment in command.split('|'):
+            parts = segment.split()
+            if parts:
+                names.append(os.path.basename(parts[0]))
+        return names
+
+    def _slots_for_target(self, target):
+        """Semáforo del objetivo; cada llamada debe ir seguida de _release_target(target)."""
+        with self._lock:
+            entry = self._target_slots.get(target)
+            if entry is None:
+                entry = self._target_slots[target] = [threading.BoundedSemaphore(self.per_target_tools), 0]
+            entry[1] += 1
+            return entry[0]
+
+    def _release_target(self, target):
+        """Olvida el semáforo del objetivo cuando nadie lo usa (el modo servicio no acumula uno por objetivo)."""
+        with self._lock:
+            entry = self._target_slots.get(target)
+            if entry is not None:
+                entry[1] -= 1
+                if entry[1] <= 0:
+                    del self._target_slots[target]
+
+    @contextmanager
+    def tool_slot(self, command, streaming=False):
+        """
+        Reserva plaza para un proceso externo durante el bloque 'with'. 'streaming' marca
+        un consumidor alimentado por stdin desde otra etapa en curso (ver la clase).
+        """
+        target = current_target.get()
+        if streaming:
+            slots = [self._stream_slots]
+        else:
+            slots = [self._slots_for_target(target)]
+            if any(name in self.heavy_tools for name in self.tool_names(command)):
+                slots.append(self._heavy_slots)
+            slots.append(self._global_slots)
+
+        start = time.monotonic()
+        acquired = []
+        try:
+            for slot in slots:
+                slot.acquire()
+                acquired.append(slot)
+            waited = time.monotonic() - start
+            if waited >= 1:
+                logger.debug(f"   [Scheduler] {self.tool_names(command)[-1]} esperó {waited:.1f}s por plaza ({target}).")
+            yield
+        finally:
+            for slot in reversed(acquired):
+                slot.release()
+            if not streaming:
+                self._release_target(target)
+
+    def rate_limit(self, name, timeout=None):
+        """Espera turno en el token bucket de una API. Devuelve False si se agota 'timeout'."""
+        bucket = self.buckets.get(name.lower())
+        if bucket is None:
+            return True
+        return bucket.acquire(timeout)
+
+    def thread_args(self, tool):
+        """Flags de concurrencia configurados para una herramienta (' --threads 4' o '')."""
+        if tool not in self.tool_threads:
+            return ''
+        flag, threads = self.tool_threads[tool]
+        return f" {flag} {shlex.quote(str(threads))}"
+
+
+def _split(value):
+    return [item.strip().lower() for item in value.split(',') if item.strip()]
+
+
+def parse_rate(value):
+    """'5/60' -> (5/60 por segundo, ráfaga de 5); '2' -> 2 por segundo. None si no es válido."""
+    try:
+        requests, _, seconds = value.partition('/')
+        requests, seconds = float(requests), float(seconds or 1)
+    except ValueError:
+        return None
+    if requests <= 0 or seconds <= 0:
+        return None
+    return requests / seconds, max(1.0, requests)
+
+
+_scheduler = Scheduler()
+
+
+def get_scheduler():
+    """Planificador compartido del proceso."""
+    return _scheduler
+
+
+def configure_scheduler(config, max_tools=None):
+    """Sustituye el planificador compartido por uno construido con la configuración."""
+    global _scheduler
+    _scheduler = Scheduler.from_config(config, max_tools=max_tools)
+    logger.debug(f"Planificador: {_scheduler.max_tools} herramientas en total, {_scheduler.per_target_tools} por objetivo, "
+                 f"{_scheduler.max_heavy_tools} pesadas; límites de API: {', '.join(sorted(_scheduler.buckets)) or 'ninguno'}")
+    return _scheduler
@@ -0,0 +1,53 @@
+# be/modules/utils/secret_scan.py
+
+"""
+Búsqueda de secretos en el contenido de archivos JS. Se ejecuta en los procesos del pool
+de SecretsModule, así que este módulo solo depende de la biblioteca estándar (cada
+proceso lo importa al arrancar) y los patrones se compilan una vez por proceso.
+"""
+
+import re
+
+# Longitud máxima que se guarda de cada coincidencia
+MAX_MATCH_LENGTH = 200
+# Coincidencias máximas por archivo y patrón (un bundle con miles de falsos positivos no inunda la salida)
+MAX_MATCHES_PER_RULE = 50
+
+_patterns = []
+
+
+def compile_patterns(patterns):
+    """[(nombre, regex)] -> [(nombre, patrón compilado)], descartando los que no compilan."""
+    compiled = []
+    for name, pattern in patterns:
+        try:
+            compiled.append((name, re.compile(pattern)))
+        except re.error:
+            continue
+    return compiled
+
+
+def init_worker(patterns):
+    """Inicializador de cada proceso del pool."""
+    global _patterns
+    _patterns = compile_patterns(patterns)
+
+
+def scan_content(content, patterns=None):
+    """
+    Busca los patrones en el contenido (bytes) de un archivo. Devuelve una lista de
+    {'rule', 'match'} sin repeticiones.
+    """
+    text = content.decode('utf-8', 'replace')
+    findings = []
+    for name, pattern in patterns if patterns is not None else _patterns:
+        seen = set()
+        for match in pattern.finditer(text):
+            value = match.group(0)[:MAX_MATCH_LENGTH]
+            if value in seen:
+                continue
+            seen.add(value)
+            findings.append({'rule': name, 'match': value})
+            if len(seen) >= MAX_MATCHES_PER_RULE:
+                break
+    return findings
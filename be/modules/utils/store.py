@@ -0,0 +1,380 @@
+# be/modules/utils/store.py
+
+import csv
+import json
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started TEXT NOT NULL,
+    output_dir TEXT NOT NULL,
+    args TEXT
+);
+CREATE TABLE IF NOT EXISTS subdomains (
+    run_id INTEGER NOT NULL,
+    target TEXT NOT NULL,
+    host TEXT NOT NULL,
+    PRIMARY KEY (run_id, target, host)
+);
+CREATE INDEX IF NOT EXISTS idx_subdomains_host ON subdomains (host);
+CREATE INDEX IF NOT EXISTS idx_subdomains_target ON subdomains (target, run_id);
+
+CREATE TABLE IF NOT EXISTS probes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id INTEGER NOT NULL,
+    target TEXT NOT NULL,
+    host TEXT,
+    url TEXT,
+    ip TEXT,
+    scheme TEXT,
+    port INTEGER,
+    status_code INTEGER,
+    title TEXT,
+    tech TEXT,
+    content_type TEXT,
+    response_size INTEGER,
+    cname TEXT,
+    cdn INTEGER,
+    live INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_probes_host ON probes (host);
+CREATE INDEX IF NOT EXISTS idx_probes_status ON probes (status_code);
+CREATE INDEX IF NOT EXISTS idx_probes_target ON probes (target, run_id);
+CREATE TABLE IF NOT EXISTS probe_tech (
+    probe_id INTEGER NOT NULL,
+    tech TEXT NOT NULL COLLATE NOCASE
+);
+CREATE INDEX IF NOT EXISTS idx_probe_tech ON probe_tech (tech, probe_id);
+
+CREATE TABLE IF NOT EXISTS urls (
+    run_id INTEGER NOT NULL,
+    target TEXT NOT NULL,
+    host TEXT NOT NULL,
+    url TEXT NOT NULL,
+    category TEXT NOT NULL,
+    PRIMARY KEY (run_id, target, host, url, category)
+);
+CREATE INDEX IF NOT EXISTS idx_urls_category ON urls (category);
+CREATE INDEX IF NOT EXISTS idx_urls_host ON urls (host);
+CREATE INDEX IF NOT EXISTS idx_urls_target ON urls (target, run_id);
+CREATE TABLE IF NOT EXISTS secrets (
+    run_id INTEGER NOT NULL,
+    target TEXT NOT NULL,
+    host TEXT NOT NULL,
+    url TEXT NOT NULL,
+    sha256 TEXT NOT NULL,
+    rule TEXT NOT NULL,
+    match TEXT NOT NULL,
+    PRIMARY KEY (run_id, target, url, rule, match)
+);
+CREATE INDEX IF NOT EXISTS idx_secrets_rule ON secrets (rule);
+CREATE INDEX IF NOT EXISTS idx_secrets_target ON secrets (target, run_id);
+CREATE TABLE IF NOT EXISTS url_duplicates (
+    run_id INTEGER NOT NULL,
+    target TEXT NOT NULL,
+    host TEXT NOT NULL,
+    duplicate_of TEXT NOT NULL,
+    PRIMARY KEY (run_id, target, host)
+);
+"""
+
+# Columnas de probes en el mismo orden que los dicts de ProbingModule._parse_httpx_line
+PROBE_FIELDS = ('url', 'host', 'ip', 'scheme', 'port', 'status_code', 'title', 'tech',
+                'content_type', 'response_size', 'cname', 'cdn')
+
+# Tipos de exportación: tabla y columnas que se devuelven
+EXPORT_KINDS = {
+    'subdomains': ('subdomains', ('target', 'host')),
+    'live': ('probes', ('target', 'host', 'url')),
+    'probes': ('probes', ('target', 'live') + PROBE_FIELDS),
+    'urls': ('urls', ('target', 'host', 'url', 'category')),
+    'secrets': ('secrets', ('target', 'host', 'url', 'rule', 'match', 'sha256')),
+}
+EXPORT_FORMATS = ('txt', 'json', 'jsonl', 'csv')
+
+# Categoría con la que se guardan las URLs que no caen en ninguna otra (equivale a salidatodo.txt)
+UNCATEGORIZED = ''
+
+
+class ResultsStore:
+    """
+    Almacén local (SQLite) con los resultados de todas las ejecuciones y programas.
+
+    Cada etapa inserta sus resultados en bloque (subdominios, sondeos de httpx y URLs
+    clasificadas) asociados a una ejecución ('runs') y a un objetivo. Las tablas tienen
+    índices por host, estado, tecnología, categoría y ejecución, de modo que preguntas
+    como "qué hosts usan X en todos los programas" son consultas indexadas; los TXT/JSON
+    se pueden seguir generando bajo demanda con export().
+    """
+
+    DEFAULT_FILENAME = 'results.db'
+
+    def __init__(self, path, write_files=True, shared=False):
+        self.path = path
+        # Si es False, las etapas no escriben sus TXT/JSON y todo queda solo en la base de datos
+        self.write_files = write_files
+        # En un sistema de archivos compartido entre máquinas (modo distribuido) no sirve WAL,
+        # que necesita memoria compartida: se usa el journal clásico, como la cola de trabajo
+        self.shared = shared
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Una conexión compartida entre hilos; el lock serializa el acceso.
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        if shared:
+            self._conn.execute('PRAGMA journal_mode=DELETE')
+        else:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    @classmethod
+    def from_config(cls, config, shared_dir=None):
+        """
+        Construye el almacén a partir de la sección [STORE]. Devuelve None si está desactivado.
+        Con 'shared_dir' (modo distribuido) la base va en ese directorio compartido, que ven
+        el coordinador y todos los workers, en lugar de en [STORE] PATH.
+        """
+        try:
+            enabled = config.getboolean('STORE', 'ENABLED', fallback=True)
+            write_files = config.getboolean('STORE', 'WRITE_FILES', fallback=True)
+            base_output_dir = config.get('RECON', 'DEFAULT_OUTPUT_DIR', fallback='outputs/')
+            path = config.get('STORE', 'PATH', fallback=os.path.join(base_output_dir, cls.DEFAULT_FILENAME))
+        except (AttributeError, ValueError):
+            enabled, write_files, path = True, True, os.path.join('outputs', cls.DEFAULT_FILENAME)
+        if not enabled:
+            return None
+        if shared_dir:
+            path = os.path.join(shared_dir, cls.DEFAULT_FILENAME)
+        try:
+            return cls(path, write_files=write_files, shared=bool(shared_dir))
+        except sqlite3.Error as e:
+            logger.warning(f"[Store] No se pudo abrir la base de resultados {path}: {e}")
+            return None
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _write(self, statements):
+        """Ejecuta varias (sql, filas) en una única transacción."""
+        with self._lock:
+            try:
+                with self._conn:
+                    for sql, rows in statements:
+                        self._conn.executemany(sql, rows)
+            except sqlite3.Error as e:
+                logger.warning(f"[Store] Error al guardar en {self.path}: {e}")
+
+    # --- Ejecuciones ---
+
+    def start_run(self, output_dir, args=None, resume=False):
+        """
+        Registra una ejecución y devuelve su id. Con resume se reutiliza la última
+        ejecución sobre el mismo directorio de salida, para que los datos no se dupliquen.
+        """
+        output_dir = os.path.normpath(output_dir)
+        with self._lock:
+            if resume:
+                row = self._conn.execute(
+                    'SELECT id FROM runs WHERE output_dir = ? ORDER BY id DESC LIMIT 1', (output_dir,)
+                ).fetchone()
+                if row:
+                    return row[0]
+            with self._conn:
+                cursor = self._conn.execute(
+                    'INSERT INTO runs (started, output_dir, args) VALUES (?, ?, ?)',
+                    (datetime.now().isoformat(timespec='seconds'), output_dir,
+                     json.dumps(vars(args), default=str) if args is not None else None)
+                )
+            return cursor.lastrowid
+
+    def for_target(self, run_id, target):
+        """Vista del almacén ligada a una ejecución y un objetivo, para pasarla a los módulos."""
+        return TargetStore(self, run_id, target)
+
+    # --- Inserciones en bloque ---
+
+    def add_subdomains(self, run_id, target, hosts):
+        rows = [(run_id, target, host) for host in hosts]
+        self._write([('INSERT OR IGNORE INTO subdomains (run_id, target, host) VALUES (?, ?, ?)', rows)])
+
+    def replace_probes(self, run_id, target, results, live_urls=()):
+        """
+        Sustituye los sondeos de (ejecución, objetivo) por 'results' ({'positives', 'negatives'})
+        o, en modo 'fast', por la lista de URLs vivas 'live_urls'.
+        """
+        with self._lock:
+            try:
+                with self._conn:
+                    self._conn.execute(
+                        'DELETE FROM probe_tech WHERE probe_id IN (SELECT id FROM probes WHERE run_id = ? AND target = ?)',
+                        (run_id, target))
+                    self._conn.execute('DELETE FROM probes WHERE run_id = ? AND target = ?', (run_id, target))
+                    for live, records in ((1, results.get('positives', [])), (0, results.get('negatives', []))):
+                        for record in records:
+                            self._insert_probe(run_id, target, live, record)
+                    for url in live_urls:
+                        self._insert_probe(run_id, target, 1, {'url': url, 'host': urlparse(url).hostname or url})
+            except sqlite3.Error as e:
+                logger.warning(f"[Store] Error al guardar los sondeos de {target}: {e}")
+
+    def _insert_probe(self, run_id, target, live, record):
+        values = [record.get(field) for field in PROBE_FIELDS]
+        cursor = self._conn.execute(
+            f"INSERT INTO probes (run_id, target, live, {', '.join(PROBE_FIELDS)}) "
+            f"VALUES (?, ?, ?, {', '.join('?' for _ in PROBE_FIELDS)})",
+            [run_id, target, live, *values]
+        )
+        techs = [tech.strip() for tech in (record.get('tech') or '').split(',') if tech.strip()]
+        if techs:
+            self._conn.executemany('INSERT INTO probe_tech (probe_id, tech) VALUES (?, ?)',
+                                   [(cursor.lastrowid, tech) for tech in techs])
+
+    def add_urls(self, run_id, target, host, categorized, all_key='salidatodo'):
+        """Guarda las URLs de un host: una fila por (URL, categoría) y '' para las sin categoría."""
+        rows = []
+        categorized_urls = set()
+        for category, urls in categorized.items():
+            if category == all_key:
+                continue
+            categorized_urls.update(urls)
+            rows.extend((run_id, target, host, url, category) for url in urls)
+        rows.extend((run_id, target, host, url, UNCATEGORIZED)
+                    for url in categorized.get(all_key, ()) if url not in categorized_urls)
+        self._write([('INSERT OR IGNORE INTO urls (run_id, target, host, url, category) VALUES (?, ?, ?, ?, ?)', rows)])
+
+    def add_secrets(self, run_id, target, host, findings):
+        """Guarda los secretos encontrados en los JS de un host (dicts con url, sha256, rule y match)."""
+        rows = [(run_id, target, host, f['url'], f['sha256'], f['rule'], f['match']) for f in findings]
+        self._write([('INSERT OR IGNORE INTO secrets (run_id, target, host, url, sha256, rule, match) '
+                      'VALUES (?, ?, ?, ?, ?, ?, ?)', rows)])
+
+    def add_duplicate(self, run_id, target, host, duplicate_of):
+        self._write([('INSERT OR REPLACE INTO url_duplicates (run_id, target, host, duplicate_of) VALUES (?, ?, ?, ?)',
+                      [(run_id, target, host, duplicate_of)])])
+
+    # --- Consultas ---
+
+    def load_subdomains(self, run_id, target):
+        with self._lock:
+            rows = self._conn.execute('SELECT host FROM subdomains WHERE run_id = ? AND target = ? ORDER BY host',
+                                      (run_id, target)).fetchall()
+        return [host for (host,) in rows]
+
+    def load_live_urls(self, run_id, target):
+        with self._lock:
+            rows = self._conn.execute('SELECT url FROM probes WHERE run_id = ? AND target = ? AND live = 1 ORDER BY url',
+                                      (run_id, target)).fetchall()
+        return [url for (url,) in rows]
+
+    def load_live_records(self, run_id, target):
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(PROBE_FIELDS)} FROM probes WHERE run_id = ? AND target = ? AND live = 1 ORDER BY url",
+                (run_id, target)).fetchall()
+        return [dict(zip(PROBE_FIELDS, row)) for row in rows]
+
+    def query(self, kind, targets=None, tech=None, status=None, category=None, all_runs=False):
+        """
+        Devuelve una lista de dicts del tipo pedido (ver EXPORT_KINDS). Por defecto solo la
+        última ejecución de cada objetivo; con all_runs, el histórico completo.
+        """
+        table, columns = EXPORT_KINDS[kind]
+        alias = 't'
+        where, params = [], []
+        if kind == 'live':
+            where.append(f'{alias}.live = 1')
+        if targets:
+            where.append(f"{alias}.target IN ({', '.join('?' for _ in targets)})")
+            params.extend(targets)
+        if status is not None and table == 'probes':
+            where.append(f'{alias}.status_code = ?')
+            params.append(status)
+        if tech and table == 'probes':
+            where.append(f'{alias}.id IN (SELECT probe_id FROM probe_tech WHERE tech = ?)')
+            params.append(tech)
+        if category is not None and table == 'urls':
+            where.append(f'{alias}.category = ?')
+            params.append(category)
+        if not all_runs:
+            where.append(f'{alias}.run_id = (SELECT MAX(run_id) FROM {table} WHERE target = {alias}.target)')
+
+        # En la exportación de URLs sin filtro de categoría, cada URL sale una sola vez
+        selected = columns
+        if kind == 'urls' and category is None:
+            selected = ('target', 'host', 'url')
+        sql = f"SELECT DISTINCT {', '.join(f'{alias}.{c}' for c in selected)} FROM {table} {alias}"
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        sql += f" ORDER BY {', '.join(f'{alias}.{c}' for c in selected[:3])}"
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [dict(zip(selected, row)) for row in rows]
+
+    def export(self, kind, fmt, out, **filters):
+        """Escribe en 'out' (un archivo de texto abierto) el resultado de query() en el formato indicado."""
+        rows = self.query(kind, **filters)
+        if fmt == 'txt':
+            # Una columna, como los .txt de siempre: hosts en subdominios, URLs en el resto
+            column = 'host' if kind == 'subdomains' else 'url'
+            for value in sorted({row[column] for row in rows if row.get(column)}):
+                out.write(f"{value}\n")
+        elif fmt == 'json':
+            json.dump(rows, out, indent=4)
+            out.write('\n')
+        elif fmt == 'jsonl':
+            for row in rows:
+                out.write(json.dumps(row) + '\n')
+        elif fmt == 'csv':
+            if rows:
+                writer = csv.DictWriter(out, fieldnames=list(rows[0]))
+                writer.writeheader()
+                writer.writerows(rows)
+        else:
+            raise ValueError(f"Formato de exportación desconocido: {fmt}")
+        return len(rows)
+
+
+class TargetStore:
+    """Atajo a ResultsStore con la ejecución y el objetivo ya fijados (lo que reciben los módulos)."""
+
+    def __init__(self, store, run_id, target):
+        self.store = store
+        self.run_id = run_id
+        self.target = target
+        self.write_files = store.write_files
+
+    def add_subdomains(self, hosts):
+        self.store.add_subdomains(self.run_id, self.target, hosts)
+
+    def replace_probes(self, results, live_urls=()):
+        self.store.replace_probes(self.run_id, self.target, results, live_urls)
+
+    def add_urls(self, host, categorized):
+        self.store.add_urls(self.run_id, self.target, host, categorized)
+
+    def add_duplicate(self, host, duplicate_of):
+        self.store.add_duplicate(self.run_id, self.target, host, duplicate_of)
+
+    def add_secrets(self, host, findings):
+        self.store.add_secrets(self.run_id, self.target, host, findings)
+
+    def load_subdomains(self):
+        return self.store.load_subdomains(self.run_id, self.target)
+
+    def load_live_urls(self):
+        return self.store.load_live_urls(self.run_id, self.target)
+
+    def load_live_records(self):
+        return self.store.load_live_records(self.run_id, self.target)
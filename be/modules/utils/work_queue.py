@@ -0,0 +1,266 @@
+# be/modules/utils/work_queue.py
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS units (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    target TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    payload TEXT,
+    state TEXT NOT NULL DEFAULT 'queued',
+    worker TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    updated REAL,
+    UNIQUE (target, stage)
+);
+CREATE INDEX IF NOT EXISTS idx_units_state ON units (state, target, position);
+CREATE TABLE IF NOT EXISTS progress (
+    target TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    PRIMARY KEY (target, stage)
+);
+CREATE TABLE IF NOT EXISTS hosts (
+    target TEXT NOT NULL,
+    host TEXT NOT NULL,
+    PRIMARY KEY (target, host)
+);
+"""
+
+
+class WorkQueue:
+    """
+    Cola de trabajo en SQLite para repartir una ejecución entre varios procesos o máquinas
+    que comparten el sistema de archivos (modo coordinador/worker).
+
+    Cada unidad es un par (objetivo, etapa). Un worker la toma en préstamo ('lease') por un
+    tiempo limitado que renueva mientras trabaja; si muere, el préstamo vence y la unidad
+    vuelve a la cola (hasta MAX_ATTEMPTS intentos). Las etapas de un objetivo se entregan en
+    orden: una unidad solo se presta cuando las anteriores de su objetivo están terminadas.
+    Además guarda el progreso fino (etapas y hosts completados) con la misma interfaz que
+    el checkpoint, para que otro worker continúe donde se quedó uno caído.
+
+    El journal es el clásico (no WAL): WAL necesita memoria compartida y no funciona entre
+    máquinas; con bloqueos POSIX (NFSv4, la mayoría de FS compartidos) basta con esto.
+    """
+
+    DEFAULT_LEASE_SECONDS = 120
+    DEFAULT_MAX_ATTEMPTS = 3
+
+    def __init__(self, path, lease_seconds=DEFAULT_LEASE_SECONDS, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        self.path = path
+        self.lease_seconds = max(5, lease_seconds)
+        self.max_attempts = max(1, max_attempts)
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Autocommit: cada operación abre su propia transacción (BEGIN IMMEDIATE al prestar)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=60, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=DELETE')
+        with self._lock:
+            self._conn.executescript(_SCHEMA)
+
+    @classmethod
+    def from_config(cls, path, config):
+        """Abre la cola con los tiempos de la sección [DISTRIBUTED]."""
+        try:
+            lease_seconds = config.getint('DISTRIBUTED', 'LEASE_SECONDS', fallback=cls.DEFAULT_LEASE_SECONDS)
+            max_attempts = config.getint('DISTRIBUTED', 'MAX_ATTEMPTS', fallback=cls.DEFAULT_MAX_ATTEMPTS)
+        except (AttributeError, ValueError):
+            lease_seconds, max_attempts = cls.DEFAULT_LEASE_SECONDS, cls.DEFAULT_MAX_ATTEMPTS
+        return cls(path, lease_seconds=lease_seconds, max_attempts=max_attempts)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _transaction(self, func):
+        """Ejecuta func(conn) en una transacción de escritura exclusiva entre procesos."""
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                result = func(self._conn)
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+            self._conn.execute('COMMIT')
+            return result
+
+    # --- Metadatos de la ejecución ---
+
+    def set_meta(self, key, value):
+        with self._lock:
+            self._conn.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', (key, json.dumps(value)))
+
+    def get_meta(self, key, default=None):
+        with self._lock:
+            row = self._conn.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    # --- Unidades ---
+
+    def add_units(self, units):
+        """
+        Encola unidades (objetivo, etapa, posición, payload). Las que ya existen se dejan como
+        están, así que volver a lanzar el coordinador sobre la misma cola continúa la ejecución.
+        Devuelve cuántas son nuevas.
+        """
+        now = time.time()
+        rows = [(target, stage, position, json.dumps(payload) if payload is not None else None, now)
+                for target, stage, position, payload in units]
+
+        def insert(conn):
+            before = conn.total_changes
+            conn.executemany('INSERT OR IGNORE INTO units (target, stage, position, payload, updated) '
+                             'VALUES (?, ?, ?, ?, ?)', rows)
+            return conn.total_changes - before
+        return self._transaction(insert)
+
+    def _requeue_expired(self, conn, now):
+        """Devuelve a la cola los préstamos vencidos y da por fallidas las etapas que dependen de un fallo."""
+        expired = conn.execute(
+            "UPDATE units SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'queued' END, worker = NULL, "
+            "lease_expires = NULL, error = 'préstamo vencido (worker caído o bloqueado)', updated = ? "
+            "WHERE state = 'leased' AND lease_expires < ?", (self.max_attempts, now, now)
+        ).rowcount
+        if expired:
+            logger.warning(f"[Queue] {expired} unidades con el préstamo vencido vuelven a la cola.")
+        conn.execute(
+            "UPDATE units SET state = 'failed', error = 'falló una etapa anterior', updated = ? "
+            "WHERE state = 'queued' AND EXISTS (SELECT 1 FROM units p WHERE p.target = units.target "
+            "AND p.position < units.position AND p.state = 'failed')", (now,)
+        )
+
+    def lease(self, worker):
+        """
+        Presta al worker la siguiente unidad disponible (las etapas más avanzadas primero, para
+        terminar objetivos ya empezados). Devuelve un dict con id, target, stage, payload y
+        attempts, o None si ahora mismo no hay ninguna lista.
+        """
+        def take(conn):
+            now = time.time()
+            self._requeue_expired(conn, now)
+            row = conn.execute(
+                "SELECT id, target, stage, payload, attempts FROM units u WHERE state = 'queued' "
+                "AND NOT EXISTS (SELECT 1 FROM units p WHERE p.target = u.target AND p.position < u.position "
+                "AND p.state != 'done') ORDER BY position DESC, id LIMIT 1"
+            ).fetchone()
+            if not row:
+                return None
+            conn.execute(
+                "UPDATE units SET state = 'leased', worker = ?, lease_expires = ?, attempts = attempts + 1, "
+                "updated = ? WHERE id = ?", (worker, now + self.lease_seconds, now, row[0])
+            )
+            return {'id': row[0], 'target': row[1], 'stage': row[2],
+                    'payload': json.loads(row[3]) if row[3] else None, 'attempts': row[4] + 1}
+        return self._transaction(take)
+
+    def renew(self, worker):
+        """Renueva todos los préstamos del worker. Devuelve cuántos sigue teniendo."""
+        now = time.time()
+        with self._lock:
+            return self._conn.execute(
+                "UPDATE units SET lease_expires = ?, updated = ? WHERE worker = ? AND state = 'leased'",
+                (now + self.lease_seconds, now, worker)
+            ).rowcount
+
+    def complete(self, unit_id, worker):
+        """Marca la unidad como terminada. False si el préstamo ya no era de este worker."""
+        with self._lock:
+            return self._conn.execute(
+                "UPDATE units SET state = 'done', worker = NULL, lease_expires = NULL, error = NULL, updated = ? "
+                "WHERE id = ? AND worker = ? AND state = 'leased'", (time.time(), unit_id, worker)
+            ).rowcount == 1
+
+    def fail(self, unit_id, worker, error):
+        """Devuelve la unidad a la cola tras un error, o la da por fallida si agotó los intentos."""
+        with self._lock:
+            return self._conn.execute(
+                "UPDATE units SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'queued' END, worker = NULL, "
+                "lease_expires = NULL, error = ?, updated = ? WHERE id = ? AND worker = ? AND state = 'leased'",
+                (self.max_attempts, str(error)[:500], time.time(), unit_id, worker)
+            ).rowcount == 1
+
+    def release(self, worker):
+        """Devuelve a la cola, sin gastar intento, lo que el worker tenga prestado (al pararlo)."""
+        with self._lock:
+            return self._conn.execute(
+                "UPDATE units SET state = 'queued', worker = NULL, lease_expires = NULL, attempts = attempts - 1, "
+                "updated = ? WHERE worker = ? AND state = 'leased'", (time.time(), worker)
+            ).rowcount
+
+    def requeue_expired(self):
+        self._transaction(lambda conn: self._requeue_expired(conn, time.time()))
+
+    def counts(self):
+        """Unidades por estado: queued, leased, done, failed."""
+        with self._lock:
+            rows = self._conn.execute('SELECT state, COUNT(*) FROM units GROUP BY state').fetchall()
+        return dict(rows)
+
+    def unfinished(self):
+        counts = self.counts()
+        return counts.get('queued', 0) + counts.get('leased', 0)
+
+    def failures(self):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT target, stage, attempts, error FROM units WHERE state = 'failed' ORDER BY target, position"
+            ).fetchall()
+        return [{'target': t, 'stage': s, 'attempts': a, 'error': e} for t, s, a, e in rows]
+
+    # --- Progreso fino (interfaz de Checkpoint) ---
+
+    def is_stage_done(self, target, stage):
+        with self._lock:
+            return self._conn.execute('SELECT 1 FROM progress WHERE target = ? AND stage = ?',
+                                      (target, stage)).fetchone() is not None
+
+    def mark_stage_done(self, target, stage):
+        with self._lock:
+            self._conn.execute('INSERT OR IGNORE INTO progress (target, stage) VALUES (?, ?)', (target, stage))
+
+    def completed_hosts(self, target):
+        with self._lock:
+            return {row[0] for row in self._conn.execute('SELECT host FROM hosts WHERE target = ?', (target,))}
+
+    def mark_host_done(self, target, host):
+        with self._lock:
+            self._conn.execute('INSERT OR IGNORE INTO hosts (target, host) VALUES (?, ?)', (target, host))
+
+
+class QueueCheckpoint:
+    """
+    Checkpoint de los workers: misma interfaz que Checkpoint pero guardado en la cola
+    compartida, así las etapas y hosts completados por un worker los ven todos los demás.
+    """
+
+    def __init__(self, work_queue):
+        self.queue = work_queue
+
+    def is_done(self, target, stage):
+        return self.queue.is_stage_done(target, stage)
+
+    def mark_done(self, target, stage):
+        self.queue.mark_stage_done(target, stage)
+
+    def completed_hosts(self, target):
+        return self.queue.completed_hosts(target)
+
+    def mark_host_done(self, target, host):
+        self.queue.mark_host_done(target, host)
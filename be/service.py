@@ -0,0 +1,424 @@
+# be/service.py
+
+import hmac
+import json
+import logging
+import os
+import re
+import shlex
+import shutil
+import signal
+import socketserver
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from .utils.config_loader import load_config
+from .manager import Manager
+from .modules.utils.helpers import set_max_concurrent_tools, submit_with_context, DEFAULT_MAX_CONCURRENT_TOOLS
+from .modules.utils.logger import target_context
+from .modules.utils.scheduler import get_scheduler
+from .modules.utils.dns import AsyncResolver
+from .modules.utils.hosts import normalize_hostname
+
+logger = logging.getLogger(__name__)
+
+# Caracteres permitidos en un objetivo: los de una URL según RFC 3986 (sin espacios,
+# comillas dobles, '`', '<', '>', '|', '\' ni caracteres de control)
+_TARGET_CHARS = re.compile(r"^[A-Za-z0-9._~:/?#\[\]@!$&'()*+,;=%-]+$")
+
+
+def valid_target(value):
+    """True si 'value' es un dominio, una IPv4 o una URL http(s) con un hostname o IPv4 válidos."""
+    value = (value or '').strip()
+    if not value or not _TARGET_CHARS.match(value):
+        return False
+    if '://' in value and urlparse(value).scheme.lower() not in ('http', 'https'):
+        return False
+    return normalize_hostname(value, allow_ip=True) is not None
+
+
+class Job:
+    """Un trabajo de escaneo del servicio: sus argumentos (los mismos de la CLI) y su estado."""
+
+    def __init__(self, job_id, argv, args):
+        self.id = job_id
+        self.argv = argv
+        self.args = args
+        self.status = 'queued' # queued -> running -> done | failed; o cancelled si no llegó a empezar
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.output_dir = None
+        self.error = None
+        self.metrics = None
+        self.future = None
+        self.done = threading.Event()
+
+    def to_dict(self):
+        return {
+            'id': self.id, 'status': self.status, 'args': self.argv,
+            'created': self.created, 'started': self.started, 'finished': self.finished,
+            'output_dir': self.output_dir, 'error': self.error, 'metrics': self.metrics,
+        }
+
+
+class ScanService:
+    """
+    Modo servicio (--serve): un proceso residente que carga la configuración una sola vez y
+    recibe trabajos de escaneo por HTTP o por un socket Unix. Los trabajos se encolan y se
+    ejecutan a la vez (hasta MAX_JOBS) bajo el mismo planificador, así que los límites de
+    herramientas, por objetivo y de APIs son comunes a todos. Entre trabajos se conservan
+    la caché DNS, la sesión HTTP de las APIs y los patrones de URLs compilados.
+
+    Por defecto escucha en un socket Unix con permisos 0600; en TCP exige TOKEN. Los
+    objetivos de cada trabajo se validan y sus rutas (-o, -l, --wordlist) se resuelven
+    dentro de BASE_DIR.
+
+    API (JSON):
+        POST   /jobs            {"args": ["-u", "example.com", "--recon2", "-o", "ej"]}  -> 202 + trabajo
+                                (Content-Type: application/json)
+        GET    /jobs            lista de trabajos
+        GET    /jobs/<id>       estado, directorio de salida y métricas (?wait=N espera hasta N s)
+        DELETE /jobs/<id>       cancela un trabajo que aún está en cola
+        GET    /health          estado del servicio
+    """
+
+    DEFAULT_LISTEN = 'unix:bugtool.sock'
+    # Directorio donde quedan las salidas de los trabajos y desde donde se leen sus -l/--wordlist
+    DEFAULT_BASE_DIR = 'service_jobs'
+    DEFAULT_MAX_JOBS = 2
+    # Trabajos terminados que se recuerdan (los más antiguos se olvidan)
+    DEFAULT_KEEP_JOBS = 200
+    # Espera máxima de GET /jobs/<id>?wait=N
+    MAX_WAIT = 300
+
+    def __init__(self, args, parse_job_args, config=None):
+        self.args = args
+        # Convierte la lista de argumentos de un trabajo en un Namespace (ValueError si no es válida)
+        self.parse_job_args = parse_job_args
+        self.config = config if config is not None else load_config()
+        self.listen = args.listen or self._get_option('LISTEN', self.DEFAULT_LISTEN)
+        self.max_jobs = max(1, args.max_jobs or self._get_int_option('MAX_JOBS', self.DEFAULT_MAX_JOBS))
+        self.keep_jobs = self._get_int_option('KEEP_JOBS', self.DEFAULT_KEEP_JOBS)
+        self.token = self._get_option('TOKEN', '')
+        self.base_dir = os.path.realpath(self._get_option('BASE_DIR', self.DEFAULT_BASE_DIR))
+        self.started = time.time()
+        self.jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=self.max_jobs, thread_name_prefix='job')
+        self._resolver = None
+        self.tools = {}
+        self.server = None
+
+        # Un único planificador para todos los trabajos: los Manager no lo reconfiguran
+        try:
+            max_tools = args.max_tools or self.config.getint('RUN', 'MAX_CONCURRENT_TOOLS',
+                                                              fallback=DEFAULT_MAX_CONCURRENT_TOOLS)
+        except (AttributeError, ValueError):
+            max_tools = DEFAULT_MAX_CONCURRENT_TOOLS
+        set_max_concurrent_tools(max_tools, self.config)
+
+    def _get_option(self, option, default):
+        """Lee un valor de la sección [SERVICE] con un valor por defecto."""
+        try:
+            return self.config.get('SERVICE', option, fallback=default).strip() or default
+        except (AttributeError, ValueError):
+            return default
+
+    def _get_int_option(self, option, default):
+        try:
+            return max(0, self.config.getint('SERVICE', option, fallback=default))
+        except (AttributeError, ValueError):
+            return default
+
+    def _warm_resolver(self):
+        """Resolver DNS compartido entre trabajos (su caché respeta el TTL de cada respuesta)."""
+        with self._lock:
+            if self._resolver is None:
+                self._resolver = AsyncResolver.from_config(self.config)
+            return self._resolver
+
+    def tool_paths(self):
+        """Herramientas de [TOOLS] y si se encuentran (se comprueba una vez al arrancar)."""
+        tools = {}
+        try:
+            items = self.config.items('TOOLS') if self.config.has_section('TOOLS') else []
+        except AttributeError:
+            items = []
+        for key, path in items:
+            tools[key.lower().replace('_path', '')] = shutil.which(path) if path else None
+        return tools
+
+    # --- Trabajos ---
+
+    def job_path(self, path):
+        """Ruta de un trabajo resuelta dentro de BASE_DIR. ValueError si apunta fuera."""
+        resolved = os.path.realpath(os.path.join(self.base_dir, path))
+        if os.path.commonpath([self.base_dir, resolved]) != self.base_dir:
+            raise ValueError(f"La ruta {path} queda fuera del directorio de trabajos {self.base_dir}")
+        return resolved
+
+    def submit(self, argv):
+        """Valida los argumentos y encola el trabajo. ValueError si no son válidos."""
+        if isinstance(argv, str):
+            argv = shlex.split(argv)
+        if not isinstance(argv, list) or not all(isinstance(arg, str) for arg in argv):
+            raise ValueError("'args' debe ser una lista de argumentos o una cadena")
+        try:
+            args = self.parse_job_args(argv, resolve_path=self.job_path)
+        except SystemExit:
+            # --help / --version dentro de un trabajo: argparse intenta salir
+            raise ValueError("Argumentos no válidos para un trabajo")
+        self._check_targets(args)
+
+        job = Job(uuid.uuid4().hex[:12], argv, args)
+        if getattr(args, 'profile', False):
+            # cProfile se activa para todo el proceso: no tiene sentido con trabajos simultáneos
+            logger.warning(f"[Service] --profile se ignora en el trabajo {job.id}.")
+            args.profile = False
+        if not args.output:
+            # Cada trabajo en su propio directorio (run_<fecha> podría coincidir entre trabajos)
+            args.output = self.job_path(f"job_{job.id}")
+        with self._lock:
+            self.jobs[job.id] = job
+            self._forget_old_jobs()
+            job.future = submit_with_context(self._executor, self._run_job, job)
+        logger.info(f"📥 Trabajo {job.id} en cola: {' '.join(argv)}")
+        return job
+
+    @staticmethod
+    def _check_targets(args):
+        """Rechaza el trabajo si -u o alguna línea de -l no es un dominio o URL válidos."""
+        if args.url and not valid_target(args.url):
+            raise ValueError(f"Objetivo no válido: {args.url!r}")
+        if args.list:
+            try:
+                with open(args.list, 'r') as f:
+                    for number, line in enumerate(f, 1):
+                        if line.strip() and not valid_target(line):
+                            raise ValueError(f"Objetivo no válido en {args.list}:{number}: {line.strip()[:100]!r}")
+            except (OSError, UnicodeDecodeError) as e:
+                raise ValueError(f"No se pudo leer {args.list}: {e}")
+
+    def _run_job(self, job):
+        with self._lock:
+            if job.status == 'cancelled':
+                return
+            job.status = 'running'
+        job.started = time.time()
+        try:
+            with target_context(f"job:{job.id}"):
+                manager = Manager(job.args, self.config, resolver=self._warm_resolver(), shared_limits=True)
+                job.output_dir = manager._setup_main_output_directory()
+                manager.run()
+            job.status = 'done'
+            logger.info(f"✅ Trabajo {job.id} terminado en {time.time() - job.started:.1f}s ({job.output_dir})")
+        except (Exception, SystemExit) as e:
+            # SystemExit: el Manager sale así si no puede leer la lista de objetivos
+            job.status = 'failed'
+            job.error = str(e) or type(e).__name__
+            logger.error(f"❌ El trabajo {job.id} falló: {job.error}", exc_info=not isinstance(e, SystemExit))
+        finally:
+            job.metrics = self._job_metrics(job)
+            job.finished = time.time()
+            job.done.set()
+
+    @staticmethod
+    def _job_metrics(job):
+        """Resumen de metrics.json del trabajo (etapas y herramientas, sin la lista de comandos)."""
+        if not job.output_dir:
+            return None
+        try:
+            with open(os.path.join(job.output_dir, 'metrics.json')) as f:
+                summary = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return {'duration': summary.get('duration'), 'stages': summary.get('stages'), 'tools': summary.get('tools')}
+
+    def cancel(self, job_id):
+        """Cancela un trabajo en cola. Devuelve False si ya está en marcha o terminado."""
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if not job or job.status != 'queued':
+                return False
+            job.status = 'cancelled'
+            job.future.cancel()
+        job.finished = time.time()
+        job.done.set()
+        logger.info(f"🚫 Trabajo {job_id} cancelado")
+        return True
+
+    def _forget_old_jobs(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.done.is_set()]
+        for job_id in finished[:max(0, len(finished) - self.keep_jobs)]:
+            del self.jobs[job_id]
+
+    def health(self):
+        with self._lock:
+            counts = {}
+            for job in self.jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+            resolver = self._resolver
+        scheduler = get_scheduler()
+        return {
+            'uptime': round(time.time() - self.started, 1), 'jobs': counts, 'max_jobs': self.max_jobs,
+            'max_tools': scheduler.max_tools, 'dns_cache': len(resolver.cache) if resolver else 0,
+            'tools': self.tools,
+        }
+
+    # --- Servidor ---
+
+    def serve_forever(self):
+        if not self.listen.startswith('unix:') and not self.token:
+            raise ValueError(f"Escuchar en TCP ({self.listen}) requiere [SERVICE] TOKEN; "
+                             f"sin token usa un socket Unix (--listen unix:/ruta.sock)")
+        os.makedirs(self.base_dir, exist_ok=True)
+        self.tools = self.tool_paths()
+        missing = [tool for tool, path in self.tools.items() if not path]
+        if missing:
+            logger.warning(f"[Service] Herramientas no encontradas: {', '.join(sorted(missing))}")
+        self.server = self._make_server()
+        logger.info(f"🛰️  Servicio escuchando en {self.listen} ({self.max_jobs} trabajos a la vez, "
+                    f"{get_scheduler().max_tools} herramientas en total)")
+        # SIGTERM (systemd, kill) detiene el servicio igual que Ctrl+C
+        signal.signal(signal.SIGTERM, _raise_interrupt)
+        try:
+            self.server.serve_forever()
+        except KeyboardInterrupt:
+            logger.info("[Service] Deteniendo el servicio...")
+        finally:
+            self.server.server_close()
+            if self.listen.startswith('unix:'):
+                try:
+                    os.remove(self.listen[len('unix:'):])
+                except OSError:
+                    pass
+            running = sum(1 for job in self.jobs.values() if job.status == 'running')
+            if running:
+                logger.info(f"[Service] Esperando a {running} trabajos en curso (los de la cola se cancelan)...")
+            for job_id in list(self.jobs):
+                self.cancel(job_id)
+            self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def _make_server(self):
+        if self.listen.startswith('unix:'):
+            path = self.listen[len('unix:'):]
+            if os.path.exists(path):
+                os.remove(path) # Socket de una ejecución anterior
+            # El socket nace ya con permisos 0600: solo el usuario del servicio puede conectarse
+            previous_umask = os.umask(0o177)
+            try:
+                server = _UnixHTTPServer(path, _ServiceHandler)
+            finally:
+                os.umask(previous_umask)
+        else:
+            host, _, port = self.listen.rpartition(':')
+            server = ThreadingHTTPServer((host or '127.0.0.1', int(port)), _ServiceHandler)
+        server.daemon_threads = True
+        server.service = self
+        return server
+
+
+def _raise_interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """El mismo servidor HTTP sobre un socket Unix (p. ej. curl --unix-socket)."""
+    daemon_threads = True
+
+
+class _ServiceHandler(BaseHTTPRequestHandler):
+    server_version = 'BugToolService/1.0'
+
+    def address_string(self):
+        # En un socket Unix client_address es una cadena vacía
+        return self.client_address[0] if isinstance(self.client_address, tuple) else 'unix'
+
+    def log_message(self, format, *args):
+        logger.debug(f"[Service] {self.address_string()} {format % args}")
+
+    def _reply(self, code, data):
+        body = json.dumps(data, indent=2, ensure_ascii=False).encode()
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _authorized(self):
+        token = self.server.service.token
+        if not token or hmac.compare_digest(self.headers.get('Authorization', ''), f"Bearer {token}"):
+            return True
+        self._reply(401, {'error': 'No autorizado'})
+        return False
+
+    def _route(self):
+        parsed = urlparse(self.path)
+        parts = [part for part in parsed.path.split('/') if part]
+        return parts, {key: values[0] for key, values in parse_qs(parsed.query).items()}
+
+    def do_GET(self):
+        if not self._authorized():
+            return
+        service = self.server.service
+        parts, query = self._route()
+        if parts == ['health']:
+            self._reply(200, service.health())
+        elif parts == ['jobs']:
+            with service._lock:
+                jobs = [job.to_dict() for job in service.jobs.values()]
+            self._reply(200, {'jobs': jobs})
+        elif len(parts) == 2 and parts[0] == 'jobs':
+            job = service.jobs.get(parts[1])
+            if not job:
+                self._reply(404, {'error': 'Trabajo no encontrado'})
+                return
+            try:
+                wait = min(float(query.get('wait', 0)), service.MAX_WAIT)
+            except ValueError:
+                wait = 0
+            if wait > 0:
+                job.done.wait(wait)
+            self._reply(200, job.to_dict())
+        else:
+            self._reply(404, {'error': 'Ruta no encontrada'})
+
+    def do_POST(self):
+        if not self._authorized():
+            return
+        parts, _ = self._route()
+        if parts != ['jobs']:
+            self._reply(404, {'error': 'Ruta no encontrada'})
+            return
+        # Solo JSON: un formulario o un POST 'text/plain' desde otra web no llega a crear trabajos
+        content_type = self.headers.get('Content-Type', '').split(';')[0].strip().lower()
+        if content_type != 'application/json':
+            self._reply(415, {'error': "Content-Type debe ser 'application/json'"})
+            return
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            payload = json.loads(self.rfile.read(length) or b'{}')
+            job = self.server.service.submit(payload.get('args') if isinstance(payload, dict) else None)
+        except ValueError as e:
+            self._reply(400, {'error': str(e)})
+            return
+        self._reply(202, job.to_dict())
+
+    def do_DELETE(self):
+        if not self._authorized():
+            return
+        parts, _ = self._route()
+        if len(parts) != 2 or parts[0] != 'jobs':
+            self._reply(404, {'error': 'Ruta no encontrada'})
+        elif self.server.service.cancel(parts[1]):
+            self._reply(200, {'id': parts[1], 'status': 'cancelled'})
+        elif parts[1] in self.server.service.jobs:
+            self._reply(409, {'error': 'El trabajo ya está en marcha o terminado'})
+        else:
+            self._reply(404, {'error': 'Trabajo no encontrado'})
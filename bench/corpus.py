@@ -0,0 +1,128 @@
+# bench/corpus.py
+
+"""
+Generadores deterministas de datos sintéticos para el benchmark: nombres de host,
+URLs con la mezcla de categorías de un rastreo real, registros JSON de httpx y
+certificados de crt.sh. Los usan las herramientas sustitutas, el mock de APIs y
+los corpus en disco (bench/data/).
+"""
+
+import json
+import os
+import random
+import zlib
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+# Tamaños de corpus: URLs y hosts. A 1M URLs los hosts se quedan en 100k (como en un
+# programa grande real: muchas URLs por host), para que el JSON de httpx no pase de ~40 MB.
+SIZES = {
+    '1k': {'urls': 1_000, 'hosts': 1_000},
+    '40k': {'urls': 40_000, 'hosts': 40_000},
+    '1m': {'urls': 1_000_000, 'hosts': 100_000},
+}
+
+_LABELS = ['api', 'dev', 'staging', 'mail', 'vpn', 'admin', 'portal', 'cdn', 'static', 'auth', 'sso', 'shop',
+           'blog', 'docs', 'status', 'git', 'jira', 'grafana', 'test', 'qa', 'internal', 'app', 'm', 'www']
+_PATHS = ['', 'login', 'search', 'account/settings', 'api/v1/users', 'api/v2/orders', 'static/js', 'assets/img',
+          'download', 'redirect', 'wp-content/uploads', 'admin/reports', 'graphql', 'cart', 'docs/guide']
+_FILES = ['app.js', 'main.min.js', 'vendor.js?v=3', 'logo.png', 'banner.jpg', 'icon.svg', 'report.pdf',
+          'export.xlsx', 'backup.zip', 'config.json', 'sitemap.xml', 'index.php', 'data.sql', 'notes.txt', 'styles.css']
+_PARAMS = ['id', 'q', 'search', 'redirect', 'url', 'next', 'lang', 'page', 'user', 'token', 'cat', 'return_to']
+_TECH = [['Nginx'], ['Apache', 'PHP'], ['Cloudflare'], ['Nginx', 'React'], ['IIS', 'ASP.NET'], ['Envoy'], []]
+_TITLES = ['Login', 'Dashboard', 'Welcome', 'API Docs', '403 Forbidden', 'Not Found', 'Home']
+
+
+def hostnames(domain, count):
+    """'count' subdominios distintos y reproducibles de 'domain'."""
+    for index in range(count):
+        label, number = _LABELS[index % len(_LABELS)], index // len(_LABELS)
+        yield f"{label}{number}.{domain}" if number else f"{label}.{domain}"
+
+
+def urls_for(host, count):
+    """'count' URLs de un host, con parámetros, JS, imágenes y ficheros sensibles."""
+    rng = random.Random(zlib.crc32(host.encode()))
+    scheme_host = host if host.startswith('http') else f"https://{host}"
+    for index in range(count):
+        base = f"{scheme_host}/{rng.choice(_PATHS)}".rstrip('/')
+        kind = rng.random()
+        if kind < 0.35:
+            yield f"{base}/{rng.choice(_FILES)}"
+        elif kind < 0.75:
+            params = '&'.join(f"{rng.choice(_PARAMS)}={rng.randint(1, 9999)}" for _ in range(rng.randint(1, 3)))
+            yield f"{base}?{params}"
+        else:
+            yield f"{base}/{index}"
+
+
+def url_corpus(domain, count, urls_per_host=50):
+    """Corpus de 'count' URLs repartidas entre hosts de 'domain'."""
+    hosts = max(1, -(-count // urls_per_host))
+    produced = 0
+    for host in hostnames(domain, hosts):
+        for url in urls_for(host, min(urls_per_host, count - produced)):
+            yield url
+        produced += urls_per_host
+        if produced >= count:
+            return
+
+
+def is_live(host, live_percent):
+    return zlib.crc32(host.encode()) % 100 < live_percent
+
+
+def httpx_record(host, live_percent=40, port=443):
+    """Línea JSON con la forma de la salida de 'httpx -json' para un host."""
+    if not is_live(host, live_percent):
+        return json.dumps({'input': host, 'url': '', 'failed': True, 'status_code': 0, 'port': str(port)})
+    rng = random.Random(zlib.crc32(host.encode()))
+    # Una quinta parte de los vivos sirve la misma página de aparcamiento (para el clustering)
+    parked = rng.random() < 0.2
+    scheme = 'https' if port in (443, 8443) else 'http'
+    return json.dumps({
+        'input': host, 'url': f"{scheme}://{host}" + ('' if port in (80, 443) else f":{port}"),
+        'host': f"10.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}", 'scheme': scheme,
+        'port': str(port), 'status_code': 200 if parked else rng.choice([200, 200, 301, 302, 401, 403, 404]),
+        'title': 'Domain parked' if parked else rng.choice(_TITLES),
+        'tech': ['Nginx'] if parked else rng.choice(_TECH), 'content_type': 'text/html',
+        'content_length': 1234 if parked else rng.randint(200, 90_000), 'cname': [], 'cdn': parked,
+        'failed': False,
+    })
+
+
+def crtsh_entries(domain, count):
+    """Entradas de certificados como las de crt.sh (con wildcards, emails y nombres repetidos)."""
+    names = list(hostnames(domain, max(1, count // 4)))
+    for index in range(count):
+        name = names[index % len(names)]
+        yield {
+            'issuer_ca_id': 16418, 'issuer_name': "C=US, O=Let's Encrypt, CN=R3", 'id': 10_000_000 + index,
+            'common_name': name, 'name_value': f"{name}\n*.{domain}\nhostmaster@{domain}",
+            'not_before': '2024-01-01T00:00:00', 'not_after': '2024-04-01T00:00:00', 'serial_number': f"{index:032x}",
+        }
+
+
+def ensure(kind, size, domain='bench.example'):
+    """Genera (una sola vez) el corpus en bench/data/ y devuelve su ruta."""
+    counts = SIZES[size]
+    os.makedirs(DATA_DIR, exist_ok=True)
+    extension = {'urls': 'txt', 'httpx': 'jsonl', 'crtsh': 'json'}[kind]
+    path = os.path.join(DATA_DIR, f"{kind}_{size}.{extension}")
+    if os.path.exists(path):
+        return path
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        if kind == 'urls':
+            for url in url_corpus(domain, counts['urls']):
+                f.write(url + '\n')
+        elif kind == 'httpx':
+            for host in hostnames(domain, counts['hosts']):
+                f.write(httpx_record(host) + '\n')
+        else:
+            f.write('[')
+            for index, entry in enumerate(crtsh_entries(domain, counts['hosts'])):
+                f.write((',' if index else '') + json.dumps(entry))
+            f.write(']')
+    os.replace(tmp_path, path)
+    return path
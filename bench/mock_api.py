@@ -0,0 +1,113 @@
+# bench/mock_api.py
+
+"""
+Servidor local que imita crt.sh y la búsqueda de urlscan.io para el benchmark (y para
+probar ReconModule sin red). Solo usa la biblioteca estándar.
+
+    python3 -m bench.mock_api --port 8765 --crt-entries 40000 --urlscan-results 2000
+
+y en [RECON]: CRTSH_URL = http://127.0.0.1:8765/crt, URLSCAN_URL = http://127.0.0.1:8765/urlscan
+"""
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from bench import corpus
+
+
+class MockApiHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.0' # Sin Content-Length: crt.sh se envía en streaming hasta cerrar
+    server_version = 'BenchMockApi/1.0'
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        query = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+        time.sleep(self.server.latency)
+        with self.server.lock:
+            self.server.requests.append(self.path)
+            throttled = self.server.throttle > 0
+            self.server.throttle -= throttled
+        if throttled:
+            # Límite de peticiones de la API: 429 con la espera en Retry-After
+            self.send_response(429)
+            self.send_header('Retry-After', str(self.server.retry_after))
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        if parsed.path.rstrip('/') == '/crt':
+            self._crtsh(query.get('q', '%.bench.example').lstrip('%.'))
+        elif parsed.path.rstrip('/') == '/urlscan':
+            self._urlscan(query)
+        else:
+            self.send_error(404)
+
+    def _crtsh(self, domain):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        self.wfile.write(b'[')
+        for index, entry in enumerate(corpus.crtsh_entries(domain, self.server.crt_entries)):
+            self.wfile.write(((',' if index else '') + json.dumps(entry)).encode())
+        self.wfile.write(b']')
+
+    def _urlscan(self, query):
+        domain = query.get('q', 'domain:bench.example').split(':', 1)[-1]
+        size = int(query.get('size', 100))
+        offset = int(query['search_after'].split(',')[0]) if query.get('search_after') else 0
+        total = self.server.urlscan_results
+        hosts = list(corpus.hostnames(domain, max(1, total // 2)))
+        results = [
+            {'page': {'domain': hosts[index % len(hosts)]}, 'task': {'domain': domain}, 'sort': [index + 1, f"id{index}"]}
+            for index in range(offset, min(offset + size, total))
+        ]
+        body = json.dumps({'results': results, 'total': total, 'has_more': offset + size < total}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *_):
+        pass
+
+
+def start(port=0, crt_entries=1000, urlscan_results=500, latency=0.0, throttle=0, retry_after=1):
+    """
+    Arranca el servidor en un hilo. Devuelve (servidor, URL base). Las primeras 'throttle'
+    peticiones reciben un 429 con 'Retry-After: retry_after'; las rutas pedidas quedan
+    en server.requests.
+    """
+    server = ThreadingHTTPServer(('127.0.0.1', port), MockApiHandler)
+    server.daemon_threads = True
+    server.crt_entries = crt_entries
+    server.urlscan_results = urlscan_results
+    server.latency = latency
+    server.throttle = throttle
+    server.retry_after = retry_after
+    server.requests = []
+    server.lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock local de crt.sh y urlscan.io")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--crt-entries', type=int, default=1000, help="Certificados por consulta a crt.sh")
+    parser.add_argument('--urlscan-results', type=int, default=500, help="Resultados totales de urlscan (paginados)")
+    parser.add_argument('--latency', type=float, default=0.0, help="Segundos de espera por petición")
+    args = parser.parse_args()
+    server, base_url = start(args.port, args.crt_entries, args.urlscan_results, args.latency)
+    print(f"Mock de APIs en {base_url}/crt y {base_url}/urlscan (Ctrl+C para salir)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,340 @@
+# bench/run.py
+
+"""
+Benchmark offline del framework: mide tiempo, rendimiento y pico de memoria de cada
+etapa sobre corpus sintéticos (1k, 40k y 1M URLs), sin red ni herramientas reales.
+
+    python3 -m bench.run                              # todas las etapas, tamaño 1k
+    python3 -m bench.run --size 40k --size 1m --stage categorize
+    python3 -m bench.run --e2e --e2e-hosts 2000       # Manager completo con herramientas sustitutas
+    python3 -m bench.run --json base.json             # guardar resultados...
+    python3 -m bench.run --compare base.json          # ...y compararlos con los de otra versión
+
+Cada etapa corre en un proceso propio, de modo que el pico de memoria (VmHWM) es solo
+el suyo. Los corpus se generan una vez en bench/data/.
+"""
+
+import argparse
+import configparser
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from bench import corpus  # noqa: E402
+
+TOOLS_DIR = os.path.join(ROOT, 'bench', 'tools')
+DOMAIN = 'bench.example'
+
+
+def _memory():
+    """(RSS actual, pico de RSS) del proceso en bytes, según /proc (0 si no está disponible)."""
+    values = {}
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith(('VmRSS:', 'VmHWM:')):
+                    values[line.split(':')[0]] = int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return values.get('VmRSS', 0), values.get('VmHWM', 0)
+
+
+def _read_lines(path):
+    with open(path) as f:
+        return [line.rstrip('\n') for line in f if line.strip()]
+
+
+def _bench_config(workdir, mock_url=None):
+    """Configuración por defecto con [TOOLS] apuntando a los sustitutos y todo lo persistente en 'workdir'."""
+    from be.utils.config_loader import load_config
+    config = load_config()
+    if not isinstance(config, configparser.ConfigParser):
+        config = configparser.ConfigParser()
+    for section in ('TOOLS', 'RECON', 'STORE', 'CACHE', 'PROBING', 'METRICS'):
+        if not config.has_section(section):
+            config.add_section(section)
+    for tool in ('subfinder', 'amass', 'subdominator', 'httpx', 'gau', 'katana'):
+        config.set('TOOLS', f"{tool.upper()}_PATH", os.path.join(TOOLS_DIR, tool))
+    if mock_url:
+        config.set('RECON', 'CRTSH_URL', f"{mock_url}/crt")
+        config.set('RECON', 'URLSCAN_URL', f"{mock_url}/urlscan")
+    config.set('STORE', 'PATH', os.path.join(workdir, 'results.db'))
+    config.set('CACHE', 'ENABLED', 'false')
+    config.set('CACHE', 'DIR', os.path.join(workdir, 'cache'))
+    # Nombres sintéticos: no se resuelven contra DNS reales
+    config.set('PROBING', 'PRE_RESOLVE', 'false')
+    config.set('PROBING', 'ENGINE', 'httpx')
+    # Los hosts sintéticos no existen: no hay JS que descargar
+    if not config.has_section('SECRETS'):
+        config.add_section('SECRETS')
+    config.set('SECRETS', 'ENABLED', 'false')
+    config.set('METRICS', 'PROMETHEUS_FILE', '')
+    if config.has_section('RATE_LIMITS'):
+        config.remove_section('RATE_LIMITS') # El mock no necesita límites de ritmo
+    return config
+
+
+# --- Etapas (se ejecutan dentro del proceso hijo) ---
+# Cada una recibe el tamaño, prepara su entrada (sin medir) y devuelve (función a medir, elementos).
+
+def stage_parse_httpx(size):
+    from be.modules.probing import ProbingModule
+    text = open(corpus.ensure('httpx', size)).read()
+    module = ProbingModule(DOMAIN, argparse.Namespace(output=None, prober=None), _bench_config(tempfile.mkdtemp()), [], 'full')
+    return (lambda: module._parse_httpx_output(text)), text.count('\n')
+
+
+def stage_categorize(size):
+    from be.modules.urls import UrlsModule
+    urls = _read_lines(corpus.ensure('urls', size))
+    module = UrlsModule(DOMAIN, argparse.Namespace(url_workers=None), _bench_config(tempfile.mkdtemp()), [])
+    return (lambda: module._categorize_urls(urls)), len(urls)
+
+
+def stage_clean_hosts(size):
+    from be.modules.utils.hosts import clean_hostnames
+    hosts = [json.loads(line)['input'] for line in _read_lines(corpus.ensure('httpx', size))]
+    # Ruido como el de las fuentes pasivas: mayúsculas, wildcards, emails, esquemas y puertos
+    noisy = hosts + [f"*.{host}" for host in hosts[::7]] + [f"admin@{host}" for host in hosts[::11]] \
+        + [f"HTTPS://{host.upper()}:443/" for host in hosts[::5]]
+    return (lambda: clean_hostnames(noisy, root_domain=DOMAIN)), len(noisy)
+
+
+def stage_crawl_units(size):
+    from be.modules.utils.hosts import group_crawl_units
+    urls = [record['url'] for record in map(json.loads, _read_lines(corpus.ensure('httpx', size))) if record['url']]
+    urls += [url.replace('https://', 'http://') for url in urls[::3]]
+    return (lambda: group_crawl_units(urls)), len(urls)
+
+
+def stage_cluster(size):
+    from be.modules.clustering import ResponseClusterer
+    from be.modules.probing import ProbingModule
+    module = ProbingModule(DOMAIN, argparse.Namespace(output=None, prober=None), _bench_config(tempfile.mkdtemp()), [], 'full')
+    module._parse_httpx_output(open(corpus.ensure('httpx', size)).read())
+    records = module.results['positives']
+    return (lambda: ResponseClusterer().cluster(records)), len(records)
+
+
+def stage_crtsh_stream(size):
+    from be.modules.utils.http_client import iter_json_array
+    from be.modules.utils.hosts import normalize_hostname
+    path = corpus.ensure('crtsh', size)
+
+    def run():
+        names = set()
+        with open(path, 'rb') as f:
+            for entry in iter_json_array(iter(lambda: f.read(64 * 1024), b'')):
+                for name in entry['name_value'].split('\n'):
+                    name = normalize_hostname(name)
+                    if name:
+                        names.add(name)
+        return names
+
+    return run, corpus.SIZES[size]['hosts']
+
+
+def stage_store_urls(size):
+    from be.modules.utils.classifier import UrlClassifier
+    from be.modules.urls import UrlsModule
+    from be.modules.utils.store import ResultsStore
+    workdir = tempfile.mkdtemp()
+    urls = _read_lines(corpus.ensure('urls', size))
+    classifier = UrlClassifier(UrlsModule(DOMAIN, argparse.Namespace(url_workers=None), _bench_config(workdir), []).patterns)
+    by_host = {}
+    for url in urls:
+        by_host.setdefault(url.split('/')[2], []).append(url)
+    categorized = {host: classifier.classify_many(host_urls) for host, host_urls in by_host.items()}
+    store = ResultsStore(os.path.join(workdir, 'results.db'))
+    run_id = store.start_run(workdir)
+
+    def run():
+        for host, categories in categorized.items():
+            store.add_urls(run_id, DOMAIN, host, categories)
+
+    return run, len(urls)
+
+
+STAGES = {
+    'parse_httpx': stage_parse_httpx,
+    'categorize': stage_categorize,
+    'clean_hosts': stage_clean_hosts,
+    'crawl_units': stage_crawl_units,
+    'cluster': stage_cluster,
+    'crtsh_stream': stage_crtsh_stream,
+    'store_urls': stage_store_urls,
+}
+
+
+def run_child_stage(stage, size):
+    """Proceso hijo: prepara la etapa, la mide y escribe el resultado como JSON en stdout."""
+    logging.disable(logging.WARNING)
+    func, items = STAGES[stage](size)
+    baseline, _ = _memory()
+    start = time.perf_counter()
+    func()
+    seconds = time.perf_counter() - start
+    _, peak = _memory()
+    print(json.dumps({
+        'stage': stage, 'size': size, 'items': items, 'seconds': round(seconds, 4),
+        'throughput': round(items / seconds, 1) if seconds else None,
+        'baseline_rss_mb': round(baseline / 1048576, 1), 'peak_rss_mb': round(peak / 1048576, 1),
+    }))
+
+
+def run_child_e2e(hosts, urls_per_host, mode):
+    """Proceso hijo: Manager completo (recon -> probing -> URLs) con sustitutos y mock de APIs."""
+    from bench import mock_api
+    from be.manager import Manager
+    import main as cli
+
+    workdir = tempfile.mkdtemp(prefix='bench_e2e_')
+    logging.basicConfig(level=logging.WARNING, filename=os.path.join(workdir, 'bench.log'))
+    os.environ.update({'BENCH_HOSTS': str(hosts), 'BENCH_URLS_PER_HOST': str(urls_per_host)})
+    server, base_url = mock_api.start(crt_entries=hosts, urlscan_results=min(hosts, 1000))
+    config = _bench_config(workdir, mock_url=base_url)
+    output_dir = os.path.join(workdir, 'out')
+    sys.argv = ['main.py', '-u', DOMAIN, f"--{mode}", '--urls', '-o', output_dir]
+    args = cli.parse_args()
+
+    start = time.perf_counter()
+    Manager(args, config).run()
+    seconds = time.perf_counter() - start
+    server.shutdown()
+    _, peak = _memory()
+
+    with open(os.path.join(output_dir, 'metrics.json')) as f:
+        summary = json.load(f)
+    stages = [
+        {
+            'stage': f"e2e:{stage['stage']}", 'size': f"{hosts}h", 'items': stage['items_in'] or stage['items_out'] or 0,
+            'seconds': stage['duration'],
+            'throughput': round((stage['items_in'] or stage['items_out'] or 0) / stage['duration'], 1) if stage['duration'] else None,
+            'errors': stage['errors'], 'timeouts': stage['timeouts'],
+        }
+        for stage in summary['stages']
+    ]
+    stages.append({'stage': 'e2e:total', 'size': f"{hosts}h", 'items': hosts, 'seconds': round(seconds, 3),
+                   'throughput': round(hosts / seconds, 1), 'peak_rss_mb': round(peak / 1048576, 1)})
+    for tool, data in summary['tools'].items():
+        stages.append({'stage': f"e2e:tool:{tool}", 'size': f"{hosts}h", 'items': data['runs'],
+                       'seconds': data['duration'], 'throughput': None,
+                       'peak_rss_mb': round(data['max_rss_bytes'] / 1048576, 1)})
+    print(json.dumps(stages))
+
+
+# --- Proceso principal ---
+
+def _spawn(arguments):
+    """Lanza 'python -m bench.run <arguments>' y devuelve su JSON (o None si falló)."""
+    process = subprocess.run([sys.executable, '-m', 'bench.run', *arguments], cwd=ROOT,
+                             capture_output=True, text=True)
+    if process.returncode != 0:
+        print(f"   ❌ {' '.join(arguments)} falló:\n{process.stderr.strip()[-2000:]}", file=sys.stderr)
+        return None
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+
+def _git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _print_table(results, baseline=None):
+    previous = {(r['stage'], r['size']): r for r in (baseline or {}).get('results', [])}
+    header = f"{'etapa':<22} {'tamaño':>7} {'elementos':>10} {'segundos':>10} {'elem/s':>12} {'base MB':>8} {'pico MB':>9}"
+    if baseline:
+        header += f" {'Δ tiempo':>9} {'Δ memoria':>10}"
+    print(header)
+    print('-' * len(header))
+    for result in results:
+        line = (f"{result['stage']:<22} {result['size']:>7} {result['items']:>10} {result['seconds']:>10.3f} "
+                f"{result['throughput'] if result.get('throughput') is not None else '-':>12} "
+                f"{result.get('baseline_rss_mb', '-'):>8} {result.get('peak_rss_mb', '-'):>9}")
+        old = previous.get((result['stage'], result['size']))
+        if baseline and old:
+            line += f" {_delta(old['seconds'], result['seconds']):>9} {_delta(old.get('peak_rss_mb'), result.get('peak_rss_mb')):>10}"
+        print(line)
+
+
+def _delta(old, new):
+    if not old or new is None:
+        return '-'
+    return f"{(new - old) / old * 100:+.1f}%"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark offline del framework (ver bench/run.py)")
+    parser.add_argument('--size', action='append', choices=list(corpus.SIZES), help="Tamaño del corpus (repetible; default: 1k)")
+    parser.add_argument('--stage', action='append', choices=list(STAGES), help="Etapas a medir (repetible; default: todas)")
+    parser.add_argument('--repeat', type=int, default=1, help="Repeticiones por etapa; se queda la más rápida")
+    parser.add_argument('--e2e', action='store_true', help="Medir además el Manager completo con herramientas sustitutas")
+    parser.add_argument('--e2e-hosts', type=int, default=500, help="Subdominios que emiten las fuentes en --e2e")
+    parser.add_argument('--e2e-urls-per-host', type=int, default=50, help="URLs por host de gau en --e2e")
+    parser.add_argument('--e2e-mode', choices=['recon1', 'recon2', 'recon3'], default='recon2', help="Modo de sondeo en --e2e")
+    parser.add_argument('--json', help="Guardar los resultados en este archivo JSON")
+    parser.add_argument('--compare', help="JSON de una ejecución anterior con el que comparar")
+    # Modos internos de los procesos hijos
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    parser.add_argument('--child-e2e', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child_stage(args.child, args.size[0])
+        return
+    if args.child_e2e:
+        run_child_e2e(args.e2e_hosts, args.e2e_urls_per_host, args.e2e_mode)
+        return
+
+    sizes = args.size or ['1k']
+    stages = args.stage or list(STAGES)
+    print(f"Generando corpus en {corpus.DATA_DIR} (solo la primera vez)...", file=sys.stderr)
+    for size in sizes:
+        for kind in ('urls', 'httpx', 'crtsh'):
+            corpus.ensure(kind, size)
+
+    results = []
+    for size in sizes:
+        for stage in stages:
+            runs = [r for r in (_spawn(['--child', stage, '--size', size]) for _ in range(max(1, args.repeat))) if r]
+            if runs:
+                results.append(min(runs, key=lambda r: r['seconds']))
+                print(f"   {stage} ({size}): {results[-1]['seconds']:.3f}s", file=sys.stderr)
+    if args.e2e:
+        e2e = _spawn(['--child-e2e', '--e2e-hosts', str(args.e2e_hosts),
+                      '--e2e-urls-per-host', str(args.e2e_urls_per_host), '--e2e-mode', args.e2e_mode])
+        results.extend(e2e or [])
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"\nComparando con {args.compare} (revisión {baseline.get('revision') or '?'})")
+    print()
+    _print_table(results, baseline)
+
+    if args.json:
+        report = {
+            'revision': _git_revision(), 'date': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(), 'platform': platform.platform(), 'results': results,
+        }
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=4)
+        print(f"\nResultados guardados en {args.json}")
+
+
+if __name__ == '__main__':
+    main()
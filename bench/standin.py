@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# bench/standin.py
+
+"""
+Sustitutos de subfinder, amass, subdominator, httpx, gau y katana para el benchmark.
+Aceptan los mismos argumentos con los que los lanza el framework y generan una salida
+sintética (o la grabada en BENCH_REPLAY_DIR/<herramienta>.txt) con el tamaño y la
+latencia indicados por variables de entorno:
+
+    BENCH_HOSTS           subdominios que emiten subfinder/amass/subdominator (1000)
+    BENCH_URLS_PER_HOST   URLs por host de gau; katana emite la mitad (50)
+    BENCH_LIVE_PERCENT    porcentaje de hosts vivos en httpx (40)
+    BENCH_STARTUP         segundos de espera antes de la primera línea (0)
+    BENCH_LINE_DELAY      segundos entre líneas (0)
+    BENCH_REPLAY_DIR      directorio con salidas grabadas; '{host}' se sustituye por el host
+
+Se invocan a través de los envoltorios de bench/tools/, que son los que se ponen en [TOOLS].
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import corpus  # noqa: E402
+
+
+def _env_int(name, default):
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def _env_float(name, default):
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def _option(args, *flags):
+    for flag in flags:
+        if flag in args and args.index(flag) + 1 < len(args):
+            return args[args.index(flag) + 1]
+    return None
+
+
+def _replay(tool, host=''):
+    """Líneas grabadas de la herramienta, o None si no hay grabación."""
+    replay_dir = os.environ.get('BENCH_REPLAY_DIR')
+    path = os.path.join(replay_dir, f"{tool}.txt") if replay_dir else None
+    if not path or not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return [line.rstrip('\n').replace('{host}', host) for line in f]
+
+
+def _emit(lines):
+    delay = _env_float('BENCH_LINE_DELAY', 0)
+    time.sleep(_env_float('BENCH_STARTUP', 0))
+    out = sys.stdout
+    for line in lines:
+        out.write(line + '\n')
+        if delay:
+            out.flush()
+            time.sleep(delay)
+    out.flush()
+
+
+def _read_hosts(args):
+    path = _option(args, '-l', '-list')
+    source = open(path) if path else sys.stdin
+    with source:
+        for line in source:
+            host = line.strip()
+            if host:
+                yield host
+
+
+def subdomain_source(tool, args):
+    domain = _option(args, '-d') or 'bench.example'
+    lines = _replay(tool, domain)
+    if lines is None:
+        lines = corpus.hostnames(domain, _env_int('BENCH_HOSTS', 1000))
+    _emit(lines)
+
+
+def httpx(args):
+    live_percent = _env_int('BENCH_LIVE_PERCENT', 40)
+    as_json = '-json' in args
+    ports = [int(port) for port in (_option(args, '-ports') or '443').split(',') if port.isdigit()]
+    # Como en un escaneo real, casi todo responde en 443 y 80: el resto de puertos no emite nada
+    ports = [port for port in (443, 80) if port in ports] or ports[:1]
+
+    def lines():
+        for host in _read_hosts(args):
+            host = host.split('://')[-1].split('/')[0]
+            if as_json:
+                for port in ports:
+                    yield corpus.httpx_record(host, live_percent, port)
+            elif corpus.is_live(host, live_percent):
+                yield f"https://{host}"
+
+    _emit(lines())
+
+
+def url_finder(tool, args):
+    if tool == 'gau':
+        host = next(_read_hosts([]), '')
+        count = _env_int('BENCH_URLS_PER_HOST', 50)
+    else:
+        host = _option(args, '-u') or ''
+        count = _env_int('BENCH_URLS_PER_HOST', 50) // 2
+    lines = _replay(tool, host)
+    _emit(lines if lines is not None else corpus.urls_for(host, count))
+
+
+def main():
+    if len(sys.argv) < 2:
+        sys.exit("uso: standin.py <herramienta> [argumentos...]")
+    tool, args = sys.argv[1], sys.argv[2:]
+    if tool in ('subfinder', 'amass', 'subdominator'):
+        subdomain_source(tool, args)
+    elif tool == 'httpx':
+        httpx(args)
+    elif tool in ('gau', 'katana'):
+        url_finder(tool, args)
+    else:
+        sys.exit(f"herramienta desconocida: {tool}")
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except BrokenPipeError:
+        pass
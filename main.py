@@ -3,8 +3,10 @@ import argparse
 import sys
 import os
 import logging
-from datetime import datetime
 from be.manager import Manager
+from be.modules.utils.logger import configure_logging
+from be.utils.config_loader import load_config
+from be.modules.utils.store import EXPORT_KINDS, EXPORT_FORMATS
 # Necesitas importar el módulo sys para usar sys.exit en validate_args
 
 # ─── Banner ───────────────────────────────────────────────────────────────
@@ -19,51 +21,53 @@ def banner():
     """)
 
 # ─── Configuración de Logging ─────────────────────────────────────────────
-def setup_logging(verbose=False, output_dir="logs"):
-    """Configura el sistema de logging"""
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
-    
-    log_level = logging.DEBUG if verbose else logging.INFO
-    log_file = os.path.join(output_dir, f"bugbounty_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log")
-    
-    logging.basicConfig(
-        level=log_level,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler(log_file),
-            logging.StreamHandler(sys.stdout)
-        ]
-    )
+def setup_logging(verbose=False, output_dir=None, stream=None):
+    """Configura el sistema de logging (sección [LOGGING] de la configuración)"""
+    # Los registros van a una cola y un hilo en segundo plano los escribe en la consola,
+    # en el log rotativo y, si se configura, en el log JSONL; cada línea lleva el
+    # objetivo y la etapa en curso para que los escaneos en paralelo sean legibles
+    configure_logging(load_config(), verbose=verbose, stream=stream, output_dir=output_dir)
     return logging.getLogger(__name__)
 
 # ─── Validación de Argumentos ─────────────────────────────────────────────
-def validate_args(args):
-    """Valida los argumentos de entrada"""
+def args_error(args):
+    """Devuelve el motivo por el que los argumentos no son válidos, o None si lo son."""
     if args.list and not os.path.isfile(args.list):
-        print(f"❌ Error: El archivo {args.list} no existe")
-        sys.exit(1)
+        return f"El archivo {args.list} no existe"
     
     # if args.output and not os.path.exists(args.output):
     #     os.makedirs(args.output, exist_ok=True)
     
+    # La exportación solo lee el almacén de resultados: no necesita módulos
+    if args.export:
+        return None
+
     # Validar que al menos un módulo esté seleccionado
     # 🟢 CORRECCIÓN CLAVE: Reemplazamos args.recon con args.recon1 y args.recon2
     if not any([args.recon1, args.recon2, args.recon3, args.subdomains, args.urls, args.all]):
-        print("❌ Error: Debes seleccionar al menos un módulo de escaneo")
         # También actualizamos el mensaje de ayuda para que el usuario vea la nueva opción.
-        print("   Usa --recon1, --recon2, --recon3, --subdomains, --urls o --all")
+        return ("Debes seleccionar al menos un módulo de escaneo\n"
+                "   Usa --recon1, --recon2, --recon3, --subdomains, --urls o --all")
+    return None
+
+def validate_args(args):
+    """Valida los argumentos de entrada"""
+    error = args_error(args)
+    if error:
+        print(f"❌ Error: {error}")
         sys.exit(1)
 
 # ─── Argumentos CLI Mejorados ─────────────────────────────────────────────
-def parse_args():
-    parser = argparse.ArgumentParser(
+def build_parser(parser_class=argparse.ArgumentParser):
+    """Parser de la línea de comandos (el servicio lo reutiliza para los argumentos de cada trabajo)."""
+    parser = parser_class(
         description="Herramienta de reconocimiento y escaneo Bug Bounty.",
         formatter_class=argparse.RawDescriptionHelpFormatter,
         epilog="""
 Ejemplos de uso:
   %(prog)s -l domains.txt --urls --output results/
   %(prog)s -u https://example.com --verbose --threads 10
+  %(prog)s --serve --listen unix:/tmp/bugtool.sock
         """
     )
     
@@ -80,25 +84,63 @@ Ejemplos de uso:
     modules_group.add_argument("--recon3", action="store_true", help="Ejecutar reconocimiento pasivo muy rapido (Probing con Httpx simple)")
     modules_group.add_argument("--subdomains", action="store_true", help="Descubrimiento de subdominios (Activo/Bruteforce)")
     modules_group.add_argument("--urls", action="store_true", help="Extracción y análisis de URLs")
+    modules_group.add_argument("--stream", action="store_true", help="Encadenar recon -> probing -> URLs en streaming, sin esperar entre etapas")
     modules_group.add_argument("--all", action="store_true", help="Ejecutar todos los módulos (Equivalente a --recon2 + --subdomains + --urls)")
 
     
     # Configuración
     config_group = parser.add_argument_group('Configuration')
     config_group.add_argument("-t", "--threads", type=int, default=5, help="Número de hilos (default: 5)")
+    config_group.add_argument("-w", "--workers", type=int, help="Objetivos escaneados en paralelo (default: [RUN] TARGET_WORKERS)")
+    config_group.add_argument("--url-workers", type=int, help="Hosts rastreados en paralelo con gau/katana (default: [URLS] HOST_WORKERS)")
+    config_group.add_argument("--max-tools", type=int, help="Máximo de herramientas externas simultáneas en total (default: [RUN] MAX_CONCURRENT_TOOLS)")
     config_group.add_argument("-o", "--output", help="Directorio de salida para resultados")
     # 🟢 CORRECCIÓN: Aumentar el timeout por defecto
     config_group.add_argument("--timeout", type=int, default=30, help="Timeout para requests (default: 30)")
+    config_group.add_argument("--resume", action="store_true", help="Reanudar una ejecución interrumpida (mismo -o) saltando el trabajo ya completado")
+    config_group.add_argument("--incremental", action="store_true", help="Sondear solo subdominios nuevos o con resultados antiguos y generar un delta")
+    config_group.add_argument("--recheck-age", type=float, help="Horas tras las que un host vivo se vuelve a sondear en modo incremental (default: [INCREMENTAL] RECHECK_AGE_HOURS)")
+    config_group.add_argument("--prober", choices=['httpx', 'native'], help="Motor de sondeo: binario httpx o nativo con aiohttp (default: [PROBING] ENGINE)")
+    config_group.add_argument("--wordlist", help="Diccionario para la fuerza bruta DNS de --subdomains (default: [SUBDOMAINS] WORDLIST)")
+    config_group.add_argument("--refresh", action="store_true", help="Ignorar la caché de reconocimiento pasivo y volver a consultar las fuentes")
     config_group.add_argument("--user-agent", help="User-Agent personalizado")
+    config_group.add_argument("--profile", action="store_true", help="Perfilar con cProfile la parte Python de la ejecución (profile.prof en el directorio de salida)")
     
+    # Exportación desde el almacén de resultados (SQLite, sección [STORE])
+    export_group = parser.add_argument_group('Export')
+    export_group.add_argument("--export", choices=list(EXPORT_KINDS), help="Exportar resultados guardados en lugar de escanear (filtra por -u/-l si se indican)")
+    export_group.add_argument("--format", choices=EXPORT_FORMATS, default='txt', help="Formato de la exportación (default: txt)")
+    export_group.add_argument("--tech", help="Solo hosts con esta tecnología (probes/live)")
+    export_group.add_argument("--status", type=int, help="Solo respuestas con este código HTTP (probes/live)")
+    export_group.add_argument("--category", help="Solo URLs de esta categoría (p. ej. jsfiles, xss, sql)")
+    export_group.add_argument("--all-runs", action="store_true", help="Incluir todas las ejecuciones, no solo la última de cada objetivo")
+
+    # Modo servicio: proceso residente que recibe trabajos por HTTP o socket Unix ([SERVICE])
+    service_group = parser.add_argument_group('Service')
+    service_group.add_argument("--serve", action="store_true", help="Arrancar como servicio y aceptar trabajos de escaneo (ver README)")
+    service_group.add_argument("--listen", help="Dirección del servicio: host:puerto o unix:/ruta.sock (default: [SERVICE] LISTEN)")
+    service_group.add_argument("--max-jobs", type=int, help="Trabajos ejecutándose a la vez en el servicio (default: [SERVICE] MAX_JOBS)")
+
+    # Modo distribuido: una cola SQLite en un sistema de archivos compartido ([DISTRIBUTED])
+    distributed_group = parser.add_argument_group('Distributed')
+    distributed_group.add_argument("--coordinator", metavar="COLA", help="Repartir la ejecución (-u/-l y módulos) en la cola COLA y esperar a los workers")
+    distributed_group.add_argument("--worker", metavar="COLA", help="Procesar unidades de la cola COLA (usa -w para varias a la vez)")
+
     # Verbosity
     config_group.add_argument("-v", "--verbose", action="store_true", help="Mostrar más detalles")
     config_group.add_argument("--debug", action="store_true", help="Modo debug")
-    
+    return parser
+
+def parse_args():
+    parser = build_parser()
     args = parser.parse_args()
 
+    # El servicio recibe los objetivos con cada trabajo y el worker los toma de la cola
+    if args.serve or args.worker:
+        return args
+
     # Validar que se proporcione al menos un objetivo
-    if not any([args.url, args.list]):
+    if not any([args.url, args.list, args.export]):
         parser.print_help()
         sys.exit(1)
         
@@ -106,6 +148,31 @@ Ejemplos de uso:
     
     return args
 
+class JobArgumentParser(argparse.ArgumentParser):
+    """Parser para los trabajos del servicio: un error lanza ValueError en lugar de salir."""
+
+    def error(self, message):
+        raise ValueError(message)
+
+def parse_job_args(argv, resolve_path=None):
+    """
+    Argumentos de un trabajo del servicio (los mismos flags que la CLI). 'resolve_path'
+    convierte las rutas del trabajo (-o, -l, --wordlist) y lanza ValueError si no se admiten.
+    """
+    args = build_parser(JobArgumentParser).parse_args(argv)
+    if args.serve or args.export or args.coordinator or args.worker:
+        raise ValueError("--serve, --export, --coordinator y --worker no se pueden usar en un trabajo")
+    if not any([args.url, args.list]):
+        raise ValueError("El trabajo necesita un objetivo (-u o -l)")
+    if resolve_path:
+        for option in ('output', 'list', 'wordlist'):
+            if getattr(args, option):
+                setattr(args, option, resolve_path(getattr(args, option)))
+    error = args_error(args)
+    if error:
+        raise ValueError(error)
+    return args
+
 # ─── Manejo de Excepciones ────────────────────────────────────────────────
 # Se mantiene el manejo simplificado que usa el logger para el traceback
 def handle_exceptions(func):
@@ -114,7 +181,7 @@ def handle_exceptions(func):
         try:
             return func(*args, **kwargs)
         except KeyboardInterrupt:
-            print("\n⚠️  Escaneo interrumpido por el usuario")
+            print("\n⚠️  Escaneo interrumpido por el usuario. Usa --resume con el mismo -o para continuar.")
             sys.exit(0)
         except Exception as e:
             # Ahora usamos logging para el traceback si el log está en DEBUG
@@ -127,11 +194,13 @@ def handle_exceptions(func):
 # ─── Main ─────────────────────────────────────────────────────────────────
 @handle_exceptions
 def main():
-    banner()
     args = parse_args()
+    # Con --export los datos van a stdout: banner fuera y logs a stderr
+    if not args.export:
+        banner()
     
     # Configurar logging
-    logger = setup_logging(args.verbose or args.debug)
+    logger = setup_logging(args.verbose or args.debug, stream=sys.stderr if args.export else None)
     
     logger.info("Iniciando BugBounty Framework")
     logger.debug(f"Argumentos: {args}")
@@ -142,9 +211,24 @@ def main():
         print(f"   URL: {args.url}") 
         print(f"   Lista: {args.list}")
         print(f"   Threads: {args.threads}")
+        print(f"   Workers: {args.workers}")
         print(f"   Output: {args.output}")
         print()
     
+    if args.serve:
+        # Import diferido: el modo normal no necesita el servidor
+        from be.service import ScanService
+        ScanService(args, parse_job_args).serve_forever()
+        return
+
+    if args.coordinator or args.worker:
+        from be.distributed import Coordinator, Worker
+        if args.coordinator:
+            Coordinator(args).run()
+        else:
+            Worker(args).run()
+        return
+
     # Inicializar y ejecutar manager
     manager = Manager(args)
     manager.run()
@@ -0,0 +1,88 @@
+# tests/conftest.py
+
+import os
+import socket
+import struct
+import sys
+import threading
+from collections import Counter
+
+import pytest
+
+# Los tests importan 'be' y 'bench' desde la raíz del repositorio, como main.py
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+# --- Servidor DNS local (UDP) para los tests del resolver y de la pre-resolución ---
+
+NODATA = 'NODATA'
+
+
+class StubDnsServer:
+    """
+    records: nombre -> lista de IPs o NODATA; '*.dominio' actúa de comodín y lo que no
+    está en records es NXDOMAIN. drop_first: nombre -> consultas que se ignoran antes de
+    responder (simulan la pérdida de paquetes / timeout del resolver).
+    """
+
+    def __init__(self, records, drop_first=None):
+        self.records = records
+        self.drop_first = dict(drop_first or {})
+        self.queries = Counter()
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(('127.0.0.1', 0))
+        self.address = '%s:%d' % self.sock.getsockname()
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
+    def _lookup(self, name):
+        if name in self.records:
+            return self.records[name]
+        return self.records.get('*.' + name.split('.', 1)[-1])
+
+    def _serve(self):
+        while True:
+            try:
+                data, addr = self.sock.recvfrom(512)
+            except OSError:
+                return # Socket cerrado
+            offset, labels = 12, []
+            while data[offset]:
+                length = data[offset]
+                labels.append(data[offset + 1:offset + 1 + length].decode())
+                offset += length + 1
+            name = '.'.join(labels).lower()
+            question = data[12:offset + 5]
+            self.queries[name] += 1
+            if self.queries[name] <= self.drop_first.get(name, 0):
+                continue
+            value = self._lookup(name)
+            answers = b''
+            if value is None:
+                flags, count = 0x8183, 0
+            elif value == NODATA:
+                flags, count = 0x8180, 0
+            else:
+                flags, count = 0x8180, len(value)
+                answers = b''.join(b'\xc0\x0c' + struct.pack('!HHIH', 1, 1, 60, 4) + socket.inet_aton(ip)
+                                   for ip in value)
+            self.sock.sendto(data[:2] + struct.pack('!HHHHH', flags, 1, count, 0, 0) + question + answers, addr)
+
+    def close(self):
+        self.sock.close()
+
+
+@pytest.fixture
+def dns_server():
+    servers = []
+
+    def start(records, drop_first=None):
+        server = StubDnsServer(records, drop_first)
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.close()
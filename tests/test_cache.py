@@ -0,0 +1,53 @@
+# tests/test_cache.py
+
+"""Límite de tamaño de ReconCache: total en memoria, expulsión LRU y temporales ajenos."""
+
+import os
+
+from be.modules.utils import cache as cache_module
+from be.modules.utils.cache import ReconCache
+
+
+def _walk_counter(monkeypatch):
+    calls = []
+    real_walk = os.walk
+
+    def walk(top, *args, **kwargs):
+        calls.append(top)
+        return real_walk(top, *args, **kwargs)
+
+    monkeypatch.setattr(cache_module.os, 'walk', walk)
+    return calls
+
+
+def test_directory_is_walked_only_when_the_limit_is_crossed(tmp_path, monkeypatch):
+    walks = _walk_counter(monkeypatch)
+    cache = ReconCache(cache_dir=str(tmp_path / 'recon'), max_size_mb=0.01) # ~10 KB
+
+    for i in range(5):
+        cache.put('crtsh', f"small{i}.test", [f"www.small{i}.test"])
+    assert len(walks) == 1 # Solo el primer put, para conocer el tamaño inicial
+
+    for i in range(40):
+        cache.put('crtsh', f"big{i}.test", [f"host{n}.big{i}.test" for n in range(20)])
+    sizes = [os.path.getsize(os.path.join(root, name))
+             for root, _, files in os.walk(cache.cache_dir) for name in files]
+    assert sum(sizes) <= cache.max_size
+    assert 1 < len(walks) < 40
+    # Las más antiguas son las expulsadas
+    assert cache.get('crtsh', 'small0.test') is None
+    assert cache.get('crtsh', 'big39.test') is not None
+
+
+def test_eviction_ignores_other_writers_temporaries(tmp_path):
+    cache_dir = tmp_path / 'recon'
+    (cache_dir / 'crtsh').mkdir(parents=True)
+    pending = cache_dir / 'crtsh' / '.tmp_abc.json'
+    pending.write_text('x' * 20000)
+    cache = ReconCache(cache_dir=str(cache_dir), max_size_mb=0.01)
+
+    cache.put('crtsh', 'example.test', ['www.example.test'])
+
+    # El temporal no cuenta para el límite ni se borra: la entrada nueva se conserva
+    assert pending.exists()
+    assert cache.get('crtsh', 'example.test') == ['www.example.test']
@@ -0,0 +1,62 @@
+# tests/test_checkpoint.py
+
+import json
+import os
+
+from be.modules.utils.checkpoint import Checkpoint
+
+
+def _read(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def test_hosts_go_to_the_journal_until_a_stage_completes(tmp_path):
+    checkpoint = Checkpoint(str(tmp_path))
+    checkpoint.mark_done('a.com', 'recon')
+    checkpoint.mark_host_done('a.com', 'https://a.com')
+    checkpoint.mark_host_done('a.com', 'https://a.com')
+    checkpoint.mark_host_done('a.com', 'https://www.a.com')
+
+    # El checkpoint principal no se reescribe por cada host
+    assert _read(checkpoint.path)['targets']['a.com']['hosts'] == []
+    with open(checkpoint.journal_path) as f:
+        assert len(f.readlines()) == 2
+
+    checkpoint.mark_done('a.com', 'done')
+
+    assert _read(checkpoint.path)['targets']['a.com'] == {'stages': ['recon', 'done'],
+                                                          'hosts': ['https://a.com', 'https://www.a.com']}
+    assert not os.path.exists(checkpoint.journal_path)
+
+
+def test_resume_replays_the_journal(tmp_path):
+    checkpoint = Checkpoint(str(tmp_path))
+    checkpoint.mark_done('a.com', 'probing')
+    checkpoint.mark_host_done('a.com', 'https://a.com')
+    checkpoint.mark_host_done('b.com', 'https://b.com')
+    # Un corte a mitad de escribir deja la última línea incompleta
+    with open(checkpoint.journal_path, 'a') as f:
+        f.write('{"target": "a.com", "ho')
+
+    resumed = Checkpoint(str(tmp_path), resume=True)
+
+    assert resumed.is_done('a.com', 'probing')
+    assert not resumed.is_done('a.com', 'done')
+    assert resumed.completed_hosts('a.com') == {'https://a.com'}
+    assert resumed.completed_hosts('b.com') == {'https://b.com'}
+    assert resumed.completed_hosts('c.com') == set()
+
+
+def test_without_resume_the_previous_run_is_ignored(tmp_path):
+    checkpoint = Checkpoint(str(tmp_path))
+    checkpoint.mark_done('a.com', 'recon')
+    checkpoint.mark_host_done('a.com', 'https://a.com')
+
+    fresh = Checkpoint(str(tmp_path))
+    fresh.mark_done('b.com', 'recon')
+
+    resumed = Checkpoint(str(tmp_path), resume=True)
+    assert not resumed.is_done('a.com', 'recon')
+    assert resumed.completed_hosts('a.com') == set()
+    assert resumed.is_done('b.com', 'recon')
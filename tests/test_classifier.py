@@ -0,0 +1,67 @@
+# tests/test_classifier.py
+
+"""UrlClassifier frente a las regex de [URL_PATTERNS]: mismas categorías para cualquier URL."""
+
+import argparse
+
+from bench.run import _bench_config
+from be.modules.urls import UrlsModule
+from be.modules.utils.classifier import CATEGORY_PATTERNS, UrlClassifier
+
+CORPUS = [
+    'https://example.test/',
+    'https://example.test/app.js',
+    'https://example.test/APP.JS',
+    'https://example.test/app.Js?v=3',
+    'https://example.test/app.jsx',
+    'https://example.test/app.js.map',
+    'https://example.test/app.json',
+    'https://example.test/backup.TAR.GZ',
+    'https://example.test/backup.tar.gz?dl=1&x=2',
+    'https://example.test/backup.tar.gzip',
+    'https://example.test/report.pdf#page=2',
+    'https://example.test/report.pdf?',
+    'https://example.test/a?b=1?c.sql',
+    'https://example.test/img/Logo.PNG?w=100?h=50',
+    'https://example.test/img/logo.svg\n',
+    'https://example.test/img/logo.svg\nmore',
+    'https://example.test/login?REDIRECT=/home',
+    'https://example.test/login?next=https://evil.test',
+    'https://example.test/search?Q=test&lang=es',
+    'https://example.test/items?ID=10&cat=2',
+    'https://example.test/user/profile?role=admin',
+    'https://example.test/api?api_key="abcdefghijklmnopqrstuvwxyz"',
+    'https://example.test/Token/Refresh',
+    'https://example.test/búsqueda?q=año',
+    'https://example.test/ПРИМЕР.JS',
+    'https://example.test/файл.tar.gz?Ключ=1',
+    'https://exȧmple.test/İndex.json',
+    'https://example.test/KEY', # Signo Kelvin: IGNORECASE lo iguala a 'k'
+    'https://例え.テスト/path?url=x',
+    'https://example.test/%E2%82%AC.xml',
+    'https://example.test/download.ZIP?token=abc',
+    '',
+]
+
+
+def _patterns(tmp_path):
+    return UrlsModule('example.test', argparse.Namespace(url_workers=None), _bench_config(str(tmp_path)), []).patterns
+
+
+def test_categories_match_the_regexes(tmp_path):
+    patterns = _patterns(tmp_path)
+    classifier = UrlClassifier(patterns)
+
+    for url in CORPUS:
+        expected = [name for name, key in CATEGORY_PATTERNS.items() if key in patterns and patterns[key].search(url)]
+        assert classifier.classify(url) == expected, url
+
+
+def test_every_url_pattern_matches_its_regex(tmp_path):
+    # También los patrones que no son categorías (p. ej. secrets_js), que van por la regex completa
+    patterns = _patterns(tmp_path)
+    classifier = UrlClassifier(patterns, category_patterns={key: key for key in patterns})
+
+    assert set(patterns) >= set(CATEGORY_PATTERNS.values())
+    for url in CORPUS:
+        assert classifier.classify(url) == [key for key, pattern in patterns.items() if pattern.search(url)], url
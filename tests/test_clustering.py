@@ -0,0 +1,48 @@
+# tests/test_clustering.py
+
+import configparser
+
+from be.modules.clustering import ResponseClusterer
+
+
+def _record(host, size, title='Parking', status=200):
+    return {'url': f"https://{host}", 'host': host, 'status_code': status, 'title': title, 'tech': '',
+            'content_type': 'text/html', 'response_size': size}
+
+
+def test_tolerance_does_not_chain():
+    # 1000, 1060, 1120... cada uno a 60 bytes del anterior, pero muy lejos del primero
+    records = [_record(f"h{index}.example.com", 1000 + 60 * index) for index in range(10)]
+
+    clusters = ResponseClusterer(size_tolerance=64).cluster(records)
+
+    assert [cluster['fingerprint']['response_size'] for cluster in clusters] == [
+        [1000, 1060], [1120, 1180], [1240, 1300], [1360, 1420], [1480, 1540]]
+
+
+def test_sizes_within_tolerance_of_the_first_are_grouped():
+    records = [_record('a.example.com', 5000), _record('b.example.com', 5030), _record('c.example.com', 5064),
+               _record('d.example.com', 5065), _record('e.example.com', 5000, title='Otra')]
+
+    clusters = ResponseClusterer(size_tolerance=64).cluster(records)
+
+    groups = sorted(sorted([cluster['representative'], *cluster['members']]) for cluster in clusters)
+    assert groups == [['https://a.example.com', 'https://b.example.com', 'https://c.example.com'],
+                      ['https://d.example.com'], ['https://e.example.com']]
+
+
+def test_select_skips_only_large_clusters(tmp_path):
+    records = [_record(f"p{index}.example.com", 2000 + index) for index in range(4)]
+    records += [_record('x.example.com', 100, title='X'), _record('y.example.com', 100, title='X')]
+
+    to_crawl = ResponseClusterer(min_cluster_size=3).select('example.com', records, str(tmp_path))
+
+    assert sorted(to_crawl) == ['https://p0.example.com', 'https://x.example.com', 'https://y.example.com']
+    assert (tmp_path / 'example_com_clusters.json').exists()
+
+
+def test_disabled_by_default():
+    assert ResponseClusterer.from_config(configparser.ConfigParser()) is None
+    config = configparser.ConfigParser()
+    config.read_dict({'CLUSTERING': {'ENABLED': 'true', 'SIZE_TOLERANCE': '10'}})
+    assert ResponseClusterer.from_config(config).size_tolerance == 10
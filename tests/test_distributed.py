@@ -0,0 +1,39 @@
+# tests/test_distributed.py
+
+"""Coordinador y worker sobre una cola local, con las herramientas sustitutas de bench/."""
+
+import os
+import sqlite3
+
+from bench import mock_api
+from bench.run import _bench_config
+from be.distributed import Coordinator, Worker
+from main import build_parser
+
+DOMAIN = 'bench.example'
+
+
+def test_coordinator_and_workers_share_one_store(tmp_path):
+    server, base_url = mock_api.start(crt_entries=50, urlscan_results=20)
+    try:
+        # [STORE] PATH apunta a un directorio local de cada máquina: en modo distribuido no se usa
+        config = _bench_config(str(tmp_path / 'local'), base_url)
+        output_dir = str(tmp_path / 'shared' / 'out')
+        queue_path = str(tmp_path / 'shared' / 'queue.db')
+        parser = build_parser()
+
+        Coordinator(parser.parse_args(['-u', DOMAIN, '--recon1', '-o', output_dir, '--coordinator', queue_path]),
+                    config).submit()
+        Worker(parser.parse_args(['--worker', queue_path]), config).run()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    store_path = os.path.join(output_dir, 'results.db')
+    assert not os.path.exists(os.path.join(tmp_path, 'local', 'results.db'))
+    with sqlite3.connect(store_path) as conn:
+        assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'delete'
+        runs = conn.execute('SELECT id, output_dir FROM runs').fetchall()
+        assert runs == [(runs[0][0], os.path.normpath(output_dir))]
+        subdomains = conn.execute('SELECT COUNT(*) FROM subdomains WHERE run_id = ?', (runs[0][0],)).fetchone()[0]
+    assert subdomains > 0
@@ -0,0 +1,155 @@
+# tests/test_dns.py
+
+"""AsyncResolver y SubdomainModule contra el servidor DNS local de conftest.py."""
+
+import argparse
+import configparser
+
+from be.modules.subdomain import SubdomainModule
+from be.modules.utils import dns
+from be.modules.utils.dns import AsyncResolver, DnsAnswer, DnsCache
+from conftest import NODATA
+
+def _resolve(resolver, names):
+    found, missing = {}, []
+    stats = resolver.resolve_many(names, lambda answer: found.__setitem__(answer.name, answer), missing.append)
+    return found, missing, stats
+
+
+def test_resolve_many_answer_nodata_nxdomain(dns_server):
+    server = dns_server({'www.example.test': ['10.0.0.1', '10.0.0.2'], 'v6.example.test': NODATA})
+    resolver = AsyncResolver(resolvers=server.address, concurrency=4, timeout=0.5, retries=0)
+
+    found, missing, stats = _resolve(resolver, ['WWW.example.test.', 'v6.example.test', 'nope.example.test'])
+
+    assert found['www.example.test'].addresses == ['10.0.0.1', '10.0.0.2']
+    assert sorted(missing) == ['nope.example.test', 'v6.example.test']
+    assert stats == {'queries': 3, 'cache_hits': 0, 'timeouts': 0}
+    # NODATA: el nombre existe (solo sin A) y no se confunde con NXDOMAIN
+    assert resolver.is_nxdomain('nope.example.test')
+    assert not resolver.is_nxdomain('v6.example.test')
+    assert resolver.cache['v6.example.test'].addresses == []
+
+
+def test_negative_answers_are_cached(dns_server):
+    server = dns_server({'www.example.test': ['10.0.0.1'], 'v6.example.test': NODATA})
+    resolver = AsyncResolver(resolvers=server.address, concurrency=2, timeout=0.5, retries=0)
+    names = ['www.example.test', 'v6.example.test', 'nope.example.test']
+    _resolve(resolver, names)
+
+    found, missing, stats = _resolve(resolver, names)
+
+    assert list(found) == ['www.example.test']
+    assert sorted(missing) == ['nope.example.test', 'v6.example.test']
+    assert stats == {'queries': 0, 'cache_hits': 3, 'timeouts': 0}
+    assert all(count == 1 for count in server.queries.values())
+
+
+def test_timeout_is_retried(dns_server):
+    server = dns_server({'slow.example.test': ['10.0.0.3']}, drop_first={'slow.example.test': 1})
+    resolver = AsyncResolver(resolvers=server.address, concurrency=1, timeout=0.2, retries=1)
+
+    found, missing, stats = _resolve(resolver, ['slow.example.test'])
+
+    assert found['slow.example.test'].addresses == ['10.0.0.3']
+    assert missing == []
+    assert stats == {'queries': 2, 'cache_hits': 0, 'timeouts': 1}
+
+
+def test_timeout_without_retries_left_is_not_cached(dns_server):
+    server = dns_server({'slow.example.test': ['10.0.0.3']}, drop_first={'slow.example.test': 2})
+    resolver = AsyncResolver(resolvers=server.address, concurrency=1, timeout=0.2, retries=1)
+
+    found, missing, stats = _resolve(resolver, ['slow.example.test'])
+
+    assert found == {} and missing == ['slow.example.test']
+    assert stats['timeouts'] == 2
+    # Sin respuesta no se sabe si existe: ni se cachea ni cuenta como NXDOMAIN
+    assert 'slow.example.test' not in resolver.cache
+    assert not resolver.is_nxdomain('slow.example.test')
+    found, _, _ = _resolve(resolver, ['slow.example.test'])
+    assert found['slow.example.test'].addresses == ['10.0.0.3']
+
+
+def test_retry_moves_to_the_next_resolver(dns_server):
+    # Un resolver que nunca responde y otro que sí: con un reintento siempre se obtiene respuesta
+    dead = dns_server({}, drop_first={'www.example.test': 100})
+    alive = dns_server({'www.example.test': ['10.0.0.1']})
+    resolver = AsyncResolver(resolvers=f"{dead.address}, {alive.address}", concurrency=1, timeout=0.2, retries=1)
+
+    found, _, _ = _resolve(resolver, ['www.example.test'])
+
+    assert found['www.example.test'].addresses == ['10.0.0.1']
+    assert alive.queries['www.example.test'] == 1
+
+
+def test_cached_answers_expire_with_their_ttl(dns_server, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(dns.time, 'monotonic', lambda: now[0])
+    server = dns_server({'www.example.test': ['10.0.0.1']}) # TTL 60
+    resolver = AsyncResolver(resolvers=server.address, concurrency=2, timeout=0.5, retries=0,
+                             cache=DnsCache(negative_ttl=120))
+    names = ['www.example.test', 'nope.example.test']
+    _resolve(resolver, names)
+
+    now[0] += 61
+    # La positiva ha caducado y se vuelve a consultar; la negativa (NXDOMAIN) sigue vigente
+    _, _, stats = _resolve(resolver, names)
+    assert stats == {'queries': 1, 'cache_hits': 1, 'timeouts': 0}
+    assert server.queries == {'www.example.test': 2, 'nope.example.test': 1}
+
+    now[0] += 60
+    assert resolver.is_nxdomain('nope.example.test') is False
+    assert 'nope.example.test' not in resolver.cache
+
+
+def test_cache_caps_the_ttl_and_evicts_least_recently_used(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(dns.time, 'monotonic', lambda: now[0])
+    cache = DnsCache(max_entries=2, max_ttl=300)
+    cache.put('a.test', DnsAnswer('a.test', ['10.0.0.1'], []), 86400)
+    cache.put('b.test', DnsAnswer('b.test', ['10.0.0.2'], []), 86400)
+    assert cache.get('a.test').addresses == ['10.0.0.1'] # 'a' pasa a ser la más reciente
+    cache.put('c.test', None)
+
+    assert len(cache) == 2
+    assert 'b.test' not in cache and cache.get('c.test', 'miss') is None
+    now[0] += 301
+    assert 'a.test' not in cache
+
+
+def _subdomain_module(tmp_path, target, resolver, words, known=()):
+    wordlist = tmp_path / 'words.txt'
+    wordlist.write_text('\n'.join(words) + '\n')
+    config = configparser.ConfigParser()
+    config.read_dict({'SUBDOMAINS': {'WORDLIST': str(wordlist), 'PERMUTATIONS': 'false'}})
+    return SubdomainModule(target, argparse.Namespace(wordlist=None), config, known, resolver=resolver)
+
+
+def test_subdomain_bruteforce(dns_server, tmp_path):
+    server = dns_server({'api.example.test': ['10.0.0.1'], 'www.example.test': ['10.0.0.2'],
+                         'v6.example.test': NODATA})
+    resolver = AsyncResolver(resolvers=server.address, concurrency=4, timeout=0.5, retries=0)
+    module = _subdomain_module(tmp_path, 'example.test', resolver, ['api', 'www', 'v6', 'missing', '# comentario'],
+                               known=['www.example.test'])
+    streamed = []
+
+    results = module.run(on_subdomain=streamed.append)
+
+    # Los ya conocidos no se repiten y NODATA/NXDOMAIN no son subdominios nuevos
+    assert results['subdomains'] == ['api.example.test']
+    assert streamed == ['api.example.test']
+    assert module.wildcard_addresses == set()
+
+
+def test_subdomain_wildcard_is_filtered(dns_server, tmp_path):
+    server = dns_server({'*.wild.test': ['10.9.9.9'], 'api.wild.test': ['10.0.0.1'],
+                         'cdn.wild.test': ['10.9.9.9', '10.0.0.5']})
+    resolver = AsyncResolver(resolvers=server.address, concurrency=4, timeout=0.5, retries=0)
+    module = _subdomain_module(tmp_path, 'wild.test', resolver, ['api', 'cdn', 'www', 'anything'])
+
+    results = module.run()
+
+    assert module.wildcard_addresses == {'10.9.9.9'}
+    # Solo se descartan las respuestas que apuntan únicamente a las IPs del comodín
+    assert results['subdomains'] == ['api.wild.test', 'cdn.wild.test']
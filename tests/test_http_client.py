@@ -0,0 +1,53 @@
+# tests/test_http_client.py
+
+import json
+
+import pytest
+
+from be.modules.utils.http_client import iter_json_array
+
+DOCUMENT = [{'id': 1, 'name_value': 'a.example.com\nb.example.com'}, 'ñandú', 3.5, [1, [2]], None, {}]
+
+
+def _chunks(text, size):
+    data = text.encode('utf-8')
+    return [data[index:index + size] for index in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize('size', [1, 2, 3, 7, 64, 10000])
+def test_elements_split_across_chunks(size):
+    # Con trozos de 1-3 bytes los elementos, las cadenas y los caracteres UTF-8 quedan partidos
+    text = json.dumps(DOCUMENT, ensure_ascii=False, indent=1)
+
+    assert list(iter_json_array(_chunks(text, size))) == DOCUMENT
+
+
+def test_number_split_across_chunks():
+    assert list(iter_json_array([b'[12', b'34, 5.', b'25e', b'1 ', b']'])) == [1234, 52.5]
+
+
+def test_empty_array_and_whitespace():
+    assert list(iter_json_array([b' \n[', b'', b' ]\n'])) == []
+
+
+def test_stops_reading_after_closing_bracket():
+    chunks = iter([b'[1, 2]', b'basura que no se lee'])
+
+    assert list(iter_json_array(chunks)) == [1, 2]
+    assert next(chunks) == b'basura que no se lee'
+
+
+@pytest.mark.parametrize('text', ['[{"id": 1}, {"id": 2}, {"id"', '[{"id": 1},', '['])
+def test_truncated_array_raises_after_complete_elements(text):
+    items = []
+    with pytest.raises(json.JSONDecodeError):
+        for item in iter_json_array(_chunks(text, 4)):
+            items.append(item)
+
+    assert items == [{'id': 1}, {'id': 2}][:text.count('}')]
+
+
+@pytest.mark.parametrize('text', ['', '{"id": 1}', 'null'])
+def test_not_an_array_raises(text):
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_json_array(_chunks(text, 4)))
@@ -0,0 +1,62 @@
+# tests/test_incremental.py
+
+"""Sondeo incremental con la pre-resolución DNS activa (contra el servidor DNS de conftest.py)."""
+
+import json
+import time
+
+from bench.run import _bench_config
+from be.manager import Manager
+from be.modules.incremental import IncrementalState
+from be.modules.probing import ProbingModule
+from be.modules.utils.dns import AsyncResolver
+from main import parse_job_args
+
+TARGET = 'example.test'
+
+
+def _record(host, live=True):
+    return {'url': f"https://{host}" if live else '', 'host': host, 'ip': '', 'scheme': 'https' if live else '',
+            'port': 443 if live else 0, 'status_code': 200 if live else 0, 'title': host, 'tech': '',
+            'content_type': '', 'response_size': 10, 'cname': '', 'cdn': False}
+
+
+def _fake_native(self, host_source, partial_path=None, on_live=None):
+    # Sustituye al sondeo HTTP: todo lo que llega vivo responde
+    for host in host_source:
+        self.results['positives'].append(_record(host))
+
+
+def test_prefiltered_hosts_keep_their_state(dns_server, tmp_path, monkeypatch):
+    server = dns_server({'www.example.test': ['10.0.0.1'], '*.wild.example.test': ['10.9.9.9']})
+    monkeypatch.setattr(ProbingModule, '_run_native', _fake_native)
+    config = _bench_config(str(tmp_path))
+    config.set('PROBING', 'PRE_RESOLVE', 'true')
+    config.set('PROBING', 'ENGINE', 'native')
+    args = parse_job_args(['-u', TARGET, '--recon1', '--incremental', '-o', str(tmp_path / 'out')])
+    manager = Manager(args, config, resolver=AsyncResolver(resolvers=server.address, timeout=0.5, retries=0))
+    output_dir = str(tmp_path / 'out')
+
+    # Ejecución anterior: los cuatro estaban vivos y su sondeo ya caducó
+    hosts = ['a.wild.example.test', 'b.wild.example.test', 'gone.example.test', 'www.example.test']
+    old = time.time() - 48 * 3600
+    state = IncrementalState(TARGET, output_dir)
+    state.hosts = {host: {'first_seen': old, 'last_seen': old, 'last_probed': old, 'live': True,
+                          'records': {'positives': [_record(host)], 'negatives': []}} for host in hosts}
+    state._save({'new': [], 'vanished': [], 'changed': []})
+
+    live, failed = manager._run_incremental_probing(TARGET, hosts, output_dir, args)
+
+    assert failed == []
+    with open(state.delta_path) as f:
+        delta = json.load(f)
+    # Ni el NXDOMAIN ni el miembro de la zona comodín (no sondeados) cuentan como desaparecidos
+    assert delta['vanished'] == []
+    assert sorted(record['host'] for record in live) == hosts
+    reloaded = IncrementalState(TARGET, output_dir).hosts
+    # El miembro del comodín hereda el resultado de su representante, con su propio host y URL
+    assert reloaded['b.wild.example.test']['last_probed'] > old
+    assert reloaded['b.wild.example.test']['records']['positives'][0]['url'] == 'https://b.wild.example.test'
+    # El NXDOMAIN conserva su estado anterior tal cual
+    assert reloaded['gone.example.test']['last_probed'] == old
+    assert reloaded['gone.example.test']['live']
@@ -0,0 +1,171 @@
+# tests/test_native_prober.py
+
+"""NativeProber contra servidores http.server locales."""
+
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from be.modules.native_prober import NativeProber
+from be.modules.utils.dns import DnsAnswer
+
+pytestmark = pytest.mark.skipif(not NativeProber.available(), reason="aiohttp no está instalado")
+
+HOST = '127.0.0.1'
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.active[0] += 1
+            server.peak[0] = max(server.peak[0], server.active[0])
+        try:
+            time.sleep(server.delay)
+            body = server.body
+            self.send_response(server.status)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            if server.send_length:
+                self.send_header('Content-Length', str(len(body)))
+            else:
+                self.send_header('Connection', 'close')
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with server.lock:
+                server.active[0] -= 1
+
+    def log_message(self, *_):
+        pass
+
+
+@pytest.fixture
+def http_server():
+    servers = []
+
+    def start(body=b'<html><title>Hola</title></html>', status=200, delay=0.0, send_length=True,
+              active=None, peak=None, lock=None):
+        server = ThreadingHTTPServer((HOST, 0), _Handler)
+        server.daemon_threads = True
+        server.body, server.status, server.delay, server.send_length = body, status, delay, send_length
+        # Contadores de peticiones simultáneas (se pueden compartir entre servidores)
+        server.active, server.peak, server.lock = active or [0], peak or [0], lock or threading.Lock()
+        threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def _closed_port():
+    with socket.socket() as sock:
+        sock.bind((HOST, 0))
+        return sock.getsockname()[1]
+
+
+def _probe(prober, hosts):
+    results = {}
+    prober.probe_many(hosts, lambda host, positives, negatives: results.__setitem__(host, (positives, negatives)))
+    return results
+
+
+def test_record_fields(http_server):
+    server = http_server(body=b'<HTML><Title>\n  Panel &amp; login\n</title></HTML>', status=403)
+    port = server.server_address[1]
+
+    positives, negatives = _probe(NativeProber([port], timeout=5, body_hash=True), [HOST])[HOST]
+
+    assert negatives == []
+    [record] = positives
+    assert record['url'] == f"http://{HOST}:{port}"
+    assert (record['host'], record['ip'], record['scheme'], record['port']) == (HOST, HOST, 'http', port)
+    assert record['status_code'] == 403
+    assert record['title'] == 'Panel & login'
+    assert record['content_type'] == 'text/html'
+    assert record['response_size'] == len(server.body)
+    assert len(record['body_hash']) == 64
+    # El motor nativo no detecta tecnologías, CNAME ni CDN
+    assert (record['tech'], record['cname'], record['cdn']) == ('', '', False)
+
+
+def test_size_without_content_length(http_server):
+    server = http_server(body=b'x' * 5000, send_length=False)
+
+    [record], _ = _probe(NativeProber([server.server_address[1]], timeout=5), [HOST])[HOST]
+
+    assert record['response_size'] == 5000
+    assert record['title'] == ''
+
+
+def test_closed_ports_and_unresolvable_hosts_are_negatives():
+    port = _closed_port()
+
+    results = _probe(NativeProber([port], timeout=2), [HOST, 'no-existe.invalid'])
+
+    assert results[HOST][0] == []
+    assert [(r['host'], r['ip'], r['status_code']) for r in results[HOST][1]] == [(HOST, HOST, 0)]
+    assert results['no-existe.invalid'] == ([], [NativeProber._record('no-existe.invalid', '', '', 0, 0)])
+
+
+def test_every_port_is_probed(http_server):
+    ports = [http_server().server_address[1], http_server().server_address[1], _closed_port()]
+
+    positives, negatives = _probe(NativeProber(ports, timeout=5), [HOST])[HOST]
+
+    assert sorted(record['port'] for record in positives) == sorted(ports[:2])
+    assert negatives == []
+
+
+def test_first_only_stops_at_first_answer(http_server):
+    first, second = http_server(), http_server()
+    prober = NativeProber([], timeout=5, first_only=True)
+    # En lugar de 443/80: un puerto cerrado para https y después los dos servidores
+    prober.FIRST_ONLY_PORTS = (('https', _closed_port()), ('http', first.server_address[1]),
+                               ('http', second.server_address[1]))
+
+    [record], negatives = _probe(prober, [HOST])[HOST]
+
+    assert negatives == []
+    assert (record['scheme'], record['port']) == ('http', first.server_address[1])
+    assert second.peak[0] == 0
+
+
+def test_first_only_without_answer_is_negative():
+    prober = NativeProber([], timeout=2, first_only=True)
+    prober.FIRST_ONLY_PORTS = (('https', _closed_port()), ('http', _closed_port()))
+
+    assert _probe(prober, [HOST])[HOST] == ([], [NativeProber._record(HOST, '', HOST, 0, 0)])
+
+
+@pytest.mark.parametrize('per_ip_limit', [1, 3])
+def test_per_ip_limit(http_server, per_ip_limit):
+    # Varios puertos de la misma IP con contadores compartidos: el límite es por IP, no por puerto
+    active, peak, lock = [0], [0], threading.Lock()
+    ports = [http_server(delay=0.3, active=active, peak=peak, lock=lock).server_address[1] for _ in range(4)]
+
+    positives, _ = _probe(NativeProber(ports, timeout=10, per_ip_limit=per_ip_limit), [HOST])[HOST]
+
+    assert len(positives) == 4
+    assert 1 <= peak[0] <= per_ip_limit
+    if per_ip_limit > 1:
+        assert peak[0] > 1
+
+
+def test_resolver_cache_gives_the_ip(http_server):
+    port = http_server().server_address[1]
+
+    class _Resolver:
+        cache = {'localhost': DnsAnswer('localhost', ['127.0.0.1'], [])}
+
+    [record], _ = _probe(NativeProber([port], timeout=5, resolver=_Resolver()), ['localhost'])['localhost']
+
+    assert record['ip'] == '127.0.0.1'
+    assert record['url'] == f"http://localhost:{port}"
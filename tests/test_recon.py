@@ -0,0 +1,114 @@
+# tests/test_recon.py
+
+"""Fuentes por API de ReconModule (crt.sh y urlscan.io) contra bench/mock_api.py."""
+
+import argparse
+import time
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from bench import mock_api
+from bench.run import _bench_config
+from be.modules.recon import ReconModule
+from be.modules.utils import http_client
+
+DOMAIN = 'bench.example'
+
+
+@pytest.fixture
+def api(monkeypatch):
+    servers = []
+    # Sesión propia y sin backoff en cada test: los reintentos solo esperan por Retry-After
+    monkeypatch.setattr(http_client, '_session', http_client.build_session(retries=3, backoff=0))
+
+    def start(**options):
+        server, base_url = mock_api.start(**options)
+        servers.append(server)
+        return server, base_url
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def _recon(tmp_path, base_url, **recon_options):
+    config = _bench_config(str(tmp_path), base_url)
+    for option, value in recon_options.items():
+        config.set('RECON', option, str(value))
+    return ReconModule(DOMAIN, argparse.Namespace(), config)
+
+
+def _urlscan_queries(server):
+    return [parse_qs(urlparse(path).query) for path in server.requests if path.startswith('/urlscan')]
+
+
+def test_crtsh_stream(api, tmp_path):
+    _, base_url = api(crt_entries=300)
+    recon = _recon(tmp_path, base_url)
+    emitted = []
+    recon.on_subdomain = emitted.append
+
+    subdomains = recon._query_crt_sh()
+
+    assert len(subdomains) == len(set(subdomains)) > 0
+    assert all(name.endswith('.' + DOMAIN) for name in subdomains)
+    assert sorted(emitted) == sorted(subdomains)
+
+
+def test_urlscan_pagination_stops_at_max_pages(api, tmp_path):
+    server, base_url = api(urlscan_results=1000)
+    recon = _recon(tmp_path, base_url, URLSCAN_PAGE_SIZE=10, URLSCAN_MAX_PAGES=3)
+
+    subdomains = recon._query_urlscan_io()
+
+    queries = _urlscan_queries(server)
+    assert len(queries) == 3
+    # Cada página continúa desde el 'sort' del último resultado de la anterior
+    assert [query.get('search_after') for query in queries] == [None, ['10,id9'], ['20,id19']]
+    assert all(query['size'] == ['10'] for query in queries)
+    assert len([name for name in subdomains if name != DOMAIN]) == 30
+
+
+def test_urlscan_stops_when_results_run_out(api, tmp_path):
+    server, base_url = api(urlscan_results=25)
+    recon = _recon(tmp_path, base_url, URLSCAN_PAGE_SIZE=10, URLSCAN_MAX_PAGES=10)
+
+    recon._query_urlscan_io()
+
+    assert len(_urlscan_queries(server)) == 3
+
+
+def test_urlscan_429_waits_for_retry_after(api, tmp_path):
+    server, base_url = api(urlscan_results=5, throttle=2, retry_after=1)
+    recon = _recon(tmp_path, base_url)
+
+    start = time.monotonic()
+    subdomains = recon._query_urlscan_io()
+
+    assert time.monotonic() - start >= 2
+    assert len(_urlscan_queries(server)) == 3
+    assert subdomains
+
+
+def test_retry_after_beyond_the_source_timeout_is_not_waited(api, tmp_path):
+    server, base_url = api(urlscan_results=5, throttle=1, retry_after=60)
+    recon = _recon(tmp_path, base_url, URLSCAN_TIMEOUT=5)
+
+    start = time.monotonic()
+    subdomains = recon._query_urlscan_io()
+
+    assert time.monotonic() - start < 5
+    assert subdomains is None
+    assert len(_urlscan_queries(server)) == 1
+
+
+def test_crtsh_retry_after_beyond_the_source_timeout_is_not_waited(api, tmp_path):
+    _, base_url = api(throttle=1, retry_after=60)
+    recon = _recon(tmp_path, base_url, CRTSH_TIMEOUT=5)
+
+    start = time.monotonic()
+
+    assert recon._query_crt_sh() is None
+    assert time.monotonic() - start < 5
@@ -0,0 +1,23 @@
+# tests/test_targets.py
+
+"""Carga de objetivos (-u/-l) en Manager y su validación en el servicio."""
+
+from bench.run import _bench_config
+from be.manager import Manager
+from be.service import valid_target
+from main import parse_job_args
+
+
+def test_ip_targets_are_loaded(tmp_path):
+    targets = tmp_path / 'targets.txt'
+    targets.write_text('https://Example.test:8443/login\n10.0.0.5\nhttp://192.168.1.10:8080/app\n'
+                       'user@example.test\n*.example.test\n')
+    args = parse_job_args(['-u', '10.0.0.5', '-l', str(targets), '--recon1', '-o', str(tmp_path / 'out')])
+    manager = Manager(args, _bench_config(str(tmp_path)))
+
+    assert manager._load_targets() == ['10.0.0.5', '192.168.1.10', 'example.test']
+
+
+def test_service_accepts_ip_targets():
+    assert valid_target('10.0.0.5') and valid_target('https://10.0.0.5:8443/')
+    assert not valid_target('10.0.0.5 extra') and not valid_target('ftp://10.0.0.5')
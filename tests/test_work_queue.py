@@ -0,0 +1,209 @@
+# tests/test_work_queue.py
+
+import pytest
+
+from be.modules.utils import work_queue
+from be.modules.utils.work_queue import QueueCheckpoint, WorkQueue
+
+LEASE = 60
+
+
+class _Clock:
+    """Sustituye a time en work_queue: los préstamos vencen sin esperar."""
+
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(work_queue, 'time', clock)
+    return clock
+
+
+@pytest.fixture
+def open_queue(tmp_path, clock):
+    queues = []
+
+    def open_(max_attempts=3):
+        queue = WorkQueue(str(tmp_path / 'queue' / 'work.db'), lease_seconds=LEASE, max_attempts=max_attempts)
+        queues.append(queue)
+        return queue
+
+    yield open_
+    for queue in queues:
+        queue.close()
+
+
+def _stages(*targets, stages=('recon', 'probing', 'done')):
+    return [(target, stage, position, None) for target in targets for position, stage in enumerate(stages)]
+
+
+def _take(queue, worker='w1'):
+    unit = queue.lease(worker)
+    return (unit['target'], unit['stage']) if unit else None
+
+
+def test_add_units_is_idempotent(open_queue):
+    queue = open_queue()
+
+    assert queue.add_units(_stages('a.com')) == 3
+    assert queue.add_units(_stages('a.com', 'b.com')) == 3
+    assert queue.counts() == {'queued': 6}
+
+
+def test_stages_are_leased_in_order(open_queue):
+    queue = open_queue()
+    queue.add_units(_stages('a.com', 'b.com'))
+
+    first, second = queue.lease('w1'), queue.lease('w2')
+    assert {(first['target'], first['stage']), (second['target'], second['stage'])} == {('a.com', 'recon'),
+                                                                                      ('b.com', 'recon')}
+    # Ninguna etapa posterior se presta mientras la anterior de su objetivo no esté hecha
+    assert queue.lease('w3') is None
+
+    assert queue.complete(first['id'], 'w1')
+    assert _take(queue, 'w1') == (first['target'], 'probing')
+    assert queue.lease('w1') is None
+
+
+def test_more_advanced_stages_first(open_queue):
+    queue = open_queue()
+    queue.add_units(_stages('a.com', 'b.com', stages=('recon', 'probing')))
+    unit = queue.lease('w1')
+    queue.complete(unit['id'], 'w1')
+
+    # Con b.com/recon en cola, antes se termina el objetivo ya empezado
+    assert _take(queue) == (unit['target'], 'probing')
+
+
+def test_payload_round_trip(open_queue):
+    queue = open_queue()
+    queue.add_units([('proyecto', 'hosts', 0, ['a.com', 'www.a.com'])])
+
+    assert queue.lease('w1')['payload'] == ['a.com', 'www.a.com']
+
+
+def test_expired_lease_is_requeued(open_queue, clock):
+    queue = open_queue()
+    queue.add_units(_stages('a.com', stages=('recon',)))
+    unit = queue.lease('w1')
+    assert queue.lease('w2') is None
+
+    clock.advance(LEASE + 1)
+    retried = queue.lease('w2')
+
+    assert (retried['id'], retried['attempts']) == (unit['id'], 2)
+    # El worker original ya no es dueño de la unidad: ni la completa ni renueva
+    assert not queue.complete(unit['id'], 'w1')
+    assert not queue.fail(unit['id'], 'w1', 'tarde')
+    assert queue.renew('w1') == 0
+    assert queue.complete(retried['id'], 'w2')
+    assert queue.counts() == {'done': 1}
+
+
+def test_renew_keeps_the_lease(open_queue, clock):
+    queue = open_queue()
+    queue.add_units(_stages('a.com', stages=('recon',)))
+    unit = queue.lease('w1')
+
+    clock.advance(LEASE - 1)
+    assert queue.renew('w1') == 1
+    clock.advance(LEASE - 1)
+
+    assert queue.lease('w2') is None
+    assert queue.complete(unit['id'], 'w1')
+
+
+def test_fail_requeues_until_max_attempts(open_queue):
+    queue = open_queue(max_attempts=2)
+    queue.add_units(_stages('a.com', stages=('recon',)))
+
+    assert queue.fail(queue.lease('w1')['id'], 'w1', 'error 1')
+    assert queue.counts() == {'queued': 1}
+    unit = queue.lease('w1')
+    assert unit['attempts'] == 2
+    assert queue.fail(unit['id'], 'w1', 'error 2')
+
+    assert queue.counts() == {'failed': 1}
+    assert queue.failures() == [{'target': 'a.com', 'stage': 'recon', 'attempts': 2, 'error': 'error 2'}]
+    assert queue.lease('w1') is None
+    assert queue.unfinished() == 0
+
+
+def test_expired_lease_after_max_attempts_fails(open_queue, clock):
+    queue = open_queue(max_attempts=1)
+    queue.add_units(_stages('a.com', stages=('recon',)))
+    queue.lease('w1')
+
+    clock.advance(LEASE + 1)
+    queue.requeue_expired()
+
+    [failure] = queue.failures()
+    assert failure['attempts'] == 1
+    assert 'préstamo vencido' in failure['error']
+
+
+def test_failure_cascades_to_later_stages(open_queue):
+    queue = open_queue(max_attempts=1)
+    queue.add_units(_stages('a.com', 'b.com'))
+    unit = queue.lease('w1')
+    other = queue.lease('w2')
+    queue.fail(unit['id'], 'w1', 'sin red')
+    queue.requeue_expired()
+
+    failed = {(failure['target'], failure['stage']): failure['error'] for failure in queue.failures()}
+    assert failed == {(unit['target'], 'recon'): 'sin red', (unit['target'], 'probing'): 'falló una etapa anterior',
+                      (unit['target'], 'done'): 'falló una etapa anterior'}
+    # El otro objetivo sigue su curso
+    assert queue.complete(other['id'], 'w2')
+    assert _take(queue, 'w2') == (other['target'], 'probing')
+
+
+def test_release_does_not_spend_an_attempt(open_queue):
+    queue = open_queue(max_attempts=1)
+    queue.add_units(_stages('a.com', 'b.com', stages=('recon',)))
+    queue.lease('w1')
+    queue.lease('w1')
+    queue.lease('w2') # Sin unidades: no hay nada que devolver de w2
+
+    assert queue.release('w1') == 2
+    assert queue.release('w2') == 0
+    assert queue.counts() == {'queued': 2}
+    unit = queue.lease('w2')
+    assert unit['attempts'] == 1
+    assert queue.complete(unit['id'], 'w2')
+
+
+def test_state_is_shared_between_connections(open_queue):
+    coordinator, worker = open_queue(), open_queue()
+    coordinator.set_meta('args', {'urls': True})
+    coordinator.add_units(_stages('a.com', stages=('recon',)))
+
+    assert worker.get_meta('args') == {'urls': True}
+    assert worker.get_meta('missing', 'default') == 'default'
+    unit = worker.lease('w1')
+    assert coordinator.lease('w2') is None
+    assert worker.complete(unit['id'], 'w1')
+    assert coordinator.unfinished() == 0
+
+
+def test_queue_checkpoint(open_queue):
+    first, second = QueueCheckpoint(open_queue()), QueueCheckpoint(open_queue())
+
+    first.mark_done('a.com', 'recon')
+    first.mark_done('a.com', 'recon')
+    first.mark_host_done('a.com', 'https://www.a.com')
+
+    assert second.is_done('a.com', 'recon')
+    assert not second.is_done('a.com', 'probing')
+    assert not second.is_done('b.com', 'recon')
+    assert second.completed_hosts('a.com') == {'https://www.a.com'}
+    assert second.completed_hosts('b.com') == set()